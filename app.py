@@ -1,16 +1,13 @@
+from importlib.machinery import ModuleSpec
 import streamlit as st
-import time
-import pandas as pd
-import numpy as np
-import plotly.express as px
-from src.data_loader import get_macro_indicators, get_batch_asset_data
-from src.allocator import get_allocation_strategy, recommend_sectors
-from src.analyzer import score_stocks, score_crypto
-from src.fii_loader import get_fii_batch
-from src.technical_engine import get_technical_signals
-from src.quant_engine import run_monte_carlo, get_optimized_allocation
-from src.google_auth import get_login_url, get_user_info
-from src.payment import is_premium, unlock_premium, generate_real_pix, verify_payment_status
+
+# O Streamlit roda este script como __main__, e os processos do pool de
+# cálculo (spawn) reimportam o __main__: eles carregam src.jobs, o ponto de
+# entrada dos workers, em vez de rodar o app inteiro.
+__spec__ = ModuleSpec("src.jobs", None)
+
+# Os motores pesados (yfinance, scipy, plotly, bcb...) só são importados
+# depois do login: a tela de entrada renderiza como um app Streamlit puro.
 
 # --- CONFIG & SESSION STATE ---
 st.set_page_config(page_title="Poseidon Investimentos", layout="wide", page_icon="🔱")
@@ -29,6 +26,10 @@ if 'run_analysis' not in st.session_state:
 if 'rebalance_results' not in st.session_state:
     st.session_state.rebalance_results = None
 
+# Profiler sob demanda (Área Admin ou POSEIDON_PROFILE=rerun): amostra este rerun inteiro
+from src.profiler import profile_rerun
+profile_rerun(st.session_state.get('profile_reruns', False))
+
 # --- AUTHENTICATION GATE ---
 def login_page():
     col1, col2, col3 = st.columns([0.5, 1, 0.5])
@@ -71,6 +72,71 @@ if st.session_state.user is None:
     login_page()
     st.stop()
 
+import pandas as pd
+import plotly.express as px
+from src.pipeline import (
+    data_version, stage_macro, stage_allocation, stage_allocation_chart,
+    stage_stock_scan, stage_crypto_scan, stage_fii_scan, stage_monte_carlo, stage_goal_plan,
+    stage_sensitivity, stage_optimizer, stage_live_screen, stage_fixed_income_offers, stage_market_offers,
+    stage_diversification
+)
+from src.fixed_income import compare_offers, ir_rate, rank_offers
+from src.live_quotes import LIVE_REFRESH, apply_changes
+from src.quant_engine import sensitivity_heatmap
+from src.compute import ComputeBusyError
+from src.chart_data import fan_chart
+from src.rebalancer import rebalance_positions
+from src.universe import STOCK_TICKERS, BDR_TICKERS, FII_TICKERS, CRYPTO_TICKERS
+from src.payment import is_premium, unlock_premium, generate_real_pix, verify_payment_status
+from src.qr_render import decoded_image, qr_svg
+
+# --- PAINEL DE MÉTRICAS (ADMIN) ---
+def render_metrics_panel():
+    from src.metrics import snapshot, render_prometheus
+    from src.upstream import breaker_states
+
+    data = snapshot()
+    if not data['stages']:
+        st.caption("Nenhuma chamada registrada neste processo ainda.")
+        return
+    st.caption("Latência por estágio (ms) e taxa de acerto de cache")
+    st.dataframe(pd.DataFrame(data['stages']), hide_index=True)
+    if data['upstream']:
+        st.caption("Chamadas aos provedores externos")
+        st.dataframe(pd.DataFrame(data['upstream']), hide_index=True)
+    states = breaker_states()
+    if states:
+        st.caption("Circuit breakers: " + " · ".join(f"{host}: {state}" for host, state in states.items()))
+    st.download_button("⬇️ Exportar (Prometheus)", render_prometheus(), file_name="poseidon_metrics.prom")
+
+# --- PROFILER (ADMIN) ---
+def render_profiler_panel():
+    import os
+    from src import profiler
+    from src.metrics import snapshot
+
+    st.toggle("Perfilar os reruns desta sessão", key="profile_reruns",
+              help="Amostra cada rerun do app e grava árvore de chamadas e flamegraph.")
+    stages = sorted({row['stage'] for row in snapshot()['stages']} | set(profiler.engine_targets))
+    targets = st.multiselect("Perfilar chamadas de motores (todas as sessões)", stages,
+                             default=sorted(profiler.engine_targets & set(stages)))
+    if set(targets) != profiler.engine_targets:
+        profiler.set_engine_targets(targets)
+
+    runs = profiler.recent_runs()
+    if not runs:
+        st.caption(f"Nenhuma execução perfilada ainda (guardamos as últimas {profiler.PROFILE_KEEP}).")
+        return
+    name = st.selectbox("Execuções perfiladas", [n for n, _ in runs])
+    path = dict(runs)[name]
+    files = sorted(os.listdir(path)) if os.path.isdir(path) else []
+    for filename in files:
+        with open(os.path.join(path, filename), "rb") as f:
+            st.download_button(f"⬇️ {filename}", f.read(), file_name=f"{name}-{filename}", key=f"prof-{name}-{filename}")
+    if "calltree.txt" in files:
+        with open(os.path.join(path, "calltree.txt"), encoding="utf-8") as f:
+            st.code("".join(f.readlines()[:40]), language="text")
+
 # --- PREMIUM CHECK ---
 def check_premium():
     try:
@@ -112,6 +178,14 @@ else:
                 else:
                     st.error("E-mail inválido")
 
+            st.write("---")
+            st.subheader("Métricas de Desempenho")
+            render_metrics_panel()
+
+            st.write("---")
+            st.subheader("Profiler")
+            render_profiler_panel()
+
 if st.session_state.get('show_payment', False) and not user_premium:
     st.markdown('<div class="ui-card premium-card">', unsafe_allow_html=True)
     col1, col2 = st.columns([1, 1])
@@ -134,8 +208,11 @@ if st.session_state.get('show_payment', False) and not user_premium:
 
         if st.session_state.current_payment:
             pay = st.session_state.current_payment
+            # Bytes em cache: os reruns com o painel aberto reaproveitam a mesma imagem
             if pay.get("qr_code_base64"):
-                st.image(f"data:image/png;base64,{pay['qr_code_base64']}", width=200)
+                st.image(decoded_image(pay['qr_code_base64']), width=200)
+            elif pay.get("code"):
+                st.image(qr_svg(pay['code']), width=200)
             
             st.code(pay['code'], language="text")
             st.caption("Investimento: R$ 49,99 (Acesso Vitalício)")
@@ -145,7 +222,6 @@ if st.session_state.get('show_payment', False) and not user_premium:
                 if st.button("✅ Verificar", use_container_width=True):
                     status = verify_payment_status(pay['id'])
                     if status == "approved":
-                        from src.payment import unlock_premium
                         unlock_premium(st.session_state.user.get("email"))
                         st.session_state.current_payment = None
                         st.rerun()
@@ -157,25 +233,6 @@ if st.session_state.get('show_payment', False) and not user_premium:
     st.markdown('</div>', unsafe_allow_html=True)
 
 
-# --- ASSET UNIVERSE ---
-STOCK_TICKERS = [
-    "VALE3.SA", "PETR4.SA", "WEGE3.SA", "ITUB4.SA", "BBAS3.SA", 
-    "BBDC4.SA", "ABEV3.SA", "RENT3.SA", "BPAC11.SA", "PRIO3.SA",
-    "CMIG4.SA", "GGBR4.SA", "CSAN3.SA", "RAIL3.SA", "ELET3.SA",
-    "VBBR3.SA", "RADL3.SA", "RDOR3.SA", "HYPE3.SA", "BBSE3.SA"
-]
-BDR_TICKERS = [
-    "AAPL34.SA", "GOGL34.SA", "AMZO34.SA", "MSFT34.SA", "TSLA34.SA",
-    "NVDC34.SA", "M1TA34.SA", "DISB34.SA", "NFLX34.SA", "PYPL34.SA",
-    "IVVB11.SA", "NASD11.SA", "BERK34.SA", "JNJB34.SA", "PGCO34.SA",
-    "PEPB34.SA", "MCDC34.SA", "CSCO34.SA", "ITLC34.SA", "VISA34.SA"
-]
-FII_TICKERS = [
-    "HGLG11", "KNIP11", "VISC11", "XPLG11", "XPML11", "MXRF11", 
-    "KNCR11", "HGRU11", "VILG11", "BRCO11", "HGBS11", "BTLG11"
-]
-CRYPTO_TICKERS = ["BTC-USD", "ETH-USD", "SOL-USD", "BNB-USD", "ADA-USD", "XRP-USD", "DOT-USD", "AVAX-USD"]
-
 # --- SIDEBAR (Calibration) ---
 st.sidebar.title("🧠 Calibração de Perfil")
 st.sidebar.markdown("---")
@@ -196,7 +253,7 @@ st.markdown(f"#### Bem-vindo, Investidor. Modo: **{user_risk.upper()}**")
 
 # --- MACRO DATA ---
 with st.spinner("Analisando Cenário Macroeconômico..."):
-    macro_data = get_macro_indicators()
+    macro_data = stage_macro()
     
 col1, col2, col3 = st.columns(3)
 col1.metric("Selic Meta (Brasil)", f"{macro_data['selic']}%", "Neutro")
@@ -205,255 +262,340 @@ col3.metric("Sentimento de Mercado", "Cauteloso", "Volatilidade Alta")
 
 st.markdown("---")
 
-if st.session_state.run_analysis:
-    st.subheader("📊 Alocação Estratégica Sugerida")
-    
-    allocation = get_allocation_strategy(user_risk)
-    # Chart with Poseidon Colors (Deep Blues and Gold)
-    df_alloc = pd.DataFrame(list(allocation.items()), columns=['Classe', 'Proporção'])
-    poseidon_colors = ['#00d4ff', '#005f73', '#ffb703', '#94d2bd', '#ee9b00']
-    fig = px.pie(df_alloc, values='Proporção', names='Classe', 
-                 title=f'💎 Alocação Estratégica Poseidon ({user_risk})', 
-                 hole=0.4,
-                 color_discrete_sequence=poseidon_colors)
-    fig.update_traces(textposition='inside', textinfo='percent+label')
-    fig.update_layout(showlegend=False, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
-    st.plotly_chart(fig, width='stretch')
-    
-    st.subheader("🎯 Seleção Tática de Ativos (Top Picks)")
-    tabs = st.tabs(["🇧🇷 Ações Brasil", "🌎 Exterior (BDRs/ETFs)", "₿ Cripto", "🏗️ FIIs"])
-    
-    with tabs[0]: # Stocks
-        if allocation['Ações BR'] > 0:
-            with st.spinner("Scanner de Ações BR em execução..."):
-                raw_stocks = get_batch_asset_data(STOCK_TICKERS)
-                best_stocks = score_stocks(raw_stocks)
-                
-                # --- CORREÇÃO DE SEGURANÇA REFORÇADA ---
-                # Garante que o DataFrame não está vazio e normaliza nomes de colunas
-                if best_stocks is not None and not best_stocks.empty:
-                    # Se a coluna 'symbol' não existir, tenta renomear variantes comuns
-                    if 'symbol' not in best_stocks.columns:
-                        best_stocks = best_stocks.rename(columns={'Symbol': 'symbol', 'Ticker': 'symbol'})
-                
-                if best_stocks is not None and not best_stocks.empty and 'symbol' in best_stocks.columns:
-                    best_stocks['Timing'] = best_stocks['symbol'].apply(get_technical_signals)
-                    
-                    st.dataframe(
-                        best_stocks[['symbol', 'name', 'price', 'pe_ratio', 'roe', 'Timing']],
-                        column_config={
-                            "symbol": "Ativo",
-                            "name": "Nome da Empresa",
-                            "price": st.column_config.NumberColumn("Preço Atual", format="R$ %.2f"),
-                            "pe_ratio": st.column_config.NumberColumn("P/L", format="%.2f"),
-                            "roe": st.column_config.NumberColumn("ROE", format="%.2%"),
-                            "Timing": "Sinal Técnico"
-                        },
-                        hide_index=True,
-                        use_container_width=True
-                    )
-                    st.caption("*Ranking baseado em P/L baixo e ROE alto.")
-                else:
-                    st.warning("⚠️ Não foi possível carregar dados das ações ou nenhum ativo atendeu aos critérios.")
-                
-                # MARKOWITZ OPTIMIZATION BUTTON
-                if user_premium:
-                    if st.button("🔱 Otimizar Pesos (Markowitz) - Top 5"):
-                        with st.spinner("Calculando Fronteira Eficiente (scipy)..."):
-                            top_5_tickers = best_stocks['symbol'].head(5).tolist()
-                            optimized_weights = get_optimized_allocation(top_5_tickers, user_risk)
-                            
-                            if optimized_weights:
-                                st.success("✅ Pesos Otimizados para Máximo Retorno Ajustado ao Risco!")
-                                df_opt = pd.DataFrame(list(optimized_weights.items()), columns=['Ticker', 'Peso Sugerido'])
-                                df_opt['Peso Sugerido'] = df_opt['Peso Sugerido'].apply(lambda x: f"{x*100:.1f}%")
-                                st.table(df_opt)
-                            else:
-                                st.warning("Não foi possível otimizar os pesos com os dados atuais. Verifique a conexão com o Yahoo Finance.")
-                else:
-                    st.markdown("""
-                    <div class="lock-area">
-                        <h3>🔒 Recurso Premium</h3>
-                        <p>Otimização de Markowitz para maximizar seu retorno ajustado ao risco.</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    if st.button("💎 Liberar Agora", key="unlock_markowitz"):
-                        st.session_state.show_payment = True
-                        st.rerun()
-        else:
-            st.warning("Seu perfil não recomenda exposição a Ações no momento.")
+# --- SEÇÕES DA ANÁLISE ---
+# Cada seção com widgets próprios é um fragment: interagir com ela reexecuta
+# só a seção, e os estágios pesados vêm memoizados de src.pipeline.
+def render_lock(title, text, key, button_label="💎 Liberar Agora"):
+    st.markdown(f"""
+    <div class="lock-area">
+        <h3>{title}</h3>
+        <p>{text}</p>
+    </div>
+    """, unsafe_allow_html=True)
+    if st.button(button_label, key=key):
+        st.session_state.show_payment = True
+        st.rerun()
 
-    with tabs[1]: # International
-        if allocation['Exterior'] > 0:
-            if user_premium:
-                with st.spinner("Scanner Global em execução..."):
-                    raw_bdr = get_batch_asset_data(BDR_TICKERS)
-                    best_bdr = score_stocks(raw_bdr)
-                    
-                    # --- CORREÇÃO DE SEGURANÇA REFORÇADA ---
-                    # Garante que o DataFrame não está vazio e normaliza nomes de colunas
-                    if best_bdr is not None and not best_bdr.empty:
-                        # Se a coluna 'symbol' não existir, tenta renomear variantes comuns
-                        if 'symbol' not in best_bdr.columns:
-                            best_bdr = best_bdr.rename(columns={'Symbol': 'symbol', 'Ticker': 'symbol'})
-
-                    if best_bdr is not None and not best_bdr.empty and 'symbol' in best_bdr.columns:
-                        best_bdr['Timing'] = best_bdr['symbol'].apply(get_technical_signals)
-                        
-                        st.dataframe(
-                            best_bdr[['symbol', 'name', 'price', 'pe_ratio', 'Timing']],
-                            column_config={
-                                "symbol": "Ativo",
-                                "name": "Nome",
-                                "price": st.column_config.NumberColumn("Preço", format="R$ %.2f"),
-                                "pe_ratio": st.column_config.NumberColumn("P/L", format="%.2f"),
-                                "Timing": "Sinal Técnico"
-                            },
-                            hide_index=True,
-                            use_container_width=True
-                        )
-                        st.caption("*Integrando ativos globais para diversificação geográfica.")
-                    else:
-                        st.warning("⚠️ Dados de BDRs indisponíveis no momento.")
-            else:
-                st.markdown("""
-                <div class="lock-area">
-                    <h3>🔒 Acesso Global Premium</h3>
-                    <p>Scanner de BDRs, ETFs e ativos internacionais disponível apenas para membros Premium.</p>
-                </div>
-                """, unsafe_allow_html=True)
-                if st.button("💎 Liberar Agora", key="unlock_global"):
-                    st.session_state.show_payment = True
-                    st.rerun()
-        else:
-            st.warning("Seu perfil foca em ativos domésticos.")
+def run_job(stage, *args, label):
+    """
+    Roda um estágio do pool de processos mostrando o tempo de espera.
+    Cada atualização do placeholder devolve o controle ao Streamlit: se o
+    usuário mexer na tela, o script é interrompido e o job antigo, cancelado.
+    """
+    status = st.empty()
+    try:
+        result = stage(*args, on_wait=lambda elapsed: status.caption(f"⏳ {label}... {elapsed:.1f}s"))
+    except ComputeBusyError:
+        status.warning("⚠️ Servidor de cálculo ocupado. Tente novamente em alguns segundos.")
+        return None
+    status.empty()
+    return result
 
-    with tabs[2]: # Crypto
-        if allocation['Cripto'] > 0:
-            if user_premium:
-                with st.spinner("Analisando Blockchain..."):
-                    raw_crypto = get_batch_asset_data(CRYPTO_TICKERS)
-                    best_crypto = score_crypto(raw_crypto)
-                    st.dataframe(best_crypto[['symbol', 'price', 'market_cap']].style.format({'price': '$ {:.2f}'}))
-            else:
-                st.markdown("""
-                <div class="lock-area">
-                    <h3>🔒 Cripto Scanner Premium</h3>
-                    <p>Análise quantitativa de ativos digitais bloqueada para conta básica.</p>
-                </div>
-                """, unsafe_allow_html=True)
-                if st.button("💎 Liberar Agora", key="unlock_crypto"):
-                    st.session_state.show_payment = True
-                    st.rerun()
+@st.fragment(run_every=LIVE_REFRESH)
+def render_live_table(screen, key, columns, column_config):
+    """
+    Tabela do scanner ao vivo: a cada LIVE_REFRESH aplica só o que mudou desde a
+    versão mostrada (ChangeSet); recarrega inteira se o Top N mudou de ordem.
+    """
+    version, df = st.session_state.get(key, (-1, None))
+    changes = screen.changes_since(version) if df is not None else False
+    if changes is False:
+        df, version = screen.top_frame()
+    elif changes is not None:
+        patched = apply_changes(df, changes)
+        df, version = screen.top_frame() if patched is None else (patched, changes.version)
+    st.session_state[key] = (version, df)
+    st.dataframe(df[columns], column_config=column_config, hide_index=True, use_container_width=True)
+    st.caption(f"🟢 Cotações ao vivo (atualização {version}).")
+
+def select_top_5(ranked):
+    """
+    Top 5 do scanner para o Markowitz, trocando nomes muito correlacionados
+    (ex.: três bancos) pelos próximos do ranking que diversificam mais.
+    """
+    try:
+        picks = stage_diversification(STOCK_TICKERS, ranked, k=5)
+    except Exception:
+        picks = None # Sem histórico de retornos: fica o Top 5 puro
+    if picks is None:
+        return ranked[:5]
+
+    selected, naive = picks['selected'], picks['naive']
+    swapped_in = [t for t in selected['tickers'] if t not in naive['tickers']]
+    if swapped_in:
+        swapped_out = [t for t in naive['tickers'] if t not in selected['tickers']]
+        st.info(f"🧩 Diversificação: {', '.join(swapped_out)} → {', '.join(swapped_in)} "
+                f"(apostas efetivas {naive['effective_bets']:.1f} → {selected['effective_bets']:.1f}; "
+                f"correlação média {naive['mean_correlation']:.2f} → {selected['mean_correlation']:.2f}).")
+    with st.expander("🧬 Correlação e clusters dos candidatos"):
+        st.dataframe(picks['correlation'].round(2), use_container_width=True)
+        groups = picks['clusters'].groupby(picks['clusters']).groups
+        st.caption("Clusters (ligação média): " + " | ".join(" · ".join(names) for names in groups.values()))
+    return selected['tickers']
+
+@st.fragment
+def render_stocks_tab(allocation, version):
+    if allocation['Ações BR'] <= 0:
+        st.warning("Seu perfil não recomenda exposição a Ações no momento.")
+        return
+
+    with st.spinner("Scanner de Ações BR em execução..."):
+        screen = stage_live_screen('stocks', STOCK_TICKERS)
+        best_stocks = screen.top_frame()[0] if screen is not None else stage_stock_scan('stocks', STOCK_TICKERS, version)
+        
+    if best_stocks is not None:
+        columns = ['symbol', 'name', 'price', 'pe_ratio', 'roe', 'Timing']
+        column_config = {
+            "symbol": "Ativo",
+            "name": "Nome da Empresa",
+            "price": st.column_config.NumberColumn("Preço Atual", format="R$ %.2f"),
+            "pe_ratio": st.column_config.NumberColumn("P/L", format="%.2f"),
+            "roe": st.column_config.NumberColumn("ROE", format="%.2%"),
+            "Timing": "Sinal Técnico"
+        }
+        if screen is not None:
+            render_live_table(screen, 'live_stocks', columns, column_config)
         else:
-            st.warning("Seu perfil não recomenda exposição a Criptoativos.")
-            
-    with tabs[3]: # FIIs
-        if allocation['FIIs'] > 0:
-            if user_premium:
-                with st.spinner("Scanner de FIIs em execução (StatusInvest)..."):
-                    df_fii = get_fii_batch(FII_TICKERS)
-                    df_fii_filt = df_fii[(df_fii['p_vp'] > 0.5) & (df_fii['p_vp'] < 1.2)]
-                    st.dataframe(
-                        df_fii_filt.style.format({
-                            'p_vp': '{:.2f}', 'dy': '{:.2%}', 'vacancy': '{:.2%}'
-                        })
-                    )
-                    st.caption("*Filtro: P/VP entre 0.5 e 1.2 para evitar fundos superavaliados.")
+            st.dataframe(best_stocks[columns], column_config=column_config, hide_index=True, use_container_width=True)
+        st.caption("*Ranking baseado em P/L baixo e ROE alto.")
+    else:
+        st.warning("⚠️ Não foi possível carregar dados das ações ou nenhum ativo atendeu aos critérios.")
+    
+    # MARKOWITZ OPTIMIZATION BUTTON
+    if user_premium:
+        if st.button("🔱 Otimizar Pesos (Markowitz) - Top 5") and best_stocks is not None:
+            top_5_tickers = select_top_5(best_stocks['symbol'].astype(str).tolist())
+            optimized_weights = run_job(stage_optimizer, top_5_tickers, user_risk, label="Calculando Fronteira Eficiente (scipy)")
+            if optimized_weights:
+                st.success("✅ Pesos Otimizados para Máximo Retorno Ajustado ao Risco!")
+                df_opt = pd.DataFrame(list(optimized_weights.items()), columns=['Ticker', 'Peso Sugerido'])
+                df_opt['Peso Sugerido'] = df_opt['Peso Sugerido'].apply(lambda x: f"{x*100:.1f}%")
+                st.table(df_opt)
             else:
-                st.markdown("""
-                <div class="lock-area">
-                    <h3>🔒 Radar de FIIs Premium</h3>
-                    <p>Seleção tática de Fundos Imobiliários disponível apenas para Poseidon Premium.</p>
-                </div>
-                """, unsafe_allow_html=True)
-                if st.button("💎 Liberar Agora", key="unlock_fiis"):
-                    st.session_state.show_payment = True
-                    st.rerun()
+                st.warning("Não foi possível otimizar os pesos com os dados atuais. Verifique a conexão com o Yahoo Finance.")
+    else:
+        render_lock("🔒 Recurso Premium", "Otimização de Markowitz para maximizar seu retorno ajustado ao risco.", "unlock_markowitz")
+
+def render_bdr_tab(allocation, version):
+    if allocation['Exterior'] <= 0:
+        st.warning("Seu perfil foca em ativos domésticos.")
+        return
+    if not user_premium:
+        render_lock("🔒 Acesso Global Premium", "Scanner de BDRs, ETFs e ativos internacionais disponível apenas para membros Premium.", "unlock_global")
+        return
+
+    with st.spinner("Scanner Global em execução..."):
+        screen = stage_live_screen('bdr', BDR_TICKERS)
+        best_bdr = screen.top_frame()[0] if screen is not None else stage_stock_scan('bdr', BDR_TICKERS, version)
+
+    if best_bdr is not None:
+        columns = ['symbol', 'name', 'price', 'pe_ratio', 'Timing']
+        column_config = {
+            "symbol": "Ativo",
+            "name": "Nome",
+            "price": st.column_config.NumberColumn("Preço", format="R$ %.2f"),
+            "pe_ratio": st.column_config.NumberColumn("P/L", format="%.2f"),
+            "Timing": "Sinal Técnico"
+        }
+        if screen is not None:
+            render_live_table(screen, 'live_bdr', columns, column_config)
         else:
-            st.warning("Seu perfil não recomenda exposição a FIIs.")
+            st.dataframe(best_bdr[columns], column_config=column_config, hide_index=True, use_container_width=True)
+        st.caption("*Integrando ativos globais para diversificação geográfica.")
+    else:
+        st.warning("⚠️ Dados de BDRs indisponíveis no momento.")
 
-    # 4. Renda Fixa
-    st.markdown("---")
+def render_crypto_tab(allocation, version):
+    if allocation['Cripto'] <= 0:
+        st.warning("Seu perfil não recomenda exposição a Criptoativos.")
+        return
+    if not user_premium:
+        render_lock("🔒 Cripto Scanner Premium", "Análise quantitativa de ativos digitais bloqueada para conta básica.", "unlock_crypto")
+        return
+
+    with st.spinner("Analisando Blockchain..."):
+        best_crypto = stage_crypto_scan(CRYPTO_TICKERS, version)
+    st.dataframe(best_crypto[['symbol', 'price', 'market_cap']].style.format({'price': '$ {:.2f}'}))
+
+def render_fii_tab(allocation, version):
+    if allocation['FIIs'] <= 0:
+        st.warning("Seu perfil não recomenda exposição a FIIs.")
+        return
+    if not user_premium:
+        render_lock("🔒 Radar de FIIs Premium", "Seleção tática de Fundos Imobiliários disponível apenas para Poseidon Premium.", "unlock_fiis")
+        return
+
+    with st.spinner("Scanner de FIIs em execução (StatusInvest)..."):
+        df_fii_filt = stage_fii_scan(FII_TICKERS, version)
+    st.dataframe(
+        df_fii_filt.style.format({
+            'p_vp': '{:.2f}', 'dy': '{:.2%}', 'vacancy': '{:.2%}'
+        })
+    )
+    st.caption("*Filtro: P/VP entre 0.5 e 1.2 para evitar fundos superavaliados.")
+
+@st.fragment
+def render_fixed_income(macro, amount):
     st.subheader("🛡️ Renda Fixa Inteligente (Isentos vs Tributados)")
     col_rf1, col_rf2 = st.columns(2)
     with col_rf1:
         cdb_rate = st.number_input("Taxa CDB ofererecida (% do CDI)", value=110.0)
         lci_rate = st.number_input("Taxa LCI/LCA ofererecida (% do CDI)", value=92.0)
-    ir_factor = 0.85 
-    cdb_net = cdb_rate * ir_factor
+        days = st.number_input("Prazo (dias corridos)", min_value=1, value=720, step=30)
+    with st.expander("📈 Projeções (padrão: Selic meta e IPCA 12m atuais)"):
+        col_p1, col_p2 = st.columns(2)
+        selic = col_p1.number_input("Selic média no prazo (% a.a.)", value=float(macro['selic']), step=0.25)
+        ipca = col_p2.number_input("IPCA médio no prazo (% a.a.)", value=float(macro['ipca']), step=0.25)
+    ranked, break_even = compare_offers(cdb_rate, lci_rate, days, macro, selic=selic)
+    cdb_net = ranked.loc[ranked['produto'] == 'CDB', 'liquido_pct_cdi'].iloc[0]
     with col_rf2:
         if cdb_net > lci_rate:
             st.success(f"✅ O **CDB ({cdb_rate}%)** é mais vantajoso!")
-            st.write(f"Rentabilidade líquida est. do CDB: {cdb_net:.2f}% do CDI")
+            st.write(f"Rentabilidade líquida est. do CDB: {cdb_net:.2f}% do CDI (IR de {ir_rate(days) * 100:.1f}% no prazo)")
         else:
             st.success(f"✅ A **LCI/LCA ({lci_rate}%)** é mais vantajosa!")
-            st.write(f"O CDB precisaria render > {(lci_rate/ir_factor):.1f}% para empatar.")
+            st.write(f"O CDB precisaria render > {break_even:.1f}% do CDI para empatar.")
 
-    # 5. Risk
-    st.markdown("---")
+    # Comparador do mercado inteiro: tabela de ofertas enviada ou a do servidor
+    uploaded = st.file_uploader("Tabela de ofertas (CSV: emissor, produto, indexador, taxa, prazo_dias, aplicacao_minima)",
+                                type=["csv"], key="fixed_income_offers")
+    try:
+        offers = stage_fixed_income_offers(uploaded.getvalue()) if uploaded is not None else stage_market_offers()
+    except ValueError as e:
+        st.error(f"Não foi possível ler a tabela de ofertas: {e}")
+        return
+    if offers is None or offers.empty:
+        return
+
+    col_f1, col_f2 = st.columns(2)
+    longest = max(int(offers['prazo_dias'].max()), 60)
+    max_days = col_f1.slider("Prazo máximo (dias)", 30, longest, longest, step=30)
+    only_affordable = col_f2.checkbox(f"Só ofertas com aplicação mínima até R$ {amount:,.0f}", value=True)
+    best = rank_offers(offers, macro, selic=selic, ipca=ipca, max_days=max_days,
+                       amount=amount if only_affordable else None)
+    st.caption(f"{len(best)} de {len(offers)} ofertas, ordenadas pela rentabilidade líquida.")
+    st.dataframe(
+        best[['emissor', 'produto', 'indexador', 'taxa', 'prazo_dias', 'taxa_bruta_aa', 'aliquota_ir',
+              'taxa_liquida_aa', 'liquido_pct_cdi', 'gross_up_aa']],
+        column_config={
+            "emissor": "Emissor",
+            "produto": "Produto",
+            "indexador": "Indexador",
+            "taxa": st.column_config.NumberColumn("Taxa", format="%.2f"),
+            "prazo_dias": st.column_config.NumberColumn("Prazo (dias)", format="%d"),
+            "taxa_bruta_aa": st.column_config.NumberColumn("Bruto a.a.", format="%.2f%%"),
+            "aliquota_ir": st.column_config.NumberColumn("IR", format="%.1f%%"),
+            "taxa_liquida_aa": st.column_config.NumberColumn("Líquido a.a.", format="%.2f%%"),
+            "liquido_pct_cdi": st.column_config.NumberColumn("Líquido (% CDI)", format="%.1f%%"),
+            "gross_up_aa": st.column_config.NumberColumn("Gross-up a.a.", format="%.2f%%"),
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+def render_risk(profile):
     st.subheader("⚠️ Análise de Resiliência (Risk Engine)")
     risk_map = {
         "Conservador": {"max_drawdown": "3% a 5%", "volatility": "Baixa", "recovery": "Rápida"},
         "Moderado": {"max_drawdown": "10% a 15%", "volatility": "Média", "recovery": "6-12 meses"},
         "Arrojado": {"max_drawdown": "25% a 40%", "volatility": "Alta", "recovery": "18-24 meses"}
     }
-    r_info = risk_map[user_risk]
+    r_info = risk_map[profile]
     col_r1, col_r2, col_r3 = st.columns(3)
     col_r1.warning(f"Queda Máxima Est.: {r_info['max_drawdown']}")
     col_r2.info(f"Volatilidade: {r_info['volatility']}")
     col_r3.success(f"Tempo de Recuperação: {r_info['recovery']}")
     st.caption("Nota: O Drawdown é baseado em crises históricas (Ex: 2008, 2020) para essa alocação de ativos.")
 
-    # 6. MONTE CARLO SIMULATION (PROJEÇÃO DE FUTURO)
-    st.markdown("---")
+@st.fragment
+def render_monte_carlo(amount, profile):
     st.subheader("🔮 Projeção Estatística (Monte Carlo)")
     st.info("Simulamos 1.000 cenários possíveis para o seu patrimônio nos próximos anos.")
     
     col_mc1, col_mc2 = st.columns([1, 2])
     with col_mc1:
         years_sim = st.slider("Horizonte de Simulação (Anos)", 1, 30, 10)
-        # Expected return and vol based on risk
-        base_returns = {"Conservador": 0.11, "Moderado": 0.14, "Arrojado": 0.18}
-        base_vols = {"Conservador": 0.05, "Moderado": 0.12, "Arrojado": 0.25}
         
-        exp_ret = base_returns[user_risk]
-        exp_vol = base_vols[user_risk]
-        
-    paths = run_monte_carlo(user_amount, exp_ret, exp_vol, years=years_sim)
-    
-    # Calculate percentiles for the chart
-    final_results = paths[-1, :]
-    p10 = np.percentile(final_results, 10)
-    p50 = np.percentile(final_results, 50) # Median
-    p90 = np.percentile(final_results, 90)
-    
+    mc = run_job(stage_monte_carlo, amount, profile, years_sim, label="Simulando 1.000 cenários")
+    if mc is None:
+        return
+
     with col_mc2:
         if user_premium:
-            # Plot only a sample of paths + percentiles
-            fig_mc = px.line(paths[:, :50], labels={'index': 'Dias', 'value': 'Patrimônio (R$)'}, 
-                             title=f"Simulação de {years_sim} anos - {user_risk}")
-            fig_mc.update_layout(showlegend=False, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
+            # Faixa P10-P90, mediana e alguns caminhos, já reduzidos para o navegador
+            fig_mc = fan_chart(mc['chart'], f"Simulação de {years_sim} anos - {profile}", "Anos", "Patrimônio (R$)")
             st.plotly_chart(fig_mc, width='stretch')
         else:
-            st.markdown("""
-            <div class="lock-area">
-                <h3>🔒 Gráfico Bloqueado</h3>
-                <p>Simulação estatística dinâmica de 1.000 caminhos randômicos disponível para Premium.</p>
-            </div>
-            """, unsafe_allow_html=True)
-            st.write(f"🧬 Projeção simplificada (Mediana): R$ {p50:,.2f}")
-            if st.button("💎 Desbloquear Simulador", key="unlock_mc"):
-                st.session_state.show_payment = True
-                st.rerun()
+            render_lock("🔒 Gráfico Bloqueado", "Simulação estatística dinâmica de 1.000 caminhos randômicos disponível para Premium.", "unlock_mc", "💎 Desbloquear Simulador")
+            st.write(f"🧬 Projeção simplificada (Mediana): R$ {mc['p50']:,.2f}")
     
     col_stat1, col_stat2, col_stat3 = st.columns(3)
-    col_stat1.metric("Cenário Pessimista (10%)", f"R$ {p10:,.2f}")
-    col_stat2.metric("Cenário Provável (Mediana)", f"R$ {p50:,.2f}")
-    col_stat3.metric("Cenário Otimista (90%)", f"R$ {p90:,.2f}")
+    col_stat1.metric("Cenário Pessimista (10%)", f"R$ {mc['p10']:,.2f}")
+    col_stat2.metric("Cenário Provável (Mediana)", f"R$ {mc['p50']:,.2f}")
+    col_stat3.metric("Cenário Otimista (90%)", f"R$ {mc['p90']:,.2f}")
 
-    # 7. CALCULADORA DE REBALANCEAMENTO
-    st.markdown("---")
+    with st.expander("🧪 E se? Sensibilidade a Retorno e Volatilidade"):
+        if user_premium:
+            percentile_label = st.radio("Cenário", ["Pessimista (10%)", "Mediana", "Otimista (90%)"], index=1, horizontal=True)
+            percentile = {"Pessimista (10%)": 10, "Mediana": 50, "Otimista (90%)": 90}[percentile_label]
+            grid = run_job(stage_sensitivity, amount, profile, label="Calculando a grade de cenários")
+            if grid is None:
+                return
+            heatmap = sensitivity_heatmap(grid, years_sim, percentile)
+            fig_sens = px.imshow(
+                heatmap.values,
+                x=[f"{r*100:.1f}%" for r in heatmap.columns],
+                y=[f"{v*100:.1f}%" for v in heatmap.index],
+                labels={'x': 'Retorno Anual', 'y': 'Volatilidade Anual', 'color': 'Patrimônio (R$)'},
+                text_auto='.3s', aspect='auto', color_continuous_scale='Blues',
+                title=f"Patrimônio em {years_sim} anos por retorno e volatilidade"
+            )
+            fig_sens.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
+            st.plotly_chart(fig_sens, width='stretch')
+            st.caption("Todos os cenários usam os mesmos sorteios aleatórios: as diferenças vêm só das premissas.")
+        else:
+            render_lock("🔒 Análise de Sensibilidade", "Veja como o resultado muda com outras premissas de retorno e risco.", "unlock_sensitivity", "💎 Liberar Análise")
+
+GOAL_STEPS = {"Mensal": "monthly", "Semanal": "weekly", "Diária": "daily"}
+
+@st.fragment
+def render_goal_plan(amount, profile, objective, ipca):
+    st.subheader(f"🎯 Planejamento do Objetivo: {objective}")
+    st.info(f"Aportes mensais até a meta e retiradas corrigidas pelo IPCA ({ipca}% a.a.). Valores em reais de hoje.")
+
+    col_g1, col_g2, col_g3 = st.columns(3)
+    with col_g1:
+        monthly_contribution = st.number_input("Aporte Mensal (R$)", min_value=0.0, value=1000.0, step=100.0)
+        contribution_years = st.number_input("Anos de Acumulação", min_value=0, max_value=60, value=20)
+    with col_g2:
+        monthly_withdrawal = st.number_input("Retirada Mensal Desejada (R$)", min_value=0.0, value=0.0, step=500.0)
+        total_years = st.number_input("Horizonte Total (Anos)", min_value=1, max_value=80, value=30)
+    with col_g3:
+        goal = st.number_input("Patrimônio Final Desejado (R$)", min_value=0.0, value=1000000.0, step=50000.0)
+        step_label = st.selectbox("Resolução da Simulação", list(GOAL_STEPS))
+
+    plan = run_job(
+        stage_goal_plan, amount, profile, int(total_years), monthly_contribution, monthly_withdrawal,
+        min(int(contribution_years), int(total_years)), goal, GOAL_STEPS[step_label], ipca / 100,
+        label="Simulando o plano"
+    )
+    if plan is None:
+        return
+
+    col_p1, col_p2, col_p3 = st.columns(3)
+    col_p1.metric("Probabilidade de Sucesso", f"{plan['success_probability']*100:.1f}%")
+    col_p2.metric("Risco de Esgotamento", f"{plan['depletion_probability']*100:.1f}%")
+    col_p3.metric("Patrimônio Final (Mediana, hoje)", f"R$ {plan['p50']:,.2f}")
+
+    if user_premium:
+        fig_plan = fan_chart(plan['chart'], f"Plano de {int(total_years)} anos - {profile} (retorno esperado {plan['annual_return']*100:.1f}% a.a.)",
+                             "Anos", "Patrimônio Nominal (R$)")
+        st.plotly_chart(fig_plan, width='stretch')
+    else:
+        render_lock("🔒 Trajetórias do Plano", "Veja os cenários do seu plano de aportes e retiradas ao longo do tempo.", "unlock_goal", "💎 Ver Trajetórias")
+
+@st.fragment
+def render_rebalance(allocation, amount):
     st.subheader("⚖️ Calculadora de Rebalanceamento Inteligente")
     st.info("Insira seu patrimônio atual para o robô calcular os movimentos.")
     
@@ -470,7 +612,7 @@ if st.session_state.run_analysis:
         submit_reb = st.form_submit_button("⚖️ Calcular Rebalanceamento")
         
         if submit_reb:
-            total_pat = current_rf + current_fii + current_stocks + current_exterior + current_crypto + user_amount
+            total_pat = current_rf + current_fii + current_stocks + current_exterior + current_crypto + amount
             recalc_data = []
             for classe, perc in allocation.items():
                 val_idl = total_pat * perc
@@ -490,17 +632,119 @@ if st.session_state.run_analysis:
         if user_premium:
             st.success("✅ Rebalanceamento Calculado com Sucesso!")
             st.table(pd.DataFrame(st.session_state.rebalance_results))
-            st.info(f"Aporte total planejado: R$ {user_amount:.2f}")
+            st.info(f"Aporte total planejado: R$ {amount:.2f}")
         else:
-            st.markdown("""
-            <div class="lock-area">
-                <h3>🔒 Rebalanceamento Inteligente</h3>
-                <p>Veja exatamente quanto comprar/vender de cada ativo para manter sua meta.</p>
-            </div>
-            """, unsafe_allow_html=True)
-            if st.button("💎 Ver Recomendações", key="unlock_rebalance"):
-                st.session_state.show_payment = True
-                st.rerun()
+            render_lock("🔒 Rebalanceamento Inteligente", "Veja exatamente quanto comprar/vender de cada ativo para manter sua meta.", "unlock_rebalance", "💎 Ver Recomendações")
+
+@st.fragment
+def render_asset_rebalance(amount, version):
+    st.subheader("🧮 Rebalanceamento por Ativo (Lotes B3)")
+    st.info("Informe quantas ações você tem de cada ativo e o peso desejado. O aporte da barra lateral entra como caixa.")
+
+    best_stocks = stage_stock_scan('stocks', STOCK_TICKERS, version)
+    if best_stocks is not None:
+        top = best_stocks.head(5)
+        default_holdings = pd.DataFrame({
+            'ticker': top['symbol'].astype(str).values,
+            'quantity': 0,
+            'price': top['price'].values,
+            'target_weight': 100.0 / len(top)
+        })
+    else:
+        default_holdings = pd.DataFrame({'ticker': [], 'quantity': [], 'price': [], 'target_weight': []})
+
+    holdings = st.data_editor(
+        default_holdings,
+        column_config={
+            "ticker": "Ativo",
+            "quantity": st.column_config.NumberColumn("Quantidade Atual", min_value=0, step=1),
+            "price": st.column_config.NumberColumn("Preço (R$)", min_value=0.01, format="R$ %.2f"),
+            "target_weight": st.column_config.NumberColumn("Peso Alvo (%)", min_value=0.0, max_value=100.0)
+        },
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        key="asset_holdings"
+    )
+    col_opt1, col_opt2, col_opt3 = st.columns(3)
+    allow_fractional = col_opt1.checkbox("Usar mercado fracionário", value=True)
+    allow_sells = col_opt2.checkbox("Permitir vendas", value=True)
+    min_order = col_opt3.number_input("Ordem mínima (R$)", value=0.0, min_value=0.0, step=50.0)
+
+    holdings = holdings.dropna(subset=['ticker', 'price'])
+    holdings = holdings[holdings['price'] > 0].fillna({'quantity': 0, 'target_weight': 0})
+    if holdings.empty:
+        return
+    if not user_premium:
+        render_lock("🔒 Ordens por Ativo", "Veja a quantidade exata de ações a comprar/vender, em lotes e no fracionário.", "unlock_asset_rebalance", "💎 Ver Ordens")
+        return
+
+    holdings = holdings.assign(target_weight=holdings['target_weight'] / 100)
+    orders, summary = rebalance_positions(
+        holdings, cash=amount, allow_fractional=allow_fractional,
+        min_order_value=min_order, allow_sells=allow_sells
+    )
+    orders = orders[orders['trade'] != 0]
+    orders = orders.assign(action=orders['trade'].map(lambda t: "COMPRAR" if t > 0 else "VENDER"))
+    st.dataframe(
+        orders[['ticker', 'action', 'lot_shares', 'fractional_shares', 'fractional_ticker', 'order_value', 'final_weight']],
+        column_config={
+            "ticker": "Ativo",
+            "action": "Ação",
+            "lot_shares": "Lote Padrão",
+            "fractional_shares": "Fracionário",
+            "fractional_ticker": "Código Fracionário",
+            "order_value": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f"),
+            "final_weight": st.column_config.NumberColumn("Peso Final", format="%.2%")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    col_r1, col_r2, col_r3 = st.columns(3)
+    col_r1.metric("Compras", f"R$ {summary['buy_value']:,.2f}")
+    col_r2.metric("Vendas", f"R$ {summary['sell_value']:,.2f}")
+    col_r3.metric("Caixa Restante", f"R$ {summary['cash_left']:,.2f}")
+    st.caption(f"Erro de rastreamento em relação aos pesos alvo: {summary['tracking_error']*100:.2f}%")
+
+if st.session_state.run_analysis:
+    version = data_version()
+
+    st.subheader("📊 Alocação Estratégica Sugerida")
+    allocation = stage_allocation(user_risk)
+    st.plotly_chart(stage_allocation_chart(user_risk), width='stretch')
+    
+    st.subheader("🎯 Seleção Tática de Ativos (Top Picks)")
+    tabs = st.tabs(["🇧🇷 Ações Brasil", "🌎 Exterior (BDRs/ETFs)", "₿ Cripto", "🏗️ FIIs"])
+    
+    with tabs[0]: # Stocks
+        render_stocks_tab(allocation, version)
+    with tabs[1]: # International
+        render_bdr_tab(allocation, version)
+    with tabs[2]: # Crypto
+        render_crypto_tab(allocation, version)
+    with tabs[3]: # FIIs
+        render_fii_tab(allocation, version)
+
+    # 4. Renda Fixa
+    st.markdown("---")
+    render_fixed_income(macro_data, user_amount)
+
+    # 5. Risk
+    st.markdown("---")
+    render_risk(user_risk)
+
+    # 6. MONTE CARLO SIMULATION (PROJEÇÃO DE FUTURO)
+    st.markdown("---")
+    render_monte_carlo(user_amount, user_risk)
+
+    # 6.1 PLANEJAMENTO DO OBJETIVO FINANCEIRO
+    st.markdown("---")
+    render_goal_plan(user_amount, user_risk, user_objective, macro_data['ipca'])
+
+    # 7. CALCULADORA DE REBALANCEAMENTO
+    st.markdown("---")
+    render_rebalance(allocation, user_amount)
+    render_asset_rebalance(user_amount, version)
 
 else:
     st.info("👈 Ajuste seu perfil na barra lateral e clique em 'Gerar Carteira Poseidon' para iniciar.")
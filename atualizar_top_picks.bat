@@ -0,0 +1,17 @@
+@echo off
+title Poseidon Investimentos - Top Picks
+echo ====================================================
+echo        POSEIDON INVESTIMENTOS - TOP PICKS (JOB)
+echo ====================================================
+echo.
+REM Job noturno: materializa os rankings de acoes, BDRs, cripto e FIIs
+REM em data\top_picks. Para agendar (todo dia as 03:00):
+REM   schtasks /create /tn "Poseidon Top Picks" /sc daily /st 03:00 /tr "\"%~f0\" agendado"
+REM Com o argumento "agendado" o script nao espera tecla no final.
+cd /d "%~dp0"
+if /i "%~1"=="agendado" (
+    "%LOCALAPPDATA%\Programs\Python\Python312\python.exe" -m src.top_picks
+    exit /b %errorlevel%
+)
+"%LOCALAPPDATA%\Programs\Python\Python312\python.exe" -m src.top_picks %*
+pause
@@ -0,0 +1,64 @@
+"""
+Benchmark do payload dos gráficos de séries temporais.
+
+Compara, para horizontes de 1, 10 e 30 anos:
+  - antes: px.line com 50 caminhos completos do Monte Carlo;
+  - depois: fan_chart (faixa P10-P90 + mediana + 5 caminhos, no máximo
+    MAX_POINTS pontos por trace).
+
+Mede o tamanho do JSON do Plotly enviado ao navegador e o tempo de montar e
+serializar a figura no servidor. (O tempo de desenho no navegador cresce com
+o número de pontos, que também é reportado.)
+
+Uso:
+    python -m benchmarks.bench_charts [--repeat 5]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.harness import measure, print_results, save_results
+
+HORIZONS = [1, 10, 30]
+LEGACY_SAMPLE_PATHS = 50
+
+def legacy_figure(paths):
+    import plotly.express as px
+
+    return px.line(paths[:, :LEGACY_SAMPLE_PATHS], labels={'index': 'Dias', 'value': 'Patrimônio (R$)'})
+
+def decimated_figure(paths):
+    from src.chart_data import fan_chart, fan_chart_data
+
+    data = fan_chart_data(paths, x=np.arange(paths.shape[0]) / 252)
+    return fan_chart(data, "", "Anos", "Patrimônio (R$)")
+
+def figure_points(fig):
+    return sum(len(trace.x) if trace.x is not None else len(trace.y) for trace in fig.data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Payload dos gráficos antes/depois da redução de pontos.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from src.quant_engine import run_monte_carlo
+
+    results = {}
+    for years in HORIZONS:
+        paths = run_monte_carlo(10000, 0.14, 0.12, years=years)
+        for label, build in (("legacy", legacy_figure), ("decimated", decimated_figure)):
+            fig = build(paths)
+            payload = len(fig.to_json())
+            stats = measure(lambda: build(paths).to_json(), repeat=args.repeat)
+            stats.update({'payload_kb': payload / 1024, 'points': figure_points(fig), 'traces': len(fig.data)})
+            results[f"chart.monte_carlo.{years}y.{label}"] = stats
+            print(f"{years:>2} anos  {label:<9}  {payload / 1024:>8.1f} KB  {stats['points']:>7} pontos  "
+                  f"{stats['median_ms']:>7.1f} ms")
+
+    print()
+    print_results(results)
+    path = save_results("charts", results)
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark offline de todos os motores, sobre fixtures gravadas (ou
+sintéticas, sem gravação: ver benchmarks.fixtures).
+
+Mede latência e vazão de:
+  - loaders (fundamentos/cotações, FIIs, macro) com cache frio e quente;
+  - score_stocks e score_crypto;
+  - scanner técnico (get_technical_signals) no universo de ações;
+  - run_monte_carlo e run_portfolio_monte_carlo em vários horizontes e quantidades de caminhos;
+  - run_goal_simulation (30 anos) com passo diário, semanal e mensal;
+  - run_sensitivity_grid (grade what-if inteira num cálculo);
+  - get_optimized_allocation com várias quantidades de ativos;
+  - rebalance_positions (rebalanceamento por ativo) em carteiras grandes.
+
+Uso:
+    python -m benchmarks.bench_engines [--fixtures DIR] [--compare results/x.json]
+
+Os resultados vão para benchmarks/results/engines-<data>.json.
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from benchmarks.fixtures import FIXTURES_DIR, replay
+from benchmarks.harness import compare_results, measure, print_results, save_results
+
+MC_HORIZONS = [1, 10, 30]
+MC_PATHS = [1000, 5000]
+OPTIMIZER_SIZES = [2, 5, 10, 20]
+SCORE_SIZES = [20, 1000]
+REBALANCE_SIZES = [50, 500, 5000]
+
+def clear_caches():
+    st.cache_data.clear()
+
+def bench_loaders(results, store, repeat):
+    from src.data_loader import get_batch_asset_data, get_macro_indicators
+    from src.fii_loader import get_fii_batch
+    from src.universe import UNIVERSES, FII_TICKERS
+
+    for universe, tickers in UNIVERSES.items():
+        results[f"loader.asset_data.{universe}.cold"] = measure(
+            lambda: get_batch_asset_data(tickers), repeat=repeat, items=len(tickers), setup=clear_caches)
+        results[f"loader.asset_data.{universe}.warm"] = measure(
+            lambda: get_batch_asset_data(tickers), repeat=repeat, items=len(tickers))
+
+    results["loader.fii_batch.cold"] = measure(
+        lambda: get_fii_batch(FII_TICKERS), repeat=repeat, items=len(FII_TICKERS), setup=clear_caches)
+    results["loader.fii_batch.warm"] = measure(
+        lambda: get_fii_batch(FII_TICKERS), repeat=repeat, items=len(FII_TICKERS))
+    results["loader.macro"] = measure(get_macro_indicators, repeat=repeat)
+
+def bench_scoring(results, repeat):
+    from src.analyzer import score_stocks, score_crypto
+    from src.data_loader import get_batch_asset_data
+    from src.universe import STOCK_TICKERS, CRYPTO_TICKERS
+
+    stocks = get_batch_asset_data(STOCK_TICKERS)
+    crypto = get_batch_asset_data(CRYPTO_TICKERS)
+    for size in SCORE_SIZES:
+        # Replica o universo gravado até o tamanho pedido
+        frame = pd.concat([stocks] * (size // max(len(stocks), 1) + 1), ignore_index=True).head(size)
+        results[f"analyzer.score_stocks.n{size}"] = measure(lambda: score_stocks(frame), repeat=repeat, items=size)
+    results["analyzer.score_crypto"] = measure(lambda: score_crypto(crypto), repeat=repeat, items=len(crypto))
+
+def bench_technical(results, repeat):
+    from src.technical_engine import get_technical_signals
+    from src.universe import STOCK_TICKERS
+
+    try:
+        import pandas_ta  # noqa: F401
+    except ImportError:
+        results["technical.scan.stocks"] = {'skipped': "pandas_ta não instalado"}
+        return
+
+    results["technical.scan.stocks"] = measure(
+        lambda: [get_technical_signals(t) for t in STOCK_TICKERS],
+        repeat=repeat, items=len(STOCK_TICKERS), setup=clear_caches)
+
+def bench_monte_carlo(results, repeat):
+    from src.allocator import get_allocation_strategy
+    from src.quant_engine import (
+        STEPS_PER_YEAR, run_goal_simulation, run_monte_carlo, run_portfolio_monte_carlo, run_sensitivity_grid
+    )
+
+    weights = get_allocation_strategy("Moderado")
+
+    for years in MC_HORIZONS:
+        for sims in MC_PATHS:
+            results[f"quant.monte_carlo.{years}y.{sims}p"] = measure(
+                lambda: run_monte_carlo(10000, 0.14, 0.12, years=years, simulations=sims),
+                repeat=repeat, items=sims)
+            results[f"quant.portfolio_monte_carlo.{years}y.{sims}p"] = measure(
+                lambda: run_portfolio_monte_carlo(10000, weights, years=years, simulations=sims),
+                repeat=repeat, items=sims)
+
+    for step in STEPS_PER_YEAR:
+        results[f"quant.goal_simulation.30y.{step}"] = measure(
+            lambda: run_goal_simulation(10000, 0.13, 0.12, years=30, monthly_contribution=1000,
+                                        goal=1e6, step=step),
+            repeat=repeat, items=1000)
+
+    returns, vols, horizons = np.arange(0.06, 0.22, 0.02), np.arange(0.04, 0.44, 0.04), np.arange(1, 31)
+    grid_points = len(returns) * len(vols) * len(horizons)
+    results[f"quant.sensitivity_grid.{grid_points}pts"] = measure(
+        lambda: run_sensitivity_grid(10000, returns, vols, horizons), repeat=repeat, items=grid_points)
+
+def bench_optimizer(results, store, repeat):
+    from src.quant_engine import get_optimized_allocation
+
+    available = list(store.history["Close"].dropna(axis=1, thresh=int(0.9 * len(store.history))).columns)
+    for size in OPTIMIZER_SIZES:
+        if size > len(available):
+            results[f"quant.optimizer.n{size}"] = {'skipped': f"fixture só tem {len(available)} ativos"}
+            continue
+        tickers = available[:size]
+        results[f"quant.optimizer.n{size}"] = measure(
+            lambda: get_optimized_allocation(tickers, "Moderado"), repeat=repeat, items=size)
+
+def bench_rebalancer(results, repeat):
+    from src.rebalancer import rebalance_positions
+
+    rng = np.random.default_rng(0)
+    for size in REBALANCE_SIZES:
+        holdings = pd.DataFrame({
+            'ticker': [f"ATV{i}.SA" for i in range(size)],
+            'quantity': rng.integers(0, 2000, size),
+            'price': rng.uniform(2, 150, size),
+            'target_weight': rng.dirichlet(np.ones(size))
+        })
+        results[f"rebalancer.fractional.n{size}"] = measure(
+            lambda: rebalance_positions(holdings, cash=50000), repeat=repeat, items=size)
+        results[f"rebalancer.round_lots.n{size}"] = measure(
+            lambda: rebalance_positions(holdings, cash=50000, allow_fractional=False, min_order_value=100),
+            repeat=repeat, items=size)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline dos motores Poseidon.")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar.")
+    args = parser.parse_args()
+
+    np.random.seed(42)
+    results = {}
+    with replay(args.fixtures) as store:
+        bench_loaders(results, store, args.repeat)
+        bench_scoring(results, args.repeat)
+        bench_technical(results, args.repeat)
+        bench_monte_carlo(results, args.repeat)
+        bench_optimizer(results, store, args.repeat)
+        bench_rebalancer(results, args.repeat)
+
+    print_results(results)
+    path = save_results("engines", results, {'fixtures_recorded_at': store.manifest.get('recorded_at'),
+                                             'fixtures_synthetic': store.manifest.get('synthetic', False)})
+    print(f"\nResultados gravados em {path}")
+
+    if args.compare and compare_results(results, args.compare):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
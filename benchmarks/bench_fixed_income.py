@@ -0,0 +1,105 @@
+"""
+Benchmark do comparador de renda fixa (src.fixed_income) numa tabela grande
+de ofertas sintéticas (padrão: 20.000 CDB/LCI/LCA/Tesouro).
+
+Compara:
+  - por_oferta: o cálculo oferta a oferta em Python (uma linha do DataFrame
+    por vez, IR pelo prazo com if/elif), como o comparador de duas taxas do
+    app faria repetido para cada oferta;
+  - vetorizado: rank_offers (uma passada sobre arrays + ordenação).
+Mede também a leitura/normalização do CSV (load_offers) e confere que os dois
+caminhos dão o mesmo ranking.
+
+Uso:
+    python -m benchmarks.bench_fixed_income [--offers 20000] [--repeat 5]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.harness import measure, print_results, save_results
+
+PRODUCTS = [("CDB", "CDI"), ("CDB", "PRE"), ("CDB", "IPCA"), ("LCI", "CDI"), ("LCA", "CDI"),
+            ("LCA", "PRE"), ("TESOURO SELIC", "SELIC"), ("TESOURO IPCA+", "IPCA"), ("TESOURO PREFIXADO", "PRE")]
+MACRO = {'selic': 15.0, 'ipca': 5.0}
+
+def synthetic_offers_csv(n, seed=0):
+    """CSV no formato de uma corretora brasileira (";" e decimal ",")."""
+    rng = np.random.default_rng(seed)
+    kinds = rng.integers(len(PRODUCTS), size=n)
+    lines = ["Emissor;Produto;Indexador;Taxa;Prazo;Aplicação mínima"]
+    for i, k in enumerate(kinds):
+        product, indexer = PRODUCTS[k]
+        rate = {"CDI": rng.uniform(85, 130), "PRE": rng.uniform(11, 16),
+                "IPCA": rng.uniform(5, 8), "SELIC": rng.uniform(0, 0.2)}[indexer]
+        days = int(rng.choice([90, 180, 365, 540, 720, 1080, 1800]))
+        minimum = float(rng.choice([0, 100, 1000, 5000, 25000]))
+        lines.append(f"Banco {i % 300};{product};{indexer};{rate:.2f}".replace(".", ",")
+                     + f";{days};{minimum:.2f}".replace(".", ","))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def per_offer_rank(offers, macro):
+    """Uma oferta por vez, em Python puro."""
+    from src.fixed_income import BUSINESS_DAYS, CDI_SPREAD, TAX_EXEMPT
+
+    selic, ipca = macro['selic'] / 100, macro['ipca'] / 100
+    cdi = (macro['selic'] - CDI_SPREAD) / 100
+    rows = []
+    for _, offer in offers.iterrows():
+        rate, days = offer['taxa'] / 100, offer['prazo_dias']
+        if offer['indexador'] == "CDI":
+            gross = (1 + ((1 + cdi) ** (1 / BUSINESS_DAYS) - 1) * rate) ** BUSINESS_DAYS - 1
+        elif offer['indexador'] == "PRE":
+            gross = rate
+        elif offer['indexador'] == "IPCA":
+            gross = (1 + ipca) * (1 + rate) - 1
+        else:
+            gross = (1 + selic) * (1 + rate) - 1
+        if offer['produto'].startswith(TAX_EXEMPT):
+            tax = 0.0
+        elif days <= 180:
+            tax = 0.225
+        elif days <= 360:
+            tax = 0.20
+        elif days <= 720:
+            tax = 0.175
+        else:
+            tax = 0.15
+        gain = (1 + gross) ** (days / 365) - 1
+        net = (1 + gain * (1 - tax)) ** (365 / days) - 1
+        rows.append((net * 100, offer.name))
+    rows.sort(key=lambda r: -r[0])
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparador de renda fixa: oferta a oferta x vetorizado.")
+    parser.add_argument("--offers", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from src.fixed_income import load_offers, rank_offers
+
+    data = synthetic_offers_csv(args.offers)
+    offers = load_offers(data)
+    n = len(offers)
+
+    results = {
+        'load_offers.csv': measure(lambda: load_offers(data), repeat=args.repeat, items=n),
+        'rank.per_offer': measure(lambda: per_offer_rank(offers, MACRO), repeat=max(1, args.repeat // 2), items=n),
+        'rank.vectorized': measure(lambda: rank_offers(offers, MACRO), repeat=args.repeat, items=n),
+    }
+    # Ofertas empatadas (ex.: mesma LCI em prazos diferentes) podem trocar de
+    # lugar por arredondamento: compara a taxa líquida em cada posição
+    expected = np.array([net for net, _ in per_offer_rank(offers, MACRO)])
+    same = bool(np.allclose(rank_offers(offers, MACRO)['taxa_liquida_aa'].to_numpy(), expected, rtol=0, atol=1e-9))
+
+    print(f"{n} ofertas; ranking idêntico ao cálculo oferta a oferta: {same}")
+    print_results(results)
+    speedup = results['rank.per_offer']['median_ms'] / results['rank.vectorized']['median_ms']
+    print(f"\nVetorizado {speedup:.0f}x mais rápido")
+
+    path = save_results("fixed_income", results, {'offers': n, 'same_ranking': same})
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark do histórico de fundamentos (src.fundamentals_history).
+
+Grava --refreshes atualizações diárias de um universo sintético de --assets
+ativos num diretório temporário e mede:
+  - gravação de um segmento (uma atualização do universo);
+  - espaço em disco: segmentos zstd x o mesmo histórico em Arrow sem compressão;
+  - carga do índice (todos os segmentos) e compactação;
+  - consulta as-of do universo inteiro: searchsorted na chave (ticker, data)
+    x o jeito pandas (filtra até D, ordena e pega o último por ticker).
+Confere que as duas consultas devolvem os mesmos registros.
+
+Uso:
+    python -m benchmarks.bench_fundamentals_history [--assets 2000] [--refreshes 250] [--repeat 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.bench_screening import synthetic_infos
+from benchmarks.harness import measure, print_results, save_results
+
+def synthetic_refreshes(n, refreshes, seed=0):
+    """Universo inicial + uma deriva diária de P/L, ROE, DY e preço."""
+    from src.asset_records import AssetBatch, AssetSnapshot
+
+    tickers = [f"ATV{i}.SA" for i in range(n)]
+    base = AssetBatch.from_records(
+        [AssetSnapshot.from_info(t, info) for t, info in zip(tickers, synthetic_infos(n, seed))]
+    ).to_frame()
+    rng = np.random.default_rng(seed + 1)
+    for day in range(refreshes):
+        drift = np.exp(rng.normal(0, 0.01, size=n)).astype(np.float32)
+        base = base.assign(pe_ratio=base['pe_ratio'] * drift, price=base['price'] * drift,
+                           roe=base['roe'] + rng.normal(0, 0.002, size=n).astype(np.float32))
+        # Alguns ativos só entram no histórico no meio do período (IPOs)
+        yield base.iloc[: n - max(0, (refreshes - day) * n // (4 * refreshes))]
+
+def pandas_as_of(history, date):
+    cutoff = pd.Timestamp(date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    known = history[history['recorded_at'] <= cutoff]
+    return known.sort_values(['symbol', 'recorded_at'], kind='stable').groupby('symbol', observed=True).tail(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Histórico de fundamentos: gravação, espaço e consultas as-of.")
+    parser.add_argument("--assets", type=int, default=2000)
+    parser.add_argument("--refreshes", type=int, default=250, help="Atualizações diárias gravadas.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from streamlit.logger import set_log_level
+    set_log_level("error")
+    from src import fundamentals_history as fh
+
+    start_day = pd.Timestamp("2025-01-01")
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(fh, "HISTORY_DIR", tmp):
+        write_times = []
+        for day, frame in enumerate(synthetic_refreshes(args.assets, args.refreshes)):
+            start = time.perf_counter()
+            fh.record_fundamentals(frame, recorded_at=start_day + pd.Timedelta(days=day, hours=20))
+            write_times.append(time.perf_counter() - start)
+
+        segments = fh._segments()
+        compressed = sum(os.path.getsize(os.path.join(tmp, s)) for s in segments)
+        index = fh._load(segments)
+        history = index.frame
+        raw = pa.BufferOutputStream()
+        table = pa.Table.from_pandas(history, preserve_index=False)
+        with pa.ipc.new_file(raw, table.schema) as writer:
+            writer.write_table(table)
+        uncompressed = raw.getvalue().size
+
+        query_day = str((start_day + pd.Timedelta(days=args.refreshes // 2)).date())
+        rows = len(fh.as_of(query_day, index=index))
+        results = {
+            'record.segment': {'repeat': len(write_times), 'items': args.assets,
+                               'min_ms': float(np.min(write_times) * 1000),
+                               'median_ms': float(np.median(write_times) * 1000),
+                               'p95_ms': float(np.percentile(write_times, 95) * 1000),
+                               'throughput_per_s': args.assets / float(np.median(write_times))},
+            'load.index': measure(lambda: fh._load(segments), repeat=args.repeat, items=len(index),
+                                  setup=fh._load.clear),
+            'as_of.searchsorted': measure(lambda: fh.as_of(query_day, index=index), repeat=args.repeat, items=rows),
+            'as_of.pandas': measure(lambda: pandas_as_of(history, query_day), repeat=args.repeat, items=rows),
+        }
+
+        fast = fh.as_of(query_day, index=index)
+        slow = pandas_as_of(history, query_day)
+        same = (fast['symbol'].astype(str).tolist() == slow['symbol'].astype(str).tolist()
+                and fast['recorded_at'].tolist() == slow['recorded_at'].tolist()
+                and np.array_equal(fast['pe_ratio'].to_numpy(), slow['pe_ratio'].to_numpy()))
+
+        start = time.perf_counter()
+        fh.compact()
+        compact_s = time.perf_counter() - start
+        fh._load.clear()
+        same_after_compact = fh.as_of(query_day)['pe_ratio'].tolist() == fast['pe_ratio'].tolist()
+
+    print(f"{len(index)} registros ({args.assets} ativos x {args.refreshes} atualizações), {len(segments)} segmentos")
+    print(f"Disco: {compressed / 2**20:.1f} MB com zstd x {uncompressed / 2**20:.1f} MB sem compressão "
+          f"({uncompressed / compressed:.1f}x)")
+    print(f"as-of {query_day}: {rows} ativos; idêntico ao pandas: {same}; após compactar: {same_after_compact}")
+    print(f"Compactação: {compact_s * 1000:.0f} ms")
+    print_results(results)
+
+    path = save_results("fundamentals_history", results, {
+        **vars(args), 'rows': len(index), 'bytes_zstd': compressed, 'bytes_uncompressed': uncompressed,
+        'compact_ms': compact_s * 1000, 'same_as_pandas': same, 'same_after_compact': same_after_compact
+    })
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark de tempo de import da tela de login.
+
+Mede, em processos novos com `python -X importtime`, via AppTest:
+  1. Um app Streamlit puro de uma linha (linha de base);
+  2. A renderização da tela de login do app.py (sem usuário).
+
+O custo extra da tela de login é o tempo próprio dos módulos que o app puro
+não importa. Cada lado roda --repeat vezes, alternados, e o orçamento usa o
+mínimo: a diferença entre dois totais de ~400 ms (quase tudo do próprio
+Streamlit) variava mais que o orçamento de uma execução para outra, e o
+ruído (GC, disputa de CPU) só soma tempo.
+Falha (exit 1) se a tela de login passar do orçamento sobre a linha de base
+ou se algum motor pesado for importado além dos que o Streamlit já carrega.
+
+Uso: python -m benchmarks.bench_imports [--budget-ms 50] [--repeat 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import statistics
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que a tela de login nunca deve carregar
+HEAVY_MODULES = [
+    "yfinance", "pandas_ta", "scipy", "plotly", "bcb", "bs4",
+    "googleapiclient", "google_auth_oauthlib", "mercadopago", "qrcode"
+]
+
+APP_TEMPLATE = """
+import sys
+from streamlit.testing.v1 import AppTest
+at = {factory}.run()
+assert not at.exception, at.exception
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print('HEAVY_LOADED=' + ','.join(loaded))
+"""
+
+BASELINE_CODE = APP_TEMPLATE.format(
+    factory="AppTest.from_string('import streamlit as st\\nst.title(\"Poseidon\")')",
+    heavy=HEAVY_MODULES
+)
+LOGIN_CODE = APP_TEMPLATE.format(
+    factory="AppTest.from_file('app.py', default_timeout=60)",
+    heavy=HEAVY_MODULES
+)
+
+def heavy_loaded(stdout):
+    for line in stdout.splitlines():
+        if line.startswith("HEAVY_LOADED="):
+            return set(filter(None, line.split("=", 1)[1].split(",")))
+    return set()
+
+def run_importtime(code):
+    """
+    Roda o código num processo novo e retorna
+    (total_import_us, top_imports, stdout, wall_s, {módulo: self_us}).
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+
+    total_us = 0
+    imports = []
+    modules = {}
+    for line in proc.stderr.splitlines():
+        # Formato: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        modules[name.strip()] = int(self_us)
+        # Só os pacotes de nível superior (sem indentação extra) entram no ranking
+        if not name[1:].startswith(" "):
+            imports.append((int(cumulative_us), name.strip()))
+    imports.sort(reverse=True)
+    return total_us, imports[:10], proc.stdout, wall, modules
+
+def main():
+    parser = argparse.ArgumentParser(description="Orçamento de import da tela de login.")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="Tempo de import permitido acima do app Streamlit puro (ms).")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Processos medidos por lado (o orçamento usa o mínimo).")
+    args = parser.parse_args()
+
+    base_runs, login_runs = [], []
+    for _ in range(max(args.repeat, 1)):
+        # Alternados: uma variação lenta da máquina afeta os dois lados igualmente
+        base_runs.append(run_importtime(BASELINE_CODE))
+        login_runs.append(run_importtime(LOGIN_CODE))
+    base_heavy = set().union(*(heavy_loaded(run[2]) for run in base_runs))
+    login_heavy = set().union(*(heavy_loaded(run[2]) for run in login_runs))
+    heavy = ", ".join(sorted(login_heavy - base_heavy))
+
+    # Módulos que o app puro carrega em alguma execução não contam como extra
+    base_modules = set().union(*(run[4] for run in base_runs))
+    extras = [sum(us for name, us in run[4].items() if name not in base_modules) / 1000 for run in login_runs]
+    extra_ms = min(extras)
+
+    base_us = statistics.median(run[0] for run in base_runs)
+    login_us = statistics.median(run[0] for run in login_runs)
+    _, login_top, _, login_wall, _ = min(login_runs, key=lambda run: run[0])
+    base_wall = min(run[3] for run in base_runs)
+    print(f"App puro:        {base_us / 1000:8.1f} ms de import, mediana de {len(base_runs)} ({base_wall:.2f}s de processo)")
+    print(f"Tela de login:   {login_us / 1000:8.1f} ms de import, mediana de {len(login_runs)} ({login_wall:.2f}s de processo)")
+    print(f"Extra do login:  {extra_ms:8.1f} ms, mínimo (mediana {statistics.median(extras):.1f} ms; "
+          f"execuções: {', '.join(f'{e:.0f}' for e in extras)}; orçamento: {args.budget_ms:.0f} ms)")
+    print("\nMaiores imports da tela de login (cumulativo):")
+    for cumulative_us, name in login_top:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if heavy:
+        print(f"\n[FALHA] Motores pesados importados antes do login: {heavy}")
+        failed = True
+    if extra_ms > args.budget_ms:
+        print(f"\n[FALHA] Tela de login estourou o orçamento de import.")
+        failed = True
+    if not failed:
+        print("\nOrçamento de import: OK")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
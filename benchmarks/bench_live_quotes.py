@@ -0,0 +1,161 @@
+"""
+Benchmark da ingestão incremental de cotações (src.live_quotes) num universo
+grande (padrão: 5.000 ativos sintéticos com 120 pregões de histórico).
+
+Compara, por lote de --batch cotações:
+  - incremental: LiveScreen.apply (só os ativos tocados e os que mudam de rank);
+  - rebuild: o que o app fazia a cada expiração do cache, com as mesmas
+    cotações: preço + P/L reprecificados no universo inteiro, score_stocks e
+    RSI14/EMA50 recalculados em pandas para todos os ativos (mesmas fórmulas
+    do pandas_ta).
+Ao fim confere que o Top N e os sinais técnicos dos dois caminhos são iguais.
+
+Uso:
+    python -m benchmarks.bench_live_quotes [--assets 5000] [--batches 50] [--batch 100]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_screening import synthetic_infos
+from benchmarks.harness import print_results, save_results
+
+def synthetic_universe(n, days, seed=0):
+    from src.asset_records import AssetBatch, AssetSnapshot
+
+    tickers = [f"ATV{i}.SA" for i in range(n)]
+    frame = AssetBatch.from_records(
+        [AssetSnapshot.from_info(t, info) for t, info in zip(tickers, synthetic_infos(n, seed))]
+    ).to_frame()
+    rng = np.random.default_rng(seed + 1)
+    start = frame['price'].to_numpy(dtype=float)
+    paths = start * np.exp(np.cumsum(rng.normal(0, 0.02, size=(days, n)), axis=0))
+    closes = pd.DataFrame(paths, columns=tickers, index=pd.bdate_range("2026-01-01", periods=days))
+    return frame, closes
+
+def synthetic_feed(closes, batches, batch, seed=0):
+    """Lotes (ticker, preço, dia): metade do dia do último candle, metade do dia seguinte."""
+    rng = np.random.default_rng(seed + 2)
+    tickers = closes.columns.to_numpy()
+    last = closes.iloc[-1].to_numpy()
+    today, tomorrow = str(closes.index[-1].date()), str((closes.index[-1] + pd.offsets.BDay()).date())
+    feed = []
+    for b in range(batches):
+        day = today if b < batches // 2 else tomorrow
+        picks = rng.choice(len(tickers), size=batch, replace=False)
+        feed.append([(str(tickers[i]), float(last[i] * np.exp(rng.normal(0, 0.01))), day) for i in picks])
+    return feed
+
+def ta_rsi(close, length):
+    """pandas_ta.rsi: rma (ewm alpha=1/n, adjust=True, min_periods=n) dos ganhos/perdas."""
+    diff = close.diff()
+    gain = diff.clip(lower=0).ewm(alpha=1 / length, min_periods=length).mean()
+    loss = (-diff.clip(upper=0)).ewm(alpha=1 / length, min_periods=length).mean()
+    return 100 * gain / (gain + loss)
+
+def ta_ema(close, length):
+    """pandas_ta.ema (sma=True): semente pela média simples, depois ewm(adjust=False)."""
+    seeded = close.copy()
+    seeded.iloc[:length - 1] = np.nan
+    seeded.iloc[length - 1] = close.iloc[:length].mean()
+    return seeded.ewm(span=length, adjust=False).mean()
+
+class Rebuild:
+    """Estado do caminho antigo: universo + candles diários, tudo recalculado por lote."""
+
+    def __init__(self, frame, closes):
+        self.frame = frame
+        self.eps = np.where(frame['pe_ratio'] != 0, frame['price'] / frame['pe_ratio'], np.nan)
+        self.closes = closes.copy()
+        self.quotes = {}
+
+    def ingest(self, batch):
+        for ticker, price, day in batch:
+            day = pd.Timestamp(day)
+            if day > self.closes.index[-1]:
+                self.closes.loc[day] = self.closes.iloc[-1] # candle novo, preços do dia anterior
+            self.closes.at[day, ticker] = price
+            self.quotes[ticker] = price
+
+    def apply(self, batch):
+        from src.analyzer import score_stocks
+        from src.technical_engine import EMA_LENGTH, RSI_LENGTH, classify_signal
+
+        self.ingest(batch)
+        df = self.frame.copy()
+        price = df['symbol'].astype(str).map(self.quotes).fillna(df['price']).to_numpy(dtype=float)
+        df['price'] = price
+        df['pe_ratio'] = np.where(np.isnan(self.eps), df['pe_ratio'], price / self.eps)
+        best = score_stocks(df)
+
+        rsi = self.closes.apply(lambda c: ta_rsi(c, RSI_LENGTH)).iloc[-1]
+        ema = self.closes.apply(lambda c: ta_ema(c, EMA_LENGTH)).iloc[-1]
+        last = self.closes.iloc[-1]
+        signals = {t: classify_signal(last[t], rsi[t], ema[t]) for t in self.closes.columns}
+        return best, signals
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão incremental de cotações x recálculo completo.")
+    parser.add_argument("--assets", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=120, help="Pregões de histórico por ativo.")
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=100, help="Cotações por lote.")
+    parser.add_argument("--rebuilds", type=int, default=3, help="Lotes medidos no caminho antigo (é lento).")
+    args = parser.parse_args()
+
+    from src.live_quotes import LiveScreen
+
+    frame, closes = synthetic_universe(args.assets, args.days)
+    feed = synthetic_feed(closes, args.batches, args.batch)
+
+    start = time.perf_counter()
+    screen = LiveScreen(frame, closes)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    incremental = []
+    for batch in feed:
+        start = time.perf_counter()
+        screen.apply(batch)
+        incremental.append(time.perf_counter() - start)
+
+    rebuild = Rebuild(frame, closes)
+    # Os primeiros lotes entram sem medir: só os últimos --rebuilds são cronometrados
+    rebuild_times = []
+    for i, batch in enumerate(feed):
+        if i < len(feed) - args.rebuilds:
+            rebuild.ingest(batch)
+            continue
+        start = time.perf_counter()
+        best, signals = rebuild.apply(batch)
+        rebuild_times.append(time.perf_counter() - start)
+
+    def stats(timings):
+        timings = np.array(timings)
+        median = float(np.median(timings))
+        return {'repeat': len(timings), 'items': args.batch, 'min_ms': float(timings.min() * 1000),
+                'median_ms': median * 1000, 'p95_ms': float(np.percentile(timings, 95) * 1000),
+                'throughput_per_s': args.batch / median if median > 0 else None}
+
+    results = {'apply.incremental': stats(incremental), 'apply.rebuild': stats(rebuild_times)}
+
+    top, _ = screen.top_frame()
+    same_top = top['symbol'].astype(str).tolist() == best['symbol'].astype(str).tolist()
+    mismatches = [s for s in screen.symbols if screen.signals[screen.index[s]] != signals[s]]
+
+    print(f"Montagem da tela ({args.assets} ativos, {args.days} pregões): {build_ms:.0f} ms")
+    print(f"Top N idêntico ao recálculo completo: {same_top}")
+    print(f"Sinais técnicos divergentes: {len(mismatches)} {mismatches[:5]}")
+    print_results(results)
+    speedup = results['apply.rebuild']['median_ms'] / results['apply.incremental']['median_ms']
+    print(f"\nIncremental {speedup:.0f}x mais rápido por lote")
+
+    path = save_results("live_quotes", results, {
+        'assets': args.assets, 'days': args.days, 'batches': args.batches, 'batch': args.batch,
+        'build_ms': build_ms, 'same_top': same_top, 'signal_mismatches': len(mismatches)
+    })
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Benchmark do login com Google sob uma rajada de logins, contra um stub local.
+
+O stub (HTTP/1.1 com keep-alive) faz o papel do Google: /token, /userinfo e
+o documento de discovery do oauth2 v2. Cada conexão nova paga --handshake-ms
+(simula TCP + TLS até o Google) e cada requisição paga --latency-ms.
+
+Compara:
+  - legacy: o fluxo antigo de src.google_auth (config refeita a cada chamada,
+    authorization_url gerada duas vezes, Flow novo na volta e
+    googleapiclient.discovery.build buscando o discovery a cada login);
+  - atual: get_login_url + get_user_info (config em cache, uma URL,
+    token + userinfo direto numa requests.Session com pool).
+Reporta p50/p95 por login, logins/s e conexões abertas no stub.
+
+Uso:
+    python -m benchmarks.bench_login [--logins 200] [--concurrency 20] [--latency-ms 20] [--handshake-ms 40]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from benchmarks.harness import save_results
+
+STUB_SECRETS = {"client_id": "stub-client.apps.googleusercontent.com", "client_secret": "stub-secret",
+                "redirect_uri": "http://localhost:8501/"}
+
+class OAuthStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency_ms, handshake_ms):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.latency = latency_ms / 1000
+        self.handshake = handshake_ms / 1000
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = {}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def discovery_document(self):
+        import googleapiclient
+
+        path = os.path.join(os.path.dirname(googleapiclient.__file__), "discovery_cache", "documents", "oauth2.v2.json")
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f)
+        doc["rootUrl"] = doc["baseUrl"] = f"{self.url}/"
+        return doc
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive: uma conexão atende vários pedidos
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.handshake)
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode()
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, name):
+        with self.server.lock:
+            self.server.requests[name] = self.server.requests.get(name, 0) + 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._count("token")
+        self._reply({"access_token": f"stub-token-{time.perf_counter_ns()}", "token_type": "Bearer",
+                     "expires_in": 3599, "scope": " ".join(_scopes())})
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.startswith("/discovery"):
+            self._count("discovery")
+            self._reply(self.server.discovery_document())
+        else:
+            self._count("userinfo")
+            self._reply({"id": "1", "email": "burst@poseidon.ai", "verified_email": True,
+                         "name": "Burst", "picture": None})
+
+def _scopes():
+    from src.google_auth import SCOPES
+    return SCOPES
+
+def _stub_config():
+    return {"web": {
+        "client_id": STUB_SECRETS["client_id"], "client_secret": STUB_SECRETS["client_secret"],
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth", "token_uri": "",
+        "redirect_uris": [STUB_SECRETS["redirect_uri"]]
+    }}
+
+def legacy_login(stub_url):
+    """Fluxo antigo de src.google_auth, apontado para o stub."""
+    import base64
+    import hashlib
+    import hmac
+    from google_auth_oauthlib.flow import Flow
+    from googleapiclient.discovery import build
+
+    def create_flow(state=None):
+        client_config = {"web": {
+            "client_id": STUB_SECRETS["client_id"], "client_secret": STUB_SECRETS["client_secret"],
+            "auth_uri": "https://accounts.google.com/o/oauth2/auth", "token_uri": f"{stub_url}/token",
+            "redirect_uris": [STUB_SECRETS["redirect_uri"]],
+        }}
+        return Flow.from_client_config(client_config, scopes=_scopes(),
+                                       redirect_uri=STUB_SECRETS["redirect_uri"], state=state)
+
+    def sign(state):
+        signature = hmac.new(STUB_SECRETS["client_secret"].encode(), state.encode(), hashlib.sha256).digest()
+        return f"{state}.{base64.urlsafe_b64encode(signature).decode().strip('=')}"
+
+    # get_login_url: duas authorization_url
+    flow = create_flow()
+    _, state = flow.authorization_url(prompt='consent')
+    signed_state = sign(state)
+    flow.authorization_url(prompt='consent', state=signed_state)
+
+    # get_user_info: Flow novo + fetch_token + discovery/build + userinfo
+    flow = create_flow(state=signed_state)
+    flow.fetch_token(code="stub-code")
+    service = build('oauth2', 'v2', credentials=flow.credentials, static_discovery=False, cache_discovery=False,
+                    discoveryServiceUrl=f"{stub_url}/discovery/{{api}}/{{apiVersion}}/rest")
+    return service.userinfo().get().execute()
+
+def current_login(stub_url):
+    from src import google_auth
+
+    url = google_auth.get_login_url()
+    signed_state = parse_qs(urlparse(url).query)["state"][0]
+    return google_auth.get_user_info("stub-code", signed_state)
+
+def burst(login, stub, logins, concurrency):
+    latencies = []
+    stub.connections = 0
+    stub.requests = {}
+
+    def one(_):
+        start = time.perf_counter()
+        info = login(stub.url)
+        latencies.append(time.perf_counter() - start)
+        if not info or info.get("email") != "burst@poseidon.ai":
+            raise RuntimeError(f"Login falhou: {info}")
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(logins)))
+    wall = time.perf_counter() - wall_start
+
+    ms = np.array(latencies) * 1000
+    return {
+        'logins': logins, 'concurrency': concurrency,
+        'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95)),
+        'logins_per_s': logins / wall, 'connections': stub.connections, 'requests': dict(stub.requests)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência do login com Google numa rajada (stub local).")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latência por requisição no stub.")
+    parser.add_argument("--handshake-ms", type=float, default=40.0, help="Custo de cada conexão nova (TCP+TLS).")
+    args = parser.parse_args()
+
+    from streamlit.logger import set_log_level
+    set_log_level("error")
+    # O stub é HTTP puro; o oauthlib só aceita http com esta variável
+    os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
+
+    from src import google_auth
+
+    stub = OAuthStub(args.latency_ms, args.handshake_ms)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    results = {}
+    try:
+        with mock.patch.object(google_auth, "_oauth_config", _stub_config), \
+             mock.patch.object(google_auth, "TOKEN_URI", f"{stub.url}/token"), \
+             mock.patch.object(google_auth, "USERINFO_URI", f"{stub.url}/oauth2/v2/userinfo"):
+            for name, login in (("legacy", legacy_login), ("current", current_login)):
+                login(stub.url) # aquece imports
+                results[name] = burst(login, stub, args.logins, args.concurrency)
+    finally:
+        stub.shutdown()
+
+    for name, r in results.items():
+        print(f"{name:8s} p50={r['p50_ms']:7.1f}ms p95={r['p95_ms']:7.1f}ms  {r['logins_per_s']:6.1f} logins/s  "
+              f"conexões={r['connections']}  pedidos={r['requests']}")
+
+    path = save_results("login", results, vars(args))
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark da renderização de QR codes do checkout Pix (src.qr_render).
+
+Um checkout = o painel de pagamento aberto por --reruns reruns. Compara:
+  - legacy: a cada rerun, QRCode + PNG pelo Pillow (get_qr_code antigo) e o
+    QR do Mercado Pago reenviado como data URI base64;
+  - atual: PNG/SVG em cache pelo payload e a imagem do Mercado Pago
+    decodificada uma vez (os reruns reaproveitam os mesmos bytes).
+Reporta o tempo de renderização (frio e em cache), o tamanho de cada formato
+(PNG, data URI base64, SVG puro e com gzip) e os totais por checkout.
+
+Uso:
+    python -m benchmarks.bench_qr [--checkouts 50] [--reruns 20] [--repeat 5]
+"""
+import argparse
+import base64
+import gzip
+import io
+
+import numpy as np
+
+from benchmarks.harness import measure, print_results, save_results
+
+def pix_payload(i):
+    """Pix copia-e-cola (BR Code/EMV) com o tamanho típico do Mercado Pago."""
+    txid = f"{i:025d}"
+    return ("00020126580014br.gov.bcb.pix0136a629532e-7693-4846-852d-1bbff817b5a8520400005303986"
+            f"540549.995802BR5915POSEIDON INVEST6009SAO PAULO62290525{txid}6304ABCD")
+
+def legacy_png(payload):
+    """get_qr_code antes do cache: QRCode + PNG a cada chamada."""
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Renderização de QR codes do checkout: legacy x cache.")
+    parser.add_argument("--checkouts", type=int, default=50, help="Payloads distintos (um por checkout).")
+    parser.add_argument("--reruns", type=int, default=20, help="Reruns com o painel de pagamento aberto.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from streamlit.logger import set_log_level
+    set_log_level("error")
+    from src import qr_render
+
+    payloads = [pix_payload(i) for i in range(args.checkouts)]
+    mp_images = [base64.b64encode(legacy_png(p)).decode() for p in payloads] # O que o Mercado Pago envia
+
+    def clear():
+        qr_render.qr_png.clear()
+        qr_render.qr_svg.clear()
+        qr_render.decoded_image.clear()
+
+    def legacy_checkouts():
+        for payload, image in zip(payloads, mp_images):
+            for _ in range(args.reruns):
+                legacy_png(payload)
+                f"data:image/png;base64,{image}"
+
+    def current_checkouts():
+        for payload, image in zip(payloads, mp_images):
+            for _ in range(args.reruns):
+                qr_render.qr_png(payload)
+                qr_render.decoded_image(image)
+
+    n = args.checkouts
+    results = {
+        'render.png.legacy': measure(lambda: [legacy_png(p) for p in payloads], repeat=args.repeat, items=n),
+        'render.png.cold': measure(lambda: [qr_render.qr_png(p) for p in payloads], repeat=args.repeat,
+                                   items=n, setup=clear),
+        'render.svg.cold': measure(lambda: [qr_render.qr_svg(p) for p in payloads], repeat=args.repeat,
+                                   items=n, setup=clear),
+        'render.png.cached': measure(lambda: [qr_render.qr_png(p) for p in payloads], repeat=args.repeat, items=n,
+                                     setup=lambda: [qr_render.qr_png(p) for p in payloads]),
+        'checkout.legacy': measure(legacy_checkouts, repeat=args.repeat, items=n),
+        'checkout.current': measure(current_checkouts, repeat=args.repeat, items=n, setup=clear),
+    }
+
+    png = np.mean([len(qr_render.qr_png(p)) for p in payloads])
+    data_uri = np.mean([len(f"data:image/png;base64,{image}") for image in mp_images])
+    svg = np.mean([len(qr_render.qr_svg(p).encode()) for p in payloads])
+    svg_gzip = np.mean([len(gzip.compress(qr_render.qr_svg(p).encode())) for p in payloads])
+    same_png = all(qr_render.qr_png(p) == legacy_png(p) for p in payloads[:5])
+    sizes = {
+        'png_bytes': png, 'data_uri_bytes': data_uri, 'svg_bytes': svg, 'svg_gzip_bytes': svg_gzip,
+        # Bytes enviados ao navegador por checkout: o data URI vai em todo rerun;
+        # os bytes em cache geram a mesma URL de mídia e são baixados uma vez
+        'sent_per_checkout.legacy': data_uri * args.reruns, 'sent_per_checkout.current': png,
+    }
+
+    print_results(results)
+    print(f"\nPNG {png / 1024:.1f} KB | data URI {data_uri / 1024:.1f} KB | SVG {svg / 1024:.1f} KB ({svg_gzip / 1024:.1f} KB gzip)")
+    print(f"Enviado por checkout ({args.reruns} reruns): legacy {sizes['sent_per_checkout.legacy'] / 1024:.1f} KB, "
+          f"atual {sizes['sent_per_checkout.current'] / 1024:.1f} KB")
+    print(f"PNG idêntico ao legacy: {same_png}")
+
+    path = save_results("qr", {**results, 'sizes': sizes}, {**vars(args), 'same_png': same_png})
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
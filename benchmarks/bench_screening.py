@@ -0,0 +1,114 @@
+"""
+Benchmark do scanner num universo grande (padrão: 5.000 ativos sintéticos).
+
+Compara o formato antigo (um dict por ativo -> DataFrame float64/object,
+score_stocks com cópias e colunas auxiliares) com o atual (AssetSnapshot ->
+AssetBatch float32/categórico, score_stocks sobre arrays):
+  - memória dos registros e do DataFrame do universo;
+  - tempo de montar o DataFrame e de uma varredura (score_stocks).
+
+Uso:
+    python -m benchmarks.bench_screening [--assets 5000] [--repeat 5]
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import measure, print_results, save_results
+
+SECTORS = ["Bancos", "Energia", "Tecnologia", "Varejo", "Saúde", "Commodities", "Seguros", "Industria"]
+
+def synthetic_infos(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{
+        'longName': f"Empresa {i} S.A.", 'sector': SECTORS[i % len(SECTORS)],
+        'forwardPE': float(rng.uniform(-5, 40)), 'returnOnEquity': float(rng.uniform(-0.1, 0.4)),
+        'dividendYield': float(rng.uniform(0, 0.12)), 'beta': float(rng.uniform(0.4, 1.8)),
+        'sharesOutstanding': float(rng.integers(1e7, 1e10)), 'currentPrice': float(rng.uniform(1, 200)),
+        'marketCap': float(rng.uniform(1e8, 1e11))
+    } for i in range(n)]
+
+def legacy_record(ticker, info):
+    """Formato antigo de get_fundamentals: um dict por ativo."""
+    return {
+        'symbol': ticker,
+        'name': info.get('longName', ticker),
+        'sector': info.get('sector', 'Unknown'),
+        'pe_ratio': info.get('forwardPE', info.get('trailingPE', 0.0)) or 0.0,
+        'roe': info.get('returnOnEquity', 0.0) or 0.0,
+        'dividend_yield': info.get('dividendYield', 0.0) or 0.0,
+        'beta': info.get('beta', 0.0) or 0.0,
+        'shares': info.get('sharesOutstanding', info.get('circulatingSupply', 0.0)) or 0.0,
+        'price': info.get('currentPrice', info.get('regularMarketPrice', 0.0)) or 0.0,
+        'market_cap': info.get('marketCap', 0.0) or 0.0
+    }
+
+def legacy_score_stocks(df):
+    """score_stocks antes dos arrays: cópia + to_numeric por coluna + colunas auxiliares."""
+    if df.empty:
+        return df
+    df = df.copy()
+    for col in ['roe', 'pe_ratio', 'price']:
+        if col not in df.columns:
+            df[col] = 0.0
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    df = df[df['price'] > 0.01]
+    if df.empty:
+        return df
+    df['pe_clean'] = df['pe_ratio'].replace(0, 1000)
+    df['rank_pe'] = df['pe_clean'].rank(ascending=True)
+    df['rank_roe'] = df['roe'].rank(ascending=False)
+    df['score'] = df['rank_pe'] + df['rank_roe']
+    return df.sort_values('score').head(10)
+
+def records_size(records):
+    """Bytes dos registros: o objeto (dict ou __slots__) mais os valores."""
+    total = 0
+    for r in records:
+        values = r.values() if isinstance(r, dict) else (getattr(r, name) for name in r.__slots__)
+        total += sys.getsizeof(r) + sum(sys.getsizeof(v) for v in values)
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória e tempo do scanner num universo grande.")
+    parser.add_argument("--assets", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from src.analyzer import score_stocks
+    from src.asset_records import AssetBatch, AssetSnapshot
+
+    tickers = [f"ATV{i}.SA" for i in range(args.assets)]
+    infos = synthetic_infos(args.assets)
+
+    legacy_records = [legacy_record(t, info) for t, info in zip(tickers, infos)]
+    records = [AssetSnapshot.from_info(t, info) for t, info in zip(tickers, infos)]
+    legacy_frame = pd.DataFrame(legacy_records)
+    frame = AssetBatch.from_records(records).to_frame()
+
+    n = args.assets
+    results = {
+        'records.legacy': {'bytes': records_size(legacy_records)},
+        'records.asset_snapshot': {'bytes': records_size(records)},
+        'frame.legacy': {'bytes': int(legacy_frame.memory_usage(deep=True).sum())},
+        'frame.asset_batch': {'bytes': int(frame.memory_usage(deep=True).sum())},
+        'build.legacy': measure(lambda: pd.DataFrame(legacy_records), repeat=args.repeat, items=n),
+        'build.asset_batch': measure(lambda: AssetBatch.from_records(records).to_frame(), repeat=args.repeat, items=n),
+        'scan.legacy': measure(lambda: legacy_score_stocks(legacy_frame), repeat=args.repeat, items=n),
+        'scan.asset_batch': measure(lambda: score_stocks(frame), repeat=args.repeat, items=n),
+    }
+
+    same = legacy_score_stocks(legacy_frame)['symbol'].tolist() == score_stocks(frame)['symbol'].astype(str).tolist()
+    for name, stats in results.items():
+        if 'bytes' in stats:
+            print(f"{name:28s} {stats['bytes'] / 1024:10.1f} KB")
+    print(f"Top 10 idêntico ao formato antigo: {same}\n")
+    print_results({k: v for k, v in results.items() if 'median_ms' in v})
+
+    path = save_results("screening", results, {'assets': n, 'same_top10': same})
+    print(f"\nResultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Fixtures gravadas dos provedores externos (Yahoo, StatusInvest, BCB).
+
+Gravação (precisa de internet, rodar uma vez por versão de fixture):
+    python -m benchmarks.fixtures --out benchmarks/fixtures
+
+Reprodução (offline): o context manager `replay()` troca yfinance.Ticker,
+yfinance.download, requests.get e bcb.sgs.get por versões que leem os
+arquivos gravados. Como os loaders importam essas libs dentro das funções,
+a troca vale para todo o código de src/.
+Sem fixtures gravadas, replay() monta um conjunto sintético em memória
+(FixtureStore.synthetic, com os dados determinísticos de benchmarks.stubs),
+no mesmo formato: os benchmarks rodam offline de qualquer jeito, e o
+manifest indica de onde vieram os dados.
+
+Layout do diretório:
+    manifest.json           data da gravação e universos
+    yahoo_info.json         {ticker: .info}
+    yahoo_history.parquet   histórico diário (Date, Ticker, Open, High, Low, Close, Volume)
+    statusinvest/<fii>.html páginas dos FIIs
+    bcb.json                {codigo_sgs: [{"data": ..., "valor": ...}]}
+"""
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+
+BCB_SERIES = [432, 13522]
+HISTORY_PERIOD = "2y"
+
+# Janela de cada "period" do yfinance, em pregões
+PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504}
+
+def record(out_dir=FIXTURES_DIR):
+    """Grava as fixtures a partir dos provedores reais."""
+    import requests
+    import yfinance as yf
+    from bcb import sgs
+    from src.universe import UNIVERSES, FII_TICKERS
+
+    os.makedirs(os.path.join(out_dir, "statusinvest"), exist_ok=True)
+    yahoo_tickers = sorted({t for tickers in UNIVERSES.values() for t in tickers})
+
+    print(f"Gravando .info de {len(yahoo_tickers)} ativos...")
+    infos = {}
+    for t in yahoo_tickers:
+        try:
+            infos[t] = yf.Ticker(t).info
+        except Exception as e:
+            print(f"  [AVISO] {t}: {e}")
+    with open(os.path.join(out_dir, "yahoo_info.json"), "w", encoding="utf-8") as f:
+        json.dump(infos, f, default=str)
+
+    print(f"Gravando histórico ({HISTORY_PERIOD})...")
+    data = yf.download(yahoo_tickers, period=HISTORY_PERIOD, interval="1d", progress=False, auto_adjust=True)
+    history = data.stack(level=1, future_stack=True).reset_index()
+    history.columns = ["Date", "Ticker"] + list(history.columns[2:])
+    history.to_parquet(os.path.join(out_dir, "yahoo_history.parquet"), index=False)
+
+    print(f"Gravando {len(FII_TICKERS)} páginas do StatusInvest...")
+    for t in FII_TICKERS:
+        url = f"https://statusinvest.com.br/fundos-imobiliarios/{t.lower()}"
+        try:
+            response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=30)
+            response.raise_for_status()
+            with open(os.path.join(out_dir, "statusinvest", f"{t.lower()}.html"), "w", encoding="utf-8") as f:
+                f.write(response.text)
+        except Exception as e:
+            print(f"  [AVISO] {t}: {e}")
+
+    print("Gravando séries do BCB...")
+    series = {}
+    for code in BCB_SERIES:
+        df = sgs.get({'valor': code}, last=24)
+        series[str(code)] = [{"data": str(idx.date()), "valor": float(v)} for idx, v in df['valor'].items()]
+    with open(os.path.join(out_dir, "bcb.json"), "w", encoding="utf-8") as f:
+        json.dump(series, f)
+
+    manifest = {
+        'recorded_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'yahoo_tickers': yahoo_tickers,
+        'fii_tickers': FII_TICKERS,
+        'bcb_series': BCB_SERIES
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    print(f"Fixtures gravadas em {out_dir}")
+
+class FixtureStore:
+    """Carrega as fixtures uma vez e responde no formato de cada provedor."""
+
+    @classmethod
+    def synthetic(cls):
+        """Fixtures sintéticas (os universos de src.universe), sem disco nem rede."""
+        from benchmarks.stubs import StubProviders
+        from src.universe import UNIVERSES, FII_TICKERS
+
+        stub = StubProviders(latency_ms=0.0)
+        yahoo_tickers = sorted({t for tickers in UNIVERSES.values() for t in tickers})
+        store = cls.__new__(cls)
+        store.dir = None
+        store.manifest = {
+            'recorded_at': None,
+            'synthetic': True,
+            'yahoo_tickers': yahoo_tickers,
+            'fii_tickers': FII_TICKERS,
+            'bcb_series': BCB_SERIES
+        }
+        store.infos = {t: stub.ticker(t).info for t in yahoo_tickers}
+        store.history = stub.download(yahoo_tickers, period=HISTORY_PERIOD).sort_index(axis=1)
+        months = pd.date_range(end=pd.Timestamp.today().normalize(), periods=24, freq="MS")
+        store.bcb = {}
+        for code in BCB_SERIES:
+            value = float(stub.sgs_get({'valor': code})['valor'].iloc[-1])
+            store.bcb[str(code)] = [{"data": str(d.date()), "valor": value} for d in months]
+        store.pages = {
+            t.lower(): stub.requests_get(f"https://statusinvest.com.br/fundos-imobiliarios/{t.lower()}").text
+            for t in FII_TICKERS
+        }
+        return store
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR):
+        manifest_path = os.path.join(fixtures_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(
+                f"Fixtures não encontradas em {fixtures_dir}. "
+                "Grave com: python -m benchmarks.fixtures --out " + fixtures_dir
+            )
+        self.dir = fixtures_dir
+        with open(manifest_path, encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(fixtures_dir, "yahoo_info.json"), encoding="utf-8") as f:
+            self.infos = json.load(f)
+        with open(os.path.join(fixtures_dir, "bcb.json"), encoding="utf-8") as f:
+            self.bcb = json.load(f)
+
+        history = pd.read_parquet(os.path.join(fixtures_dir, "yahoo_history.parquet"))
+        history["Date"] = pd.to_datetime(history["Date"])
+        # Wide: colunas (Price, Ticker), como o yf.download multi-ticker
+        self.history = history.pivot(index="Date", columns="Ticker").sort_index()
+        self.history.columns.names = ["Price", "Ticker"]
+
+        self.pages = {}
+        page_dir = os.path.join(fixtures_dir, "statusinvest")
+        if os.path.isdir(page_dir):
+            for name in os.listdir(page_dir):
+                with open(os.path.join(page_dir, name), encoding="utf-8") as f:
+                    self.pages[name.rsplit(".", 1)[0]] = f.read()
+
+    # --- yfinance ---
+    def ticker(self, symbol, *args, **kwargs):
+        store = self
+
+        class _Ticker:
+            ticker = symbol
+
+            @property
+            def info(self):
+                if symbol not in store.infos:
+                    raise KeyError(f"Sem fixture de .info para {symbol}")
+                return dict(store.infos[symbol])
+        return _Ticker()
+
+    def download(self, tickers, period="1mo", interval="1d", **kwargs):
+        if isinstance(tickers, str):
+            tickers = tickers.replace(",", " ").split()
+        tickers = [t for t in tickers if t in self.history.columns.get_level_values("Ticker")]
+        if not tickers:
+            return pd.DataFrame()
+        days = PERIOD_DAYS.get(period, len(self.history))
+        frame = self.history.loc[:, (slice(None), tickers)].iloc[-days:]
+        return frame.dropna(how="all")
+
+    # --- requests (StatusInvest) ---
+    def requests_get(self, url, *args, **kwargs):
+        import requests
+
+        if "statusinvest.com.br" not in url:
+            raise requests.ConnectionError(f"Modo offline: sem fixture para {url}")
+        slug = url.rstrip("/").rsplit("/", 1)[-1].lower()
+        response = requests.Response()
+        response.url = url
+        if slug in self.pages:
+            response.status_code = 200
+            response._content = self.pages[slug].encode("utf-8")
+            response.encoding = "utf-8"
+        else:
+            response.status_code = 404
+            response._content = b""
+        return response
+
+    # --- bcb ---
+    def sgs_get(self, codes, last=0, **kwargs):
+        (name, code), = codes.items()
+        rows = self.bcb.get(str(code), [])
+        if last:
+            rows = rows[-last:]
+        index = pd.to_datetime([r["data"] for r in rows])
+        return pd.DataFrame({name: [r["valor"] for r in rows]}, index=index)
+
+@contextmanager
+def replay(fixtures_dir=FIXTURES_DIR, store=None):
+    """
+    Troca os provedores externos pelas fixtures gravadas (ou sintéticas, se
+    não houver gravação em fixtures_dir).
+    """
+    import bcb.sgs
+    import requests
+    import yfinance
+
+    if store is None:
+        if os.path.exists(os.path.join(fixtures_dir, "manifest.json")):
+            store = FixtureStore(fixtures_dir)
+        else:
+            print(f"Sem fixtures gravadas em {fixtures_dir}: usando dados sintéticos.")
+            store = FixtureStore.synthetic()
+    with mock.patch.object(yfinance, "Ticker", store.ticker), \
+         mock.patch.object(yfinance, "download", store.download), \
+         mock.patch.object(requests, "get", store.requests_get), \
+         mock.patch.object(bcb.sgs, "get", store.sgs_get):
+        yield store
+
+def main():
+    parser = argparse.ArgumentParser(description="Grava fixtures dos provedores externos.")
+    parser.add_argument("--out", default=FIXTURES_DIR)
+    args = parser.parse_args()
+    record(args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Utilitários comuns dos benchmarks: cronometragem e gravação de resultados em JSON.
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+def measure(func, repeat=5, items=1, setup=None):
+    """
+    Executa func `repeat` vezes e devolve estatísticas de latência (ms)
+    e vazão (itens/s). `setup` roda antes de cada repetição, fora do tempo.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    timings = np.array(timings)
+    median = float(np.median(timings))
+    return {
+        'repeat': repeat,
+        'items': items,
+        'min_ms': float(timings.min() * 1000),
+        'median_ms': median * 1000,
+        'p95_ms': float(np.percentile(timings, 95) * 1000),
+        'throughput_per_s': items / median if median > 0 else None
+    }
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except Exception:
+        return None
+
+def save_results(name, results, extra_meta=None, out_dir=RESULTS_DIR):
+    """Grava os resultados com metadados do ambiente e devolve o caminho."""
+    import pandas as pd
+
+    os.makedirs(out_dir, exist_ok=True)
+    payload = {
+        'meta': {
+            'benchmark': name,
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            **(extra_meta or {})
+        },
+        'results': results
+    }
+    path = os.path.join(out_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+def compare_results(results, baseline_path, metric="median_ms", threshold=1.10):
+    """
+    Imprime a razão atual/baseline por benchmark e devolve os que pioraram
+    além do limite (padrão: 10% mais lentos).
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    print(f"\nComparação com {os.path.basename(baseline_path)} ({metric}):")
+    for name, current in results.items():
+        old = baseline.get(name)
+        if not old or not old.get(metric) or current.get(metric) is None:
+            continue
+        ratio = current[metric] / old[metric]
+        flag = "  <-- REGRESSÃO" if ratio > threshold else ""
+        print(f"  {name:45s} {old[metric]:10.2f} -> {current[metric]:10.2f}  ({ratio:5.2f}x){flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+def print_results(results):
+    print(f"\n{'benchmark':45s} {'mediana ms':>12s} {'p95 ms':>10s} {'itens/s':>12s}")
+    for name, r in results.items():
+        if 'skipped' in r:
+            print(f"{name:45s} {'(pulado: ' + r['skipped'] + ')'}")
+            continue
+        throughput = f"{r['throughput_per_s']:12.1f}" if r.get('throughput_per_s') else f"{'-':>12s}"
+        print(f"{name:45s} {r['median_ms']:12.2f} {r['p95_ms']:10.2f} {throughput}")
@@ -0,0 +1,219 @@
+"""
+Teste de carga multi-sessão do app.py contra provedores locais (stubs).
+
+Simula N sessões simultâneas no mesmo processo (como um servidor Streamlit:
+uma thread por sessão, caches compartilhados). Cada sessão percorre o fluxo:
+  login -> análise completa -> interações (horizonte do Monte Carlo, taxa do CDB)
+  -> checkout Pix (só para parte das contas básicas).
+
+Para cada nível de concorrência reporta p50/p95/p99 de latência por página,
+vazão, pico de RSS e uso de CPU, e estima a capacidade por instância
+(maior N com p95 dentro do SLO).
+
+Uso:
+    python -m benchmarks.load_test --sessions 1,5,10,20 --latency-ms 50 --error-rate 0.02
+"""
+import argparse
+import os
+import threading
+import time
+from unittest import mock
+
+import numpy as np
+import streamlit as st
+
+from benchmarks.harness import ROOT, save_results
+from benchmarks.stubs import stub_providers
+
+APP_PATH = os.path.join(ROOT, "app.py")
+STUB_SECRETS = {"mercadopago": {"access_token": "stub-token", "user_id": ""}}
+
+def _rss_mb():
+    """
+    RSS atual do processo (Linux: /proc; senão psutil, se instalado; senão
+    o pico do getrusage, só Unix). None quando não há como medir (Windows sem psutil).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class ResourceSampler(threading.Thread):
+    """Amostra RSS periodicamente para obter o pico durante a etapa."""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_rss_mb = _rss_mb()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        if self.peak_rss_mb is None:
+            return # Sem medida de RSS nesta plataforma
+        while not self._stop_event.wait(self.interval):
+            self.peak_rss_mb = max(self.peak_rss_mb, _rss_mb())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def run_session(session_id, premium, checkout, interactions, timeout, samples, failures):
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(session_id)
+
+    def timed(kind, at):
+        start = time.perf_counter()
+        try:
+            at.run(timeout=timeout)
+        except Exception as e:
+            failures.append((kind, repr(e)))
+            return False
+        samples.append((kind, time.perf_counter() - start))
+        if at.exception:
+            failures.append((kind, at.exception[0].message))
+        return True
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    for section, values in STUB_SECRETS.items():
+        at.secrets[section] = values
+
+    if not timed("login", at):
+        return
+    at.session_state.user = {"email": f"load{session_id}@poseidon.ai", "name": f"Load{session_id}", "picture": None}
+    at.session_state.run_analysis = True
+    if not timed("analysis", at):
+        return
+
+    for _ in range(interactions):
+        if at.slider:
+            at.slider[0].set_value(int(rng.integers(1, 31)))
+            if not timed("interaction", at):
+                return
+        cdb = [w for w in at.number_input if "CDB" in w.label]
+        if cdb:
+            cdb[0].set_value(float(rng.uniform(90, 130)))
+            if not timed("interaction", at):
+                return
+
+    if checkout and not premium:
+        at.session_state.show_payment = True
+        timed("checkout", at)
+
+def run_step(n_sessions, args):
+    samples, failures = [], []
+    premium_ids = set(range(int(round(n_sessions * args.premium_ratio))))
+    checkout_ids = set(range(n_sessions - int(round(n_sessions * args.checkout_ratio)), n_sessions))
+
+    if args.cold:
+        st.cache_data.clear()
+
+    sampler = ResourceSampler()
+    sampler.start()
+    cpu_start = os.times()
+    wall_start = time.perf_counter()
+
+    threads = [
+        threading.Thread(target=run_session, args=(
+            i, i in premium_ids, i in checkout_ids, args.interactions, args.timeout, samples, failures
+        ))
+        for i in range(n_sessions)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    wall = time.perf_counter() - wall_start
+    cpu_end = os.times()
+    sampler.stop()
+    cpu = (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system)
+
+    result = {
+        'sessions': n_sessions,
+        'pages': len(samples),
+        'failures': len(failures),
+        'failure_examples': sorted({f"{kind}: {msg}"[:200] for kind, msg in failures})[:5],
+        'wall_s': wall,
+        'pages_per_s': len(samples) / wall if wall else None,
+        'peak_rss_mb': sampler.peak_rss_mb,
+        'cpu_s': cpu,
+        'cpu_cores_avg': cpu / wall if wall else None
+    }
+    latencies = np.array([s for _, s in samples]) * 1000
+    if latencies.size:
+        result.update({f"p{q}_ms": float(np.percentile(latencies, q)) for q in (50, 95, 99)})
+    for kind in sorted({k for k, _ in samples}):
+        values = np.array([s for k, s in samples if k == kind]) * 1000
+        result[f"{kind}_p95_ms"] = float(np.percentile(values, 95))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga multi-sessão do Poseidon.")
+    parser.add_argument("--sessions", default="1,5,10", help="Níveis de concorrência, separados por vírgula.")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência média dos provedores.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidade de falha por chamada externa.")
+    parser.add_argument("--premium-ratio", type=float, default=0.5, help="Fração de sessões premium.")
+    parser.add_argument("--checkout-ratio", type=float, default=0.2, help="Fração de sessões que abrem o checkout Pix.")
+    parser.add_argument("--interactions", type=int, default=2, help="Interações por sessão após a análise.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout por página (s).")
+    parser.add_argument("--slo-ms", type=float, default=3000.0, help="p95 aceitável por página.")
+    parser.add_argument("--fixtures", help="Usa fixtures gravadas em vez de dados sintéticos.")
+    parser.add_argument("--cold", action="store_true", help="Limpa os caches antes de cada nível.")
+    args = parser.parse_args()
+
+    # Sessões rodam sem servidor: os avisos de "bare mode" do Streamlit só poluem a saída
+    from streamlit.logger import set_log_level
+    set_log_level("error")
+
+    store = None
+    if args.fixtures:
+        from benchmarks.fixtures import FixtureStore
+        store = FixtureStore(args.fixtures)
+
+    levels = [int(n) for n in args.sessions.split(",")]
+    results = {}
+    # is_premium lê/grava config/user_data.json; no teste de carga o status vem do roteiro
+    premium_emails = set()
+
+    with stub_providers(args.latency_ms, args.error_rate, store=store) as stub, \
+         mock.patch("src.payment.is_premium", lambda email=None: email in premium_emails):
+        for n in levels:
+            premium_emails.clear()
+            premium_emails.update(f"load{i}@poseidon.ai" for i in range(int(round(n * args.premium_ratio))))
+            print(f"Rodando {n} sessões simultâneas...")
+            results[f"sessions_{n}"] = step = run_step(n, args)
+            rss = "n/d" if step['peak_rss_mb'] is None else f"{step['peak_rss_mb']:.0f}MB"
+            print(f"  p50={step.get('p50_ms', 0):.0f}ms p95={step.get('p95_ms', 0):.0f}ms "
+                  f"p99={step.get('p99_ms', 0):.0f}ms  {step['pages_per_s']:.1f} pág/s  "
+                  f"RSS pico={rss}  CPU={step['cpu_cores_avg']:.2f} núcleos  "
+                  f"falhas={step['failures']}")
+        upstream_calls = dict(stub.calls)
+        upstream_errors = dict(stub.errors)
+
+    within_slo = [r['sessions'] for r in results.values() if r.get('p95_ms', float('inf')) <= args.slo_ms]
+    capacity = max(within_slo) if within_slo else 0
+    print(f"\nCapacidade estimada: {capacity} sessões simultâneas com p95 <= {args.slo_ms:.0f}ms")
+    print(f"Chamadas aos stubs: {upstream_calls}  (erros injetados: {upstream_errors})")
+
+    path = save_results("load", results, {
+        'latency_ms': args.latency_ms, 'error_rate': args.error_rate, 'slo_ms': args.slo_ms,
+        'capacity_sessions': capacity, 'upstream_calls': upstream_calls, 'upstream_errors': upstream_errors
+    })
+    print(f"Resultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Teste de carga da API HTTP (src.api) contra provedores locais (stubs).
+
+Sem --url, a API roda no próprio processo (httpx + ASGITransport, sem rede)
+com os provedores externos trocados pelos stubs; com --url, o teste bate num
+servidor já rodando (python -m src.api), que usa os provedores reais.
+Cada cliente virtual faz --requests chamadas sorteadas do roteiro abaixo
+(leituras, lotes de tickers e lotes de simulações).
+
+Para cada nível de concorrência reporta p50/p95/p99 de latência (total e por
+endpoint), requisições/s e itens/s.
+
+Uso:
+    python -m benchmarks.load_test_api --clients 1,10,50 --requests 20 --latency-ms 50
+Requer httpx.
+"""
+import argparse
+import asyncio
+import contextlib
+import time
+
+import numpy as np
+
+from benchmarks.harness import save_results
+from benchmarks.stubs import stub_providers
+
+TICKERS = [f"ATV{i}.SA" for i in range(200)]
+
+def scenario(rng, batch):
+    """Sorteia uma chamada: (nome, método, caminho, corpo, itens)."""
+    tickers = [str(t) for t in rng.choice(TICKERS, size=batch, replace=False)]
+    amount = float(rng.choice([10_000, 50_000, 100_000]))
+    profile = str(rng.choice(["Conservador", "Moderado", "Arrojado"]))
+    kind = rng.choice(["top_picks", "quotes", "fundamentals", "signals", "monte_carlo", "goal_plan"],
+                      p=[0.3, 0.2, 0.15, 0.15, 0.1, 0.1])
+    if kind == "top_picks":
+        return kind, "GET", f"/top-picks/{rng.choice(['stocks', 'bdr', 'crypto', 'fii'])}", None, 1
+    if kind in ("quotes", "fundamentals", "signals"):
+        return kind, "POST", f"/{kind}", {'tickers': tickers}, batch
+    configs = [{'amount': amount, 'profile': profile, 'years': int(rng.integers(1, 11))} for _ in range(4)]
+    path = "/simulations/monte-carlo" if kind == "monte_carlo" else "/simulations/goal-plan"
+    return kind, "POST", path, {'configs': configs}, len(configs)
+
+async def run_client(client, client_id, n_requests, batch, samples, failures):
+    rng = np.random.default_rng(client_id)
+    for _ in range(n_requests):
+        kind, method, path, body, items = scenario(rng, batch)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            payload = response.json()
+        except Exception as e:
+            failures.append((kind, repr(e)))
+            continue
+        elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            failures.append((kind, f"HTTP {response.status_code}: {payload}"))
+            continue
+        errors = [p for p in payload if isinstance(p, dict) and 'error' in p] if isinstance(payload, list) else []
+        if errors:
+            failures.append((kind, errors[0]['error']))
+        samples.append((kind, elapsed, items))
+
+async def run_level(make_client, n_clients, args):
+    samples, failures = [], []
+    async with make_client() as client:
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(
+            run_client(client, i, args.requests, args.batch, samples, failures) for i in range(n_clients)
+        ))
+        wall = time.perf_counter() - wall_start
+
+    result = {
+        'clients': n_clients,
+        'requests': len(samples),
+        'failures': len(failures),
+        'failure_examples': sorted({f"{kind}: {msg}"[:200] for kind, msg in failures})[:5],
+        'wall_s': wall,
+        'requests_per_s': len(samples) / wall if wall else None,
+        'items_per_s': sum(items for _, _, items in samples) / wall if wall else None
+    }
+    latencies = np.array([s for _, s, _ in samples]) * 1000
+    if latencies.size:
+        result.update({f"p{q}_ms": float(np.percentile(latencies, q)) for q in (50, 95, 99)})
+    for kind in sorted({k for k, _, _ in samples}):
+        values = np.array([s for k, s, _ in samples if k == kind]) * 1000
+        result[f"{kind}_p95_ms"] = float(np.percentile(values, 95))
+    return result
+
+async def run_all(args, levels):
+    import httpx
+
+    if args.url:
+        make_client = lambda: httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        from src.api import app
+        make_client = lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                                base_url="http://poseidon", timeout=args.timeout)
+
+    results = {}
+    for n in levels:
+        print(f"Rodando {n} clientes simultâneos...")
+        results[f"clients_{n}"] = step = await run_level(make_client, n, args)
+        print(f"  p50={step.get('p50_ms', 0):.0f}ms p95={step.get('p95_ms', 0):.0f}ms "
+              f"p99={step.get('p99_ms', 0):.0f}ms  {step['requests_per_s']:.1f} req/s  "
+              f"{step['items_per_s']:.1f} itens/s  falhas={step['failures']}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API HTTP do Poseidon.")
+    parser.add_argument("--clients", default="1,10,50", help="Níveis de concorrência, separados por vírgula.")
+    parser.add_argument("--requests", type=int, default=20, help="Requisições por cliente.")
+    parser.add_argument("--batch", type=int, default=20, help="Tickers por chamada em lote.")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência média dos provedores (stubs).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidade de falha por chamada externa.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout por requisição (s).")
+    parser.add_argument("--url", help="URL de uma API já rodando (sem stubs), ex.: http://127.0.0.1:8000")
+    args = parser.parse_args()
+
+    from streamlit.logger import set_log_level
+    set_log_level("error")
+
+    levels = [int(n) for n in args.clients.split(",")]
+    stubs = contextlib.nullcontext() if args.url else stub_providers(args.latency_ms, args.error_rate)
+    with stubs as stub:
+        results = asyncio.run(run_all(args, levels))
+        upstream_calls = dict(stub.calls) if stub is not None else {}
+
+    print(f"\nChamadas aos stubs: {upstream_calls}")
+    path = save_results("load_api", results, {
+        'url': args.url, 'latency_ms': args.latency_ms, 'error_rate': args.error_rate,
+        'batch': args.batch, 'upstream_calls': upstream_calls
+    })
+    print(f"Resultados gravados em {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Provedores locais para testes de carga: Yahoo, BCB, StatusInvest e Mercado Pago.
+
+Cada chamada "externa" dorme a latência configurada (com variação de ±50%)
+e falha com a probabilidade `error_rate`, como um provedor real instável.
+Os dados vêm das fixtures gravadas (se houver) ou são sintéticos e
+determinísticos por ticker.
+"""
+import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import PERIOD_DAYS
+
+class InjectedError(Exception):
+    """Falha simulada de um provedor externo."""
+
+class StubProviders:
+    def __init__(self, latency_ms=50.0, error_rate=0.0, seed=0, store=None):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.store = store
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.errors = {}
+
+    def _upstream(self, source):
+        with self._lock:
+            self.calls[source] = self.calls.get(source, 0) + 1
+            delay = self.latency_ms * self._rng.uniform(0.5, 1.5) / 1000
+            fail = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.errors[source] = self.errors.get(source, 0) + 1
+            raise InjectedError(f"{source}: erro injetado pelo stub")
+
+    @staticmethod
+    def _ticker_rng(symbol):
+        return np.random.default_rng(zlib.crc32(symbol.encode()))
+
+    # --- yfinance ---
+    def ticker(self, symbol, *args, **kwargs):
+        stub = self
+
+        class _Ticker:
+            ticker = symbol
+
+            @property
+            def info(self):
+                stub._upstream("yahoo")
+                if stub.store is not None and symbol in stub.store.infos:
+                    return dict(stub.store.infos[symbol])
+                rng = stub._ticker_rng(symbol)
+                price = float(rng.uniform(5, 200))
+                return {
+                    'longName': symbol, 'sector': str(rng.choice(["Bancos", "Energia", "Tecnologia", "Varejo"])),
+                    'forwardPE': float(rng.uniform(3, 30)), 'returnOnEquity': float(rng.uniform(-0.05, 0.35)),
+                    'dividendYield': float(rng.uniform(0, 0.12)), 'beta': float(rng.uniform(0.5, 1.8)),
+                    'sharesOutstanding': 1e9, 'currentPrice': price, 'marketCap': price * 1e9
+                }
+        return _Ticker()
+
+    def download(self, tickers, period="1mo", interval="1d", **kwargs):
+        self._upstream("yahoo")
+        if self.store is not None:
+            return self.store.download(tickers, period=period, interval=interval, **kwargs)
+
+        if isinstance(tickers, str):
+            tickers = tickers.replace(",", " ").split()
+        days = PERIOD_DAYS.get(period, 252)
+        index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+        frames = {}
+        for t in tickers:
+            rng = self._ticker_rng(t)
+            close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+            for field, values in (("Open", close), ("High", close * 1.01), ("Low", close * 0.99),
+                                  ("Close", close), ("Volume", np.full(days, 1e6))):
+                frames[(field, t)] = values
+        frame = pd.DataFrame(frames, index=index)
+        frame.columns.names = ["Price", "Ticker"]
+        return frame
+
+    # --- requests (StatusInvest) ---
+    def requests_get(self, url, *args, **kwargs):
+        import requests
+
+        try:
+            self._upstream("statusinvest")
+        except InjectedError as e:
+            raise requests.ConnectionError(str(e))
+        if self.store is not None:
+            return self.store.requests_get(url, *args, **kwargs)
+
+        slug = url.rstrip("/").rsplit("/", 1)[-1]
+        rng = self._ticker_rng(slug)
+        html = (
+            f"<html><h3>P/VP</h3><strong>{rng.uniform(0.6, 1.3):.2f}</strong>"
+            f"<h3>Dividend Yield</h3><strong>{rng.uniform(6, 14):.2f}%</strong></html>"
+        ).replace(".", ",")
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response._content = html.encode("utf-8")
+        response.encoding = "utf-8"
+        return response
+
+    # --- bcb ---
+    def sgs_get(self, codes, last=0, **kwargs):
+        self._upstream("bcb")
+        if self.store is not None:
+            return self.store.sgs_get(codes, last=last, **kwargs)
+        (name, code), = codes.items()
+        value = {432: 10.5, 13522: 4.4}.get(code, 1.0)
+        return pd.DataFrame({name: [value]}, index=pd.to_datetime([pd.Timestamp.today().normalize()]))
+
+    # --- mercadopago ---
+    def mp_sdk(self, access_token, *args, **kwargs):
+        stub = self
+
+        class _Payment:
+            def create(self, payment_data):
+                stub._upstream("mercadopago")
+                payment_id = stub._rng.randint(10**9, 10**10)
+                return {"status": 201, "response": {
+                    "id": payment_id, "status": "pending",
+                    "point_of_interaction": {"transaction_data": {
+                        "qr_code": f"00020126STUBPIX{payment_id}",
+                        "qr_code_base64": ""
+                    }}
+                }}
+
+            def get(self, payment_id):
+                stub._upstream("mercadopago")
+                return {"status": 200, "response": {"id": payment_id, "status": "pending"}}
+
+        class _SDK:
+            def payment(self):
+                return _Payment()
+        return _SDK()
+
+@contextmanager
+def stub_providers(latency_ms=50.0, error_rate=0.0, seed=0, store=None):
+    """Troca todos os provedores externos pelos stubs locais."""
+    import bcb.sgs
+    import mercadopago
+    import requests
+    import yfinance
+
+    stub = StubProviders(latency_ms, error_rate, seed, store)
+    with mock.patch.object(yfinance, "Ticker", stub.ticker), \
+         mock.patch.object(yfinance, "download", stub.download), \
+         mock.patch.object(requests, "get", stub.requests_get), \
+         mock.patch.object(bcb.sgs, "get", stub.sgs_get), \
+         mock.patch.object(mercadopago, "SDK", stub.mp_sdk):
+        yield stub
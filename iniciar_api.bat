@@ -0,0 +1,12 @@
+@echo off
+title Poseidon Investimentos - API
+echo ====================================================
+echo           POSEIDON INVESTIMENTOS - API HTTP
+echo ====================================================
+echo.
+echo [1/2] Entrando no diretorio do projeto...
+cd /d "%~dp0"
+echo [2/2] Iniciando a API em http://127.0.0.1:8000 ...
+echo.
+"%LOCALAPPDATA%\Programs\Python\Python312\python.exe" -m src.api %*
+pause
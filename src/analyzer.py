@@ -1,36 +1,59 @@
+import numpy as np
 import pandas as pd
 
+TOP_N = 10
+
+def _numeric_column(df, col):
+    """Coluna como array numérico (NaN/ausente -> 0), sem copiar o DataFrame."""
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=np.float32)
+    values = df[col]
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values, errors='coerce')
+    target = np.float32 if values.dtype == np.float32 else np.float64
+    values = values.to_numpy(dtype=target, na_value=np.nan)
+    return np.where(np.isnan(values), 0, values) if np.isnan(values).any() else values
+
+def _rank(values):
+    """Rank 1..n com empates pela média (como pandas.Series.rank)."""
+    return pd.Series(values).rank().to_numpy()
+
 def score_stocks(df):
     """
     Scores stocks based on Graham/Greenblatt logic (simplified).
+    Os rankings são calculados sobre arrays; só as 10 linhas escolhidas são copiadas.
     """
     if df.empty:
         return df
-    
-    df = df.copy()
-    
+
     # Garante que as colunas numéricas existam e preenche vazios com 0
-    cols_to_fix = ['roe', 'pe_ratio', 'price']
-    for col in cols_to_fix:
-        if col not in df.columns:
-            df[col] = 0.0
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
+    cleaned = {col: _numeric_column(df, col) for col in ('roe', 'pe_ratio', 'price')}
+
     # Filtro básico: Apenas remove se não tiver preço (dado inválido)
-    df = df[df['price'] > 0.01] # Garante que o preço é maior que 1 centavo
-    
-    if df.empty:
-        return df
-    
+    valid = np.flatnonzero(cleaned['price'] > 0.01) # Garante que o preço é maior que 1 centavo
+
+    if valid.size == 0:
+        return df.iloc[valid].assign(**{col: values[valid] for col, values in cleaned.items()})
+
     # Scoring: Rank by Cheapest (Low P/E) + Best Quality (High ROE)
     # Tratamento para P/L zero (evita que empresas sem lucro fiquem no topo)
-    df['pe_clean'] = df['pe_ratio'].replace(0, 1000)
-    
-    df['rank_pe'] = df['pe_clean'].rank(ascending=True)
-    df['rank_roe'] = df['roe'].rank(ascending=False)
-    df['score'] = df['rank_pe'] + df['rank_roe']
-    
-    return df.sort_values('score').head(10) # Top 10 Best
+    pe = cleaned['pe_ratio'][valid]
+    pe_clean = np.where(pe == 0, 1000, pe)
+
+    rank_pe = _rank(pe_clean)
+    rank_roe = _rank(-cleaned['roe'][valid])
+    score = rank_pe + rank_roe
+
+    top = np.argsort(score, kind='stable')[:TOP_N] # Top 10 Best
+    best = df.iloc[valid[top]].assign(
+        **{col: values[valid[top]] for col, values in cleaned.items()},
+        pe_clean=pe_clean[top], rank_pe=rank_pe[top], rank_roe=rank_roe[top], score=score[top]
+    )
+    # Categorias do universo inteiro não precisam ir para o cache junto com o Top 10
+    for col in best.columns:
+        if isinstance(best[col].dtype, pd.CategoricalDtype):
+            best[col] = best[col].cat.remove_unused_categories()
+    return best
 
 def score_crypto(df):
     """
@@ -38,6 +61,6 @@ def score_crypto(df):
     """
     if df.empty:
         return df
-    
-    df = df.copy()
+
+    # sort_values já devolve um novo DataFrame
     return df.sort_values('market_cap', ascending=False)
@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import json
+import math
+from dataclasses import asdict
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from src import compute
+from src.compute import ComputeBusyError
+from src.metrics import inc, observe, render_prometheus
+from src.pipeline import (
+    data_version, stage_allocation, stage_macro, stage_stock_scan, stage_crypto_scan, stage_fii_scan,
+    stage_monte_carlo, stage_goal_plan, stage_sensitivity, stage_optimizer
+)
+from src.top_picks import PICK_UNIVERSES
+
+# --- API HTTP (SEM INTERFACE) ---
+# Os motores do Poseidon para apps parceiros e jobs em lote, sem passar pelo
+# Streamlit. Os handlers são assíncronos; as chamadas aos motores (bloqueantes)
+# rodam no threadpool do Starlette. A API usa os mesmos estágios do app
+# (src.pipeline), mas roda em outro processo: os caches em memória
+# (st.cache_data, LRU do serviço de cálculo) e o pool de cálculo são dela;
+# com o app, só compartilha o que está em disco (snapshots e top picks).
+# Endpoints em lote aceitam muitos tickers ou configurações por chamada e
+# devolvem um array JSON em streaming, item a item, na ordem do pedido.
+# Rodar: python -m src.api (ou iniciar_api.bat); teste de carga em
+# benchmarks/load_test_api.py.
+
+MAX_TICKERS = 500
+MAX_CONFIGS = 100
+# Itens de um lote calculados ao mesmo tempo: o pool de cálculo aceita até
+# MAX_QUEUE jobs na fila, os scrapers/downloads são limitados pelo upstream
+TICKER_CONCURRENCY = 16
+SIMULATION_SLOTS = asyncio.Semaphore(compute.MAX_QUEUE)
+# Limites das configurações de simulação (os mesmos do app): o custo de um
+# job cresce com horizonte x passos por ano x 1.000 caminhos
+MAX_SIMULATION_YEARS = 30      # Monte Carlo (passo diário)
+MAX_PLAN_YEARS = 80            # Plano de objetivo, passo mensal/semanal
+MAX_DAILY_PLAN_YEARS = 30      # Plano de objetivo, passo diário
+PLAN_STEPS = ('monthly', 'weekly', 'daily')
+MAX_OPTIMIZER_TICKERS = 50
+
+def _default(obj):
+    """numpy/pandas -> tipos JSON."""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict(orient='records') if hasattr(obj, 'columns') else obj.to_dict()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+def _dumps(value):
+    return json.dumps(value, default=_default, ensure_ascii=False).encode("utf-8")
+
+def _json(value, status_code=200):
+    return Response(_dumps(value), status_code=status_code, media_type="application/json")
+
+def _records(df):
+    if df is None:
+        return []
+    return json.loads(df.to_json(orient='records', force_ascii=False))
+
+async def _body_list(request, key, limit):
+    """Lista `key` do corpo JSON, validada (400) e limitada (413)."""
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Corpo da requisição não é JSON válido")
+    items = payload.get(key) if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        raise HTTPException(400, f"'{key}' deve ser uma lista não vazia")
+    if len(items) > limit:
+        raise HTTPException(413, f"No máximo {limit} itens em '{key}' por chamada")
+    return items
+
+def _tickers(items):
+    if not all(isinstance(t, str) and t.strip() for t in items):
+        raise HTTPException(400, "'tickers' deve conter apenas códigos (strings)")
+    return [t.strip().upper() for t in items]
+
+def _stream(name, items, func, concurrency):
+    """
+    Calcula func(item) para cada item (até `concurrency` ao mesmo tempo, no
+    threadpool) e devolve um array JSON em streaming, na ordem dos itens.
+    Erros de um item viram {"error": ...} naquele item, sem derrubar o lote.
+    """
+    semaphore = concurrency if isinstance(concurrency, asyncio.Semaphore) else asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        async with semaphore:
+            try:
+                return await run_in_threadpool(func, item)
+            except ComputeBusyError as e:
+                return {'item': item, 'error': str(e), 'busy': True}
+            except Exception as e:
+                return {'item': item, 'error': f"{type(e).__name__}: {e}"}
+
+    async def body():
+        tasks = [asyncio.ensure_future(one(item)) for item in items]
+        try:
+            yield b"["
+            for i, task in enumerate(tasks):
+                yield (b"," if i else b"") + _dumps(await task)
+            yield b"]"
+        finally:
+            # Cliente desconectou no meio do lote: não calcula o resto
+            for task in tasks:
+                task.cancel()
+        inc("poseidon_api_items_total", value=len(items), endpoint=name)
+
+    return StreamingResponse(body(), media_type="application/json")
+
+# --- HANDLERS ---
+
+async def health(request):
+    return _json({'status': 'ok', 'data_version': data_version(), 'compute_workers': compute.WORKERS})
+
+async def metrics(request):
+    return Response(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+async def macro(request):
+    return _json(await run_in_threadpool(stage_macro))
+
+async def allocation(request):
+    # Perfil desconhecido cai no Moderado, como no app
+    return _json(await run_in_threadpool(stage_allocation, request.path_params['profile']))
+
+async def top_picks(request):
+    universe = request.path_params['universe']
+    tickers = PICK_UNIVERSES.get(universe)
+    if tickers is None:
+        raise HTTPException(404, f"Universo desconhecido: {universe} ({', '.join(PICK_UNIVERSES)})")
+
+    version = data_version()
+    if universe == 'crypto':
+        picks = await run_in_threadpool(stage_crypto_scan, tickers, version)
+    elif universe == 'fii':
+        picks = await run_in_threadpool(stage_fii_scan, tickers, version)
+    else:
+        picks = await run_in_threadpool(stage_stock_scan, universe, tickers, version)
+    return _json({'universe': universe, 'version': version, 'picks': _records(picks)})
+
+async def quotes(request):
+    from src.data_loader import get_batch_quotes
+
+    tickers = _tickers(await _body_list(request, 'tickers', MAX_TICKERS))
+    # Uma única chamada ao Yahoo para o lote inteiro (mesmo cache do app)
+    return _json(await run_in_threadpool(get_batch_quotes, tickers))
+
+async def fundamentals(request):
+    from src.data_loader import get_fundamentals
+
+    tickers = _tickers(await _body_list(request, 'tickers', MAX_TICKERS))
+
+    def fetch(ticker):
+        snapshot = get_fundamentals(ticker)
+        return asdict(snapshot) if snapshot is not None else {'item': ticker, 'error': "Sem dados"}
+    return _stream("fundamentals", tickers, fetch, TICKER_CONCURRENCY)
+
+async def signals(request):
+    from src.technical_engine import get_technical_signals
+
+    tickers = _tickers(await _body_list(request, 'tickers', MAX_TICKERS))
+    return _stream("signals", tickers, lambda t: {'symbol': t, 'signal': get_technical_signals(t)}, TICKER_CONCURRENCY)
+
+async def fii(request):
+    from src.fii_loader import get_fii_metrics
+
+    tickers = _tickers(await _body_list(request, 'tickers', MAX_TICKERS))
+    return _stream("fii", tickers, get_fii_metrics, TICKER_CONCURRENCY)
+
+# --- VALIDAÇÃO DAS SIMULAÇÕES ---
+# Todas as configurações do lote são validadas antes do streaming: uma
+# entrada inválida devolve 400 para o lote inteiro, sem ocupar o pool.
+
+def _config(item, required):
+    if not isinstance(item, dict):
+        raise ValueError("Configuração deve ser um objeto JSON")
+    missing = [k for k in required if k not in item]
+    if missing:
+        raise ValueError(f"Campos obrigatórios ausentes: {', '.join(missing)}")
+    return item
+
+def _number(c, key, default=0.0, low=0.0, high=None):
+    value = c.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"'{key}' deve ser um número")
+    if value < low or (high is not None and value > high):
+        raise ValueError(f"'{key}' fora do intervalo [{low}, {high if high is not None else '∞'}]")
+    return float(value)
+
+def _years(c, key, high, default=None, low=1):
+    value = c.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value):
+        raise ValueError(f"'{key}' deve ser um número inteiro de anos")
+    if not low <= value <= high:
+        raise ValueError(f"'{key}' deve estar entre {low} e {high}")
+    return int(value)
+
+def _profile(c):
+    if not isinstance(c['profile'], str):
+        raise ValueError("'profile' deve ser o nome de um perfil")
+    return c['profile']
+
+def _check_monte_carlo(item):
+    c = _config(item, ('amount', 'profile'))
+    return {'amount': _number(c, 'amount', low=1.0), 'profile': _profile(c),
+            'years': _years(c, 'years', MAX_SIMULATION_YEARS, default=10)}
+
+def _check_goal_plan(item):
+    c = _config(item, ('amount', 'profile', 'years'))
+    step = c.get('step', 'monthly')
+    if step not in PLAN_STEPS:
+        raise ValueError(f"'step' deve ser um de: {', '.join(PLAN_STEPS)}")
+    years = _years(c, 'years', MAX_DAILY_PLAN_YEARS if step == 'daily' else MAX_PLAN_YEARS)
+    inflation = c.get('inflation')
+    return {
+        'amount': _number(c, 'amount', low=0.0), 'profile': _profile(c), 'years': years,
+        'monthly_contribution': _number(c, 'monthly_contribution'),
+        'monthly_withdrawal': _number(c, 'monthly_withdrawal'),
+        'contribution_years': min(_years(c, 'contribution_years', MAX_PLAN_YEARS, default=years, low=0), years),
+        'goal': _number(c, 'goal'), 'step': step,
+        'inflation': None if inflation is None else _number(c, 'inflation', low=-0.5, high=1.0)
+    }
+
+def _check_sensitivity(item):
+    c = _config(item, ('amount', 'profile'))
+    return {'amount': _number(c, 'amount', low=1.0), 'profile': _profile(c)}
+
+def _check_optimizer(item):
+    c = _config(item, ('tickers', 'profile'))
+    tickers = c['tickers']
+    if not isinstance(tickers, list) or not 2 <= len(tickers) <= MAX_OPTIMIZER_TICKERS:
+        raise ValueError(f"'tickers' deve ser uma lista de 2 a {MAX_OPTIMIZER_TICKERS} códigos")
+    if not all(isinstance(t, str) and t.strip() for t in tickers):
+        raise ValueError("'tickers' deve conter apenas códigos (strings)")
+    return {'tickers': [t.strip().upper() for t in tickers], 'profile': _profile(c)}
+
+# --- SIMULAÇÕES (configurações já validadas) ---
+
+def _monte_carlo(c):
+    return {'config': c, 'result': stage_monte_carlo(c['amount'], c['profile'], c['years'])}
+
+def _goal_plan(c):
+    inflation = c['inflation']
+    if inflation is None:
+        inflation = stage_macro()['ipca'] / 100
+    result = stage_goal_plan(
+        c['amount'], c['profile'], c['years'], c['monthly_contribution'], c['monthly_withdrawal'],
+        c['contribution_years'], c['goal'], c['step'], float(inflation)
+    )
+    return {'config': c, 'result': result}
+
+def _sensitivity(c):
+    return {'config': c, 'result': _records(stage_sensitivity(c['amount'], c['profile']))}
+
+def _optimizer(c):
+    return {'config': c, 'result': stage_optimizer(tuple(c['tickers']), c['profile'])}
+
+SIMULATIONS = {
+    'monte-carlo': (_check_monte_carlo, _monte_carlo),
+    'goal-plan': (_check_goal_plan, _goal_plan),
+    'sensitivity': (_check_sensitivity, _sensitivity),
+    'optimizer': (_check_optimizer, _optimizer)
+}
+
+async def simulations(request):
+    kind = request.path_params['kind']
+    if kind not in SIMULATIONS:
+        raise HTTPException(404, f"Simulação desconhecida: {kind} ({', '.join(SIMULATIONS)})")
+    check, func = SIMULATIONS[kind]
+    configs = await _body_list(request, 'configs', MAX_CONFIGS)
+    checked = []
+    for i, item in enumerate(configs):
+        try:
+            checked.append(check(item))
+        except ValueError as e:
+            raise HTTPException(400, f"configs[{i}]: {e}")
+    # Semáforo global: lotes concorrentes não estouram a fila do pool de cálculo
+    return _stream(f"simulations.{kind}", checked, func, SIMULATION_SLOTS)
+
+async def http_error(request, exc):
+    return JSONResponse({'error': exc.detail}, status_code=exc.status_code)
+
+class _Timing:
+    """Middleware ASGI: latência por rota nas métricas (inclui o streaming)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            endpoint = scope.get('endpoint')
+            observe(f"api.{getattr(endpoint, '__name__', 'unknown')}", loop.time() - start)
+
+def create_app():
+    from starlette.middleware import Middleware
+
+    routes = [
+        Route("/health", health, name="health"),
+        Route("/metrics", metrics, name="metrics"),
+        Route("/macro", macro, name="macro"),
+        Route("/allocation/{profile}", allocation, name="allocation"),
+        Route("/top-picks/{universe}", top_picks, name="top_picks"),
+        Route("/quotes", quotes, methods=["POST"], name="quotes"),
+        Route("/fundamentals", fundamentals, methods=["POST"], name="fundamentals"),
+        Route("/signals", signals, methods=["POST"], name="signals"),
+        Route("/fii", fii, methods=["POST"], name="fii"),
+        Route("/simulations/{kind}", simulations, methods=["POST"], name="simulations"),
+    ]
+    return Starlette(routes=routes, middleware=[Middleware(_Timing)], exception_handlers={HTTPException: http_error})
+
+app = create_app()
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP do Poseidon (motores sem a interface).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import uvicorn
+    # Fora do "streamlit run" os caches avisam que estão em modo bare: silencia
+    from streamlit import logger
+    logger.set_log_level("error")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+from dataclasses import dataclass, fields, replace
+import numpy as np
+import pandas as pd
+
+# --- REGISTROS DE ATIVOS ---
+# AssetSnapshot: um ativo (fundamentos + preço), compacto (__slots__, sem dict
+# por instância). AssetBatch: o universo em colunas, com numéricos em float32
+# e symbol/sector categóricos, que é o formato que o scanner consome.
+
+NUMERIC_FIELDS = ('pe_ratio', 'roe', 'dividend_yield', 'beta', 'shares', 'price', 'market_cap')
+CATEGORICAL_FIELDS = ('symbol', 'sector')
+SCREEN_DTYPE = np.float32
+
+@dataclass(slots=True)
+class AssetSnapshot:
+    symbol: str
+    name: str
+    sector: str = 'Unknown'
+    pe_ratio: float = 0.0
+    roe: float = 0.0
+    dividend_yield: float = 0.0
+    beta: float = 0.0
+    # Quantidade de ações (ou oferta circulante, para cripto) permite
+    # recalcular o valor de mercado a partir da cotação fresca
+    shares: float = 0.0
+    # Preço e valor de mercado do momento do .info (fallback se a cotação falhar)
+    price: float = 0.0
+    market_cap: float = 0.0
+
+    @classmethod
+    def from_info(cls, ticker, info):
+        """Monta o registro a partir do .info do Yahoo Finance."""
+        return cls(
+            symbol=ticker,
+            name=info.get('longName', ticker),
+            sector=info.get('sector', 'Unknown'),
+            pe_ratio=info.get('forwardPE', info.get('trailingPE', 0.0)) or 0.0,
+            roe=info.get('returnOnEquity', 0.0) or 0.0,
+            dividend_yield=info.get('dividendYield', 0.0) or 0.0,
+            beta=info.get('beta', 0.0) or 0.0,
+            shares=info.get('sharesOutstanding', info.get('circulatingSupply', 0.0)) or 0.0,
+            price=info.get('currentPrice', info.get('regularMarketPrice', 0.0)) or 0.0,
+            market_cap=info.get('marketCap', 0.0) or 0.0
+        )
+
+    def with_quote(self, price):
+        """Cópia com a cotação fresca (e o valor de mercado recalculado)."""
+        market_cap = price * self.shares if self.shares > 0 else self.market_cap
+        return replace(self, price=price, market_cap=market_cap)
+
+FIELD_NAMES = tuple(f.name for f in fields(AssetSnapshot))
+
+def optimize_frame(df):
+    """
+    Converte um DataFrame de ativos para os tipos do scanner (float32 e
+    categóricos). Colunas já no tipo certo não são copiadas.
+    """
+    changes = {}
+    for col in NUMERIC_FIELDS:
+        if col in df.columns and df[col].dtype != SCREEN_DTYPE:
+            changes[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(SCREEN_DTYPE)
+    for col in CATEGORICAL_FIELDS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            changes[col] = df[col].astype('category')
+    return df.assign(**changes) if changes else df
+
+class AssetBatch:
+    """Universo de ativos em colunas (um array por campo)."""
+    __slots__ = ('columns',)
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns['symbol'])
+
+    @classmethod
+    def from_records(cls, records):
+        records = [r for r in records if r is not None]
+        columns = {}
+        for name in FIELD_NAMES:
+            if name in NUMERIC_FIELDS:
+                columns[name] = np.fromiter((getattr(r, name) for r in records), dtype=SCREEN_DTYPE, count=len(records))
+            elif name in CATEGORICAL_FIELDS:
+                columns[name] = pd.Categorical([getattr(r, name) for r in records])
+            else:
+                columns[name] = np.array([getattr(r, name) for r in records], dtype=object)
+        return cls(columns)
+
+    def to_frame(self):
+        return pd.DataFrame(self.columns, columns=list(FIELD_NAMES))
+
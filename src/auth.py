@@ -1,5 +1,3 @@
-import pyotp
-import qrcode
 import json
 import os
 import io
@@ -26,28 +24,24 @@ def save_config(data):
 
 def generate_secret():
     """Generates a new random base32 secret."""
+    import pyotp
     return pyotp.random_base32()
 
 def get_totp_uri(secret, email="usuario@poseidon.ai"):
     """Generates the provisioning URI for Google Authenticator."""
+    import pyotp
     return pyotp.totp.TOTP(secret).provisioning_uri(name=email, issuer_name="Poseidon AI")
 
 def get_qr_code(uri):
-    """Generates a QR code image stream from the URI."""
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(uri)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    img_byte_arr = io.BytesIO()
-    img.save(img_byte_arr, format='PNG')
-    img_byte_arr.seek(0)
-    return img_byte_arr
+    """Generates a QR code image stream from the URI (PNG cached by URI)."""
+    from src.qr_render import qr_png
+    return io.BytesIO(qr_png(uri))
 
 def verify_otp(secret, code):
     """Verifies the TOTP code."""
     if not secret:
         return False
+    import pyotp
     totp = pyotp.TOTP(secret)
     return totp.verify(code)
 
@@ -0,0 +1,114 @@
+import numpy as np
+
+# --- DADOS DOS GRÁFICOS ---
+# Séries longas (ex.: 30 anos de pregões = 7.561 pontos) não vão inteiras para
+# o navegador: cada trace é reduzido a um orçamento fixo de pontos.
+#   - LTTB (Largest-Triangle-Three-Buckets): preserva a forma visual da curva;
+#   - min/max por bucket: preserva picos e vales (bom para caminhos aleatórios).
+# Os gráficos de Monte Carlo mostram faixas de percentis (calculadas na
+# resolução completa) e só alguns caminhos de exemplo.
+
+MAX_POINTS = 400
+BAND_PERCENTILES = (10, 50, 90)
+CHART_SAMPLE_PATHS = 5
+
+def lttb_indices(x, y, n_out):
+    """Índices escolhidos pelo LTTB (sempre inclui o primeiro e o último ponto)."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        # Área do triângulo (ponto anterior escolhido, candidato, média do próximo bucket)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+def minmax_indices(y, n_out):
+    """Índices do mínimo e do máximo de cada bucket (n_out/2 buckets)."""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    n_buckets = n_out // 2
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+    starts = edges[:-1]
+    picks = []
+    for lo, hi in zip(starts, edges[1:]):
+        segment = y[lo:hi]
+        picks.append(lo + int(np.argmin(segment)))
+        picks.append(lo + int(np.argmax(segment)))
+    picks.extend([0, n - 1])
+    return np.unique(picks)
+
+def decimate(x, y, max_points=MAX_POINTS, method='lttb'):
+    """Reduz (x, y) a no máximo `max_points` pontos."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if method == 'minmax':
+        idx = minmax_indices(y, max_points)
+    else:
+        idx = lttb_indices(x, y, max_points)
+    return x[idx], y[idx]
+
+def fan_chart_data(paths, x=None, percentiles=BAND_PERCENTILES, sample_paths=CHART_SAMPLE_PATHS,
+                   max_points=MAX_POINTS):
+    """
+    Resume uma matriz (tempo, caminhos) para o gráfico: faixas de percentis
+    e alguns caminhos de exemplo, cada trace com no máximo `max_points` pontos.
+    As faixas compartilham os índices do LTTB da mediana (o preenchimento
+    entre elas precisa do mesmo eixo x).
+    """
+    paths = np.asarray(paths)
+    x = np.arange(paths.shape[0], dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    # Percentis são suaves no tempo: basta calculá-los numa grade de até
+    # 4x o orçamento de pontos (a matriz completa de 30 anos custa ~5x mais)
+    rows = np.arange(paths.shape[0])
+    if len(rows) > 4 * max_points:
+        rows = np.unique(np.linspace(0, len(rows) - 1, 4 * max_points).astype(int))
+    bands = np.percentile(paths[rows], percentiles, axis=1)
+    middle = bands[len(percentiles) // 2]
+    idx = lttb_indices(x[rows], middle, max_points)
+
+    samples = []
+    for j in range(min(sample_paths, paths.shape[1])):
+        sx, sy = decimate(x, paths[:, j], max_points, method='minmax')
+        samples.append({'x': sx, 'y': sy})
+
+    return {
+        'x': x[rows][idx],
+        'bands': {p: band[idx] for p, band in zip(percentiles, bands)},
+        'samples': samples
+    }
+
+def fan_chart(data, title, x_label, y_label):
+    """Figura Plotly a partir de fan_chart_data: faixa P10-P90, mediana e exemplos."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    percentiles = sorted(data['bands'])
+    low, mid, high = percentiles[0], percentiles[len(percentiles) // 2], percentiles[-1]
+
+    for sample in data['samples']:
+        fig.add_trace(go.Scattergl(x=sample['x'], y=sample['y'], mode='lines', hoverinfo='skip',
+                                   line={'width': 1, 'color': 'rgba(148, 210, 189, 0.35)'}, showlegend=False))
+    fig.add_trace(go.Scatter(x=data['x'], y=data['bands'][low], mode='lines', line={'width': 0},
+                             name=f"P{low}", showlegend=False))
+    fig.add_trace(go.Scatter(x=data['x'], y=data['bands'][high], mode='lines', line={'width': 0},
+                             fill='tonexty', fillcolor='rgba(0, 212, 255, 0.2)', name=f"P{low}-P{high}"))
+    fig.add_trace(go.Scatter(x=data['x'], y=data['bands'][mid], mode='lines',
+                             line={'width': 2, 'color': '#ffb703'}, name="Mediana"))
+
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label, hovermode='x unified',
+                      paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
+    return fig
@@ -0,0 +1,241 @@
+import hashlib
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from src import jobs, metrics, profiler
+from src.metrics import inc, observe, set_gauge
+
+# --- SERVIÇO DE CÁLCULO (POOL DE PROCESSOS) ---
+# Monte Carlo, simulações e otimizador rodam em processos separados, fora do
+# thread do script do Streamlit: uma simulação de 30 anos não disputa o GIL
+# com as outras sessões e os cálculos usam todos os núcleos.
+#   - submit(): devolve um Future; jobs idênticos (mesma função e argumentos)
+#     de sessões diferentes compartilham o mesmo Future;
+#   - limites de fila: global (MAX_QUEUE) e por sessão (MAX_JOBS_PER_SESSION);
+#   - cancelamento: quando a sessão reexecuta (rerun) ou troca o job de um
+#     mesmo "slot", o job antigo é cancelado se ninguém mais espera por ele;
+#   - run(): espera o resultado em intervalos curtos chamando on_wait, que na
+#     UI atualiza um placeholder (e permite ao Streamlit interromper o script).
+# Resultados recentes ficam num LRU em memória, compartilhado entre sessões,
+# por até RESULT_TTL; None e erros nunca entram (a próxima chamada recalcula).
+# Os workers (src.jobs) só calculam: downloads ficam no processo principal,
+# com o breaker, o limite de taxa e o último valor bom dele. As métricas do
+# instrument e os estágios a perfilar atravessam o pool junto com cada job.
+# POSEIDON_COMPUTE_WORKERS=0 desliga o pool (tudo roda no próprio thread).
+
+WORKERS = int(os.environ.get("POSEIDON_COMPUTE_WORKERS", os.cpu_count() or 1))
+MAX_QUEUE = 4 * max(WORKERS, 1)
+MAX_JOBS_PER_SESSION = 4
+POLL_INTERVAL = 0.1
+RESULT_CACHE_SIZE = 256
+RESULT_TTL = 3600
+
+class ComputeBusyError(Exception):
+    """Fila do pool cheia (global ou da sessão): tente novamente em instantes."""
+
+class _Job:
+    __slots__ = ('name', 'future', 'sessions', 'submitted_at')
+
+    def __init__(self, name, future):
+        self.name = name
+        self.future = future
+        self.sessions = set()
+        self.submitted_at = time.monotonic()
+
+_lock = threading.Lock()
+_pool = None
+_inflight = {}          # chave -> _Job
+_session_slots = {}     # (sessão, nome do job) -> chave do job atual
+_results = OrderedDict()    # chave -> (expira em, resultado)
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None and WORKERS > 0:
+            # spawn: o processo do Streamlit tem threads; fork poderia herdar locks travados.
+            # Cada processo novo reimporta o __main__: o app.py declara src.jobs
+            # como seu módulo (__spec__), para o worker não rodar o app inteiro
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=jobs.init_worker)
+        return _pool
+
+def _reset_pool():
+    global _pool
+    with _lock:
+        broken, _pool = _pool, None
+    if broken is not None:
+        broken.shutdown(wait=False, cancel_futures=True)
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+        return ctx.session_id if ctx else None
+    except Exception:
+        return None
+
+def job_key(name, args, kwargs):
+    return hashlib.sha1(pickle.dumps((name, args, sorted(kwargs.items())))).hexdigest()
+
+def _publish_depth():
+    queued = sum(1 for j in _inflight.values() if not j.future.running())
+    set_gauge("poseidon_compute_queue_depth", queued)
+    set_gauge("poseidon_compute_inflight", len(_inflight))
+
+def _cached(key):
+    with _lock:
+        entry = _results.get(key)
+        if entry is not None:
+            expires, value = entry
+            if time.monotonic() < expires:
+                _results.move_to_end(key)
+                return True, value
+            del _results[key]
+    return False, None
+
+def _store(key, value):
+    if value is None:
+        # Falha "silenciosa" do job (ex.: otimizador sem dados): não fica no cache
+        return
+    with _lock:
+        _results[key] = (time.monotonic() + RESULT_TTL, value)
+        _results.move_to_end(key)
+        while len(_results) > RESULT_CACHE_SIZE:
+            _results.popitem(last=False)
+
+def _unwrap(outcome):
+    """Resultado de jobs.run_job: devolve o valor ou relança o erro do job."""
+    ok, value, _ = outcome
+    if not ok:
+        raise value
+    return value
+
+def _finish(key, future):
+    with _lock:
+        job = _inflight.pop(key, None)
+        for slot in [slot for slot, current in _session_slots.items() if current == key]:
+            del _session_slots[slot]
+        _publish_depth()
+    if job is None:
+        return
+    if future.cancelled():
+        inc("poseidon_compute_jobs_total", job=job.name, outcome="cancelled")
+        return
+    observe(f"compute.{job.name}", time.monotonic() - job.submitted_at)
+    if future.exception() is not None:
+        # Worker morreu (pool quebrado) ou o resultado não voltou
+        inc("poseidon_compute_jobs_total", job=job.name, outcome="error")
+        return
+    ok, value, worker_metrics = future.result()
+    metrics.merge(worker_metrics)
+    inc("poseidon_compute_jobs_total", job=job.name, outcome="ok" if ok else "error")
+    if ok:
+        _store(key, value)
+
+def _release(key, session):
+    """A sessão deixou de esperar pelo job; cancela se ninguém mais espera."""
+    with _lock:
+        job = _inflight.get(key)
+        if job is None:
+            return
+        job.sessions.discard(session)
+        orphan = not job.sessions
+    if orphan:
+        # Só cancela o que ainda está na fila; um job já rodando termina e
+        # o resultado vai para o LRU (a próxima sessão pode aproveitar)
+        job.future.cancel()
+
+def submit(name, func, *args, **kwargs):
+    """
+    Agenda func(*args, **kwargs) no pool e devolve (chave, Future).
+    `name` é o slot do job na sessão: um novo job no mesmo slot substitui o anterior.
+    O Future entrega a saída de jobs.run_job (ok, valor, métricas): use _unwrap.
+    """
+    pool = _get_pool()
+    if pool is None:
+        raise RuntimeError("Pool de cálculo desligado (POSEIDON_COMPUTE_WORKERS=0)")
+
+    key = job_key(name, args, kwargs)
+    session = _session_id()
+    with _lock:
+        job = _inflight.get(key)
+        if job is None:
+            queued = sum(1 for j in _inflight.values() if not j.future.running())
+            mine = sum(1 for j in _inflight.values() if session in j.sessions)
+            if queued >= MAX_QUEUE or (session is not None and mine >= MAX_JOBS_PER_SESSION):
+                inc("poseidon_compute_jobs_total", job=name, outcome="rejected")
+                raise ComputeBusyError(f"Fila de cálculo cheia ({queued} jobs aguardando)")
+            future = pool.submit(jobs.run_job, func, args, kwargs, profiler.engine_targets)
+            job = _inflight[key] = _Job(name, future)
+            _publish_depth()
+            created = True
+        else:
+            created = False
+            inc("poseidon_compute_shared_total", job=name)
+        job.sessions.add(session)
+        previous = None
+        if session is not None:
+            # Sem sessão (API, jobs em lote) não há slot: chamadas concorrentes
+            # do mesmo job com argumentos diferentes não se substituem
+            previous = _session_slots.get((session, name))
+            _session_slots[(session, name)] = key
+
+    if created:
+        # Fora do lock: se o job já terminou, o callback roda aqui mesmo
+        job.future.add_done_callback(lambda f, key=key: _finish(key, f))
+    if previous is not None and previous != key:
+        _release(previous, session)
+    return key, job.future
+
+def run(name, func, *args, on_wait=None, **kwargs):
+    """
+    Executa o job no pool e espera o resultado (com cache de resultados).
+    on_wait(segundos) é chamado a cada POLL_INTERVAL enquanto o job não termina.
+    Sem pool, ou com o pool quebrado, roda no próprio thread.
+    """
+    key = job_key(name, args, kwargs)
+    hit, value = _cached(key)
+    if hit:
+        inc("poseidon_compute_cache_hits_total", job=name)
+        return value
+
+    if _get_pool() is None:
+        value = func(*args, **kwargs)
+        _store(key, value)
+        return value
+
+    session = _session_id()
+    start = time.monotonic()
+    for attempt in range(2):
+        try:
+            key, future = submit(name, func, *args, **kwargs)
+        except BrokenProcessPool:
+            _reset_pool()
+            continue
+        try:
+            while True:
+                try:
+                    return _unwrap(future.result(timeout=POLL_INTERVAL))
+                except FutureTimeout:
+                    if on_wait is not None:
+                        on_wait(time.monotonic() - start)
+        except CancelledError:
+            # Outra sessão abandonou o job no instante em que esta entrou: reenvia
+            continue
+        except BrokenProcessPool:
+            _reset_pool()
+            continue
+        except BaseException:
+            # Rerun/parada da sessão (ou erro do job): larga o job
+            _release(key, session)
+            raise
+
+    # Pool indisponível: calcula aqui mesmo
+    value = func(*args, **kwargs)
+    _store(key, value)
+    return value
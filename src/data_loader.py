@@ -1,62 +1,178 @@
-import yfinance as yf
 import pandas as pd
-from bcb import sgs
 import streamlit as st
+from src.asset_records import AssetBatch, AssetSnapshot, optimize_frame
+from src.metrics import instrument, record_cache_miss
+from src.singleflight import single_flight
+from src.upstream import call_upstream, fresh_cache, remember, recall
 
+@instrument("get_macro_indicators")
+@single_flight("get_macro_indicators")
 def get_macro_indicators():
     """
     Busca Selic e IPCA atualizados do BCB. 
     Possui fallback silencioso caso o site esteja fora ou sem internet.
     """
     try:
+        from bcb import sgs
         # 432: Meta Selic, 13522: IPCA acumulado 12 meses
-        selic_meta = sgs.get({'selic': 432}, last=1)
-        ipca_12m = sgs.get({'ipca_12m': 13522}, last=1)
+        selic_meta = call_upstream("bcb", sgs.get, {'selic': 432}, last=1)
+        ipca_12m = call_upstream("bcb", sgs.get, {'ipca_12m': 13522}, last=1)
 
-        return {
+        data = {
             'selic': float(selic_meta['selic'].iloc[-1]),
             'ipca': float(ipca_12m['ipca_12m'].iloc[-1])
         }
+        remember("macro", data)
+        return data
     except Exception:
-        # Fallback silencioso (Valores médios históricos se offline)
-        return {'selic': 11.25, 'ipca': 4.50} 
+        # Último valor bom; se nunca houve, valores médios históricos
+        return recall("macro", {'selic': 11.25, 'ipca': 4.50})
 
-@st.cache_data(ttl=3600)
-def get_asset_info(ticker):
+# Níveis de atualização: cotação (leve, frequente) x fundamentos (.info, diário)
+QUOTE_TTL = 300
+FUNDAMENTALS_TTL = 86400
+
+@instrument("get_fundamentals")
+@fresh_cache(st.cache_data(ttl=FUNDAMENTALS_TTL))
+@single_flight("get_fundamentals")
+def get_fundamentals(ticker):
     """
-    Busca informações básicas de um ativo via Yahoo Finance.
-    Cache de 1 hora para evitar excesso de requisições.
+    Busca os fundamentos de um ativo via Yahoo Finance (.info).
+    .info é lento (baixa todo o metadado), por isso o cache é diário.
     """
+    record_cache_miss("get_fundamentals")
     try:
-        ticker_obj = yf.Ticker(ticker)
-        # .info can be very slow as it fetches a lot of metadata.
-        # We try to get only what we need.
-        info = ticker_obj.info
+        import yfinance as yf
+        info = call_upstream("yahoo", lambda: yf.Ticker(ticker).info)
+    except Exception:
+        # Circuito aberto ou falha: volta direto para o último dado bom. Fica
+        # fora do cache diário: a próxima chamada tenta o Yahoo de novo
+        return recall(("fundamentals", ticker))
+
+    data = AssetSnapshot.from_info(ticker, info)
+    remember(("fundamentals", ticker), data)
+    return data
+
+@instrument("get_batch_quotes")
+@fresh_cache(st.cache_data(ttl=QUOTE_TTL))
+@single_flight("get_batch_quotes")
+def get_batch_quotes(tickers):
+    """
+    Cotação leve em lote: um único yf.download para todos os ativos.
+    Retorna {ticker: último preço}.
+    """
+    record_cache_miss("get_batch_quotes")
+    tickers = list(tickers)
+    try:
+        import yfinance as yf
+        data = call_upstream("yahoo", yf.download, tickers, period="5d", interval="1d", progress=False, auto_adjust=False)
+        if data.empty or 'Close' not in data.columns:
+            raise ValueError("Cotações vazias")
         
-        data = {
-            'symbol': ticker,
-            'name': info.get('longName', ticker),
-            'price': info.get('currentPrice', info.get('regularMarketPrice', 0.0)) or 0.0,
-            'sector': info.get('sector', 'Unknown'),
-            'pe_ratio': info.get('forwardPE', info.get('trailingPE', 0.0)) or 0.0,
-            'roe': info.get('returnOnEquity', 0.0) or 0.0,
-            'dividend_yield': info.get('dividendYield', 0.0) or 0.0,
-            'beta': info.get('beta', 0.0) or 0.0,
-            'market_cap': info.get('marketCap', 0.0) or 0.0
-        }
-        return data
+        close = data['Close']
+        if isinstance(close, pd.Series):
+            close = close.to_frame(tickers[0])
+        
+        last = close.ffill().iloc[-1]
+        quotes = {t: float(p) for t, p in last.items() if pd.notna(p) and p > 0}
+        for t, p in quotes.items():
+            remember(("quote", t), p)
+        return quotes
     except Exception:
+        stale = {t: recall(("quote", t)) for t in tickers}
+        return {t: p for t, p in stale.items() if p is not None}
+
+def apply_quotes(df, quotes):
+    """
+    Sobrepõe as cotações frescas aos fundamentos (preço e valor de mercado).
+    """
+    if df.empty or not quotes:
+        return df
+    
+    symbols = df['symbol']
+    if isinstance(symbols.dtype, pd.CategoricalDtype):
+        # Consulta o dict uma vez por categoria, não por linha
+        by_category = symbols.cat.categories.map(quotes).to_numpy(dtype=float)
+        fresh = pd.Series(by_category[symbols.cat.codes], index=df.index)
+    else:
+        fresh = symbols.map(quotes)
+
+    # Cópia rasa: as colunas novas substituem as antigas sem tocar no
+    # DataFrame original (que pode estar em cache)
+    df = df.copy(deep=False)
+    price = fresh.fillna(df['price']).astype(df['price'].dtype)
+    df['price'] = price
+    if 'shares' in df.columns:
+        has_shares = fresh.notna() & (df['shares'] > 0)
+        df['market_cap'] = df['market_cap'].where(~has_shares, price * df['shares'])
+    return df
+
+def get_asset_info(ticker):
+    """
+    Busca informações básicas de um ativo (fundamentos diários + cotação recente).
+    """
+    data = get_fundamentals(ticker)
+    if data is None:
         return None
+    
+    price = get_batch_quotes([ticker]).get(ticker)
+    if price:
+        data = data.with_quote(price)
+    return data
+
+def get_batch_fundamentals(tickers):
+    """
+    Busca os fundamentos para uma lista de ativos e retorna um DataFrame
+    colunar (float32 + categóricos, ver AssetBatch).
+    """
+    return AssetBatch.from_records(get_fundamentals(t) for t in tickers).to_frame()
 
-@st.cache_data(ttl=3600)
+@instrument("get_batch_asset_data")
 def get_batch_asset_data(tickers):
     """
     Busca dados para uma lista de ativos e retorna um DataFrame.
+    Fundamentos vêm do cache diário; preço e valor de mercado, do lote de cotações.
+    """
+    return apply_quotes(get_batch_fundamentals(tickers), get_batch_quotes(tickers))
+
+
+def get_universe_snapshot(universe, tickers):
+    """
+    Retorna os dados do universo a partir do snapshot colunar em disco.
+    O snapshot guarda o nível de fundamentos (diário); as cotações frescas
+    são aplicadas por cima a cada leitura.
+    Se o snapshot não existir ou estiver vencido, faz a varredura completa
+    e grava um novo snapshot para os próximos processos/sessões.
+    """
+    from src.snapshot_store import read_snapshot
+
+    df = read_snapshot(universe, tickers, max_age=FUNDAMENTALS_TTL)
+    if df is None:
+        df = _refresh_universe_snapshot(universe, tickers)
+    else:
+        df = optimize_frame(df) # Snapshots gravados antes do AssetBatch (float64/object)
+    return apply_quotes(df, get_batch_quotes(tickers))
+
+@single_flight("refresh_universe_snapshot")
+def _refresh_universe_snapshot(universe, tickers):
+    """
+    Varredura completa + gravação do snapshot. Sessões que encontram o
+    snapshot vencido ao mesmo tempo compartilham uma única varredura.
+    Cada varredura também entra no histórico de fundamentos (consultas as-of).
     """
-    data_list = []
-    for t in tickers:
-        info = get_asset_info(t)
-        if info:
-            data_list.append(info)
-    return pd.DataFrame(data_list)
+    from src.fundamentals_history import record_fundamentals
+    from src.snapshot_store import write_snapshot
 
+    df = get_batch_fundamentals(tickers)
+    if not df.empty:
+        try:
+            # O snapshot registra os ativos que vieram de fato; os que falharam
+            # fazem o snapshot vencer mais cedo (ver read_snapshot)
+            write_snapshot(universe, df, requested=tickers)
+        except Exception:
+            pass # Snapshot é otimização; falha de disco não derruba o scanner
+        try:
+            record_fundamentals(df)
+        except Exception:
+            pass # Idem para o histórico: perde-se um ponto, não o scanner
+    return df
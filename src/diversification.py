@@ -0,0 +1,215 @@
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# --- DIVERSIFICAÇÃO ---
+# Análise de correlação dos ativos escolhidos pelo scanner: matriz de
+# correlação, clusters hierárquicos, número efetivo de apostas e uma seleção
+# gulosa do Top k que evita nomes muito correlacionados (ex.: três bancos).
+# As somas da covariância ficam em memória (CovarianceState) e são
+# atualizadas só com os pregões novos (e os que saem da janela): um dia novo
+# custa O(n²), não O(T·n²) do recálculo completo. Os últimos REVISION_ROWS
+# pregões já vistos são refeitos a cada sincronização: a barra do dia, lida
+# com o pregão em aberto, é revisada pelo yfinance depois. As correlações são
+# "pairwise complete", como DataFrame.corr(): cada par usa os dias em que os
+# dois ativos têm retorno.
+
+RETURN_PERIOD = "1y"
+RETURN_WINDOW = 252          # Pregões na janela das correlações
+MIN_OBSERVATIONS = 60        # Pares com menos dias em comum ficam sem correlação (NaN)
+MAX_PAIR_CORRELATION = 0.7   # Limite da seleção gulosa para qualquer par escolhido
+CLUSTER_DISTANCE = 0.5       # Corte do dendrograma (distância sqrt((1 - rho) / 2))
+REVISION_ROWS = 2            # Pregões mais recentes relidos do painel a cada sync
+
+class CovarianceState:
+    """
+    Somas por par de ativos sobre a janela de retornos diários, com NaN
+    para dias sem dado. Para cada par (i, j), nos dias em que ambos existem:
+      count = n, sum_x[i, j] = soma de x_i, sum_x2[i, j] = soma de x_i²,
+      sum_xy[i, j] = soma de x_i * x_j.
+    """
+
+    def __init__(self, tickers, window=RETURN_WINDOW):
+        self.tickers = list(tickers)
+        self.index = {t: i for i, t in enumerate(self.tickers)}
+        self.window = window
+        n = len(self.tickers)
+        self.count = np.zeros((n, n))
+        self.sum_x = np.zeros((n, n))
+        self.sum_x2 = np.zeros((n, n))
+        self.sum_xy = np.zeros((n, n))
+        self.rows = deque()   # (data, retornos) na janela, do mais antigo ao mais novo
+        self.last_date = None
+        self._lock = threading.Lock()
+
+    def _accumulate(self, returns, sign):
+        valid = ~np.isnan(returns)
+        mask = valid.astype(np.float64)
+        x = np.where(valid, returns, 0.0)
+        self.count += sign * (mask.T @ mask)
+        self.sum_x += sign * (x.T @ mask)
+        self.sum_x2 += sign * ((x * x).T @ mask)
+        self.sum_xy += sign * (x.T @ x)
+
+    def add(self, dates, returns):
+        """Acrescenta pregões (linhas: datas, colunas: self.tickers) e tira os que saem da janela."""
+        returns = np.asarray(returns, dtype=np.float64).reshape(len(dates), len(self.tickers))
+        if not len(dates):
+            return
+        self._accumulate(returns, 1)
+        self.rows.extend(zip(dates, returns))
+        expired = [self.rows.popleft()[1] for _ in range(max(len(self.rows) - self.window, 0))]
+        if expired:
+            self._accumulate(np.vstack(expired), -1)
+        self.last_date = dates[-1]
+
+    def revise(self, n=REVISION_ROWS):
+        """Tira das somas os n pregões mais recentes (a próxima sync os relê do painel)."""
+        revised = [self.rows.pop()[1] for _ in range(min(n, len(self.rows)))]
+        if revised:
+            self._accumulate(np.vstack(revised), -1)
+        self.last_date = self.rows[-1][0] if self.rows else None
+
+    def sync(self, panel):
+        """
+        Alinha com o painel de retornos (DataFrame datas x tickers): os últimos
+        REVISION_ROWS pregões vistos são refeitos com os valores atuais do
+        painel e os pregões novos entram. Retorna quantos entraram.
+        """
+        with self._lock:
+            if panel.empty:
+                return 0 # Painel indisponível: mantém as somas
+            panel = panel.reindex(columns=self.tickers)
+            self.revise()
+            if self.last_date is not None:
+                panel = panel[panel.index > self.last_date]
+            panel = panel.tail(self.window)
+            self.add(list(panel.index), panel.to_numpy(dtype=np.float64))
+            return len(panel)
+
+    def _positions(self, tickers):
+        return np.arange(len(self.tickers)) if tickers is None else np.array([self.index[t] for t in tickers], dtype=int)
+
+    def covariance(self, tickers=None):
+        """Covariância amostral (ddof=1) dos retornos diários, por par."""
+        pos = self._positions(tickers)
+        with self._lock:
+            n = self.count[np.ix_(pos, pos)]
+            sx = self.sum_x[np.ix_(pos, pos)]
+            sxy = self.sum_xy[np.ix_(pos, pos)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (sxy - sx * sx.T / n) / (n - 1)
+        return np.where(n >= MIN_OBSERVATIONS, cov, np.nan)
+
+    def correlation(self, tickers=None):
+        """Correlação de Pearson por par (dias em comum), como DataFrame.corr()."""
+        pos = self._positions(tickers)
+        with self._lock:
+            n = self.count[np.ix_(pos, pos)]
+            sx = self.sum_x[np.ix_(pos, pos)]
+            sx2 = self.sum_x2[np.ix_(pos, pos)]
+            sxy = self.sum_xy[np.ix_(pos, pos)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = (n * sxy - sx * sx.T) / np.sqrt((n * sx2 - sx ** 2) * (n * sx2.T - sx.T ** 2))
+        corr = np.clip(np.where(n >= MIN_OBSERVATIONS, corr, np.nan), -1.0, 1.0)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+def cluster_assets(corr, max_distance=CLUSTER_DISTANCE):
+    """
+    Clusters hierárquicos (ligação média) pela distância sqrt((1 - rho) / 2).
+    Pares sem correlação conhecida contam como descorrelacionados.
+    Retorna (rótulo do cluster por ativo, ordem das folhas do dendrograma).
+    """
+    from scipy.cluster.hierarchy import fcluster, leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    n = len(corr)
+    if n < 2:
+        return np.ones(n, dtype=int), np.arange(n)
+    distance = np.sqrt(np.clip((1 - np.nan_to_num(corr, nan=0.0)) / 2, 0.0, 1.0))
+    np.fill_diagonal(distance, 0.0)
+    tree = linkage(squareform(distance, checks=False), method='average')
+    return fcluster(tree, t=max_distance, criterion='distance'), leaves_list(tree)
+
+def effective_bets(cov, weights=None):
+    """
+    Número efetivo de apostas (Meucci): exponencial da entropia das
+    contribuições de risco nos fatores principais (autovetores da covariância).
+    Vai de 1 (uma aposta só) ao número de ativos (apostas independentes).
+    """
+    cov = np.nan_to_num(np.asarray(cov, dtype=np.float64))
+    n = len(cov)
+    weights = np.full(n, 1 / n) if weights is None else np.asarray(weights, dtype=np.float64)
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    exposure = eigenvectors.T @ weights
+    risk = np.clip(eigenvalues, 0.0, None) * exposure ** 2
+    total = risk.sum()
+    if total <= 0:
+        return float('nan')
+    share = risk[risk > 0] / total
+    return float(np.exp(-(share * np.log(share)).sum()))
+
+def select_decorrelated(corr, k, max_corr=MAX_PAIR_CORRELATION, clusters=None):
+    """
+    Seleção gulosa pela ordem do ranking (linhas de corr já em ordem): entra
+    o próximo ativo cuja maior correlação com os já escolhidos não passa de
+    max_corr e cujo cluster ainda não está na carteira. Se faltar gente,
+    completa com os de menor correlação máxima. Retorna as posições.
+    """
+    n = len(corr)
+    corr = np.nan_to_num(corr, nan=0.0)
+    worst = np.full(n, -np.inf)   # maior correlação de cada candidato com os escolhidos
+    taken = np.zeros(n, dtype=bool)
+    used_clusters = set()
+    selected = []
+    for pos in range(n):
+        if len(selected) == k:
+            break
+        if worst[pos] > max_corr or (clusters is not None and clusters[pos] in used_clusters):
+            continue
+        selected.append(pos)
+        taken[pos] = True
+        worst = np.maximum(worst, corr[pos])
+        if clusters is not None:
+            used_clusters.add(clusters[pos])
+    while len(selected) < min(k, n):
+        pos = int(np.argmin(np.where(taken, np.inf, worst)))
+        selected.append(pos)
+        taken[pos] = True
+        worst = np.maximum(worst, corr[pos])
+    return selected
+
+def _mean_pair_correlation(corr):
+    upper = corr[np.triu_indices(len(corr), 1)]
+    upper = upper[~np.isnan(upper)]
+    return float(upper.mean()) if upper.size else float('nan')
+
+def diversify(state, ranked, k=5, max_corr=MAX_PAIR_CORRELATION, max_distance=CLUSTER_DISTANCE):
+    """
+    Diversificação dos candidatos `ranked` (tickers na ordem do scanner):
+    Top k descorrelacionado, clusters e a comparação com o Top k puro.
+    """
+    ranked = [t for t in ranked if t in state.index]
+    if not ranked:
+        return None
+    corr = state.correlation(ranked)
+    clusters, order = cluster_assets(corr, max_distance)
+    selected = select_decorrelated(corr, k, max_corr, clusters)
+    naive = list(range(min(k, len(ranked))))
+    cov = state.covariance(ranked)
+
+    def summary(positions):
+        sub = np.ix_(positions, positions)
+        return {'tickers': [ranked[p] for p in positions],
+                'effective_bets': effective_bets(cov[sub]),
+                'mean_correlation': _mean_pair_correlation(corr[sub])}
+
+    return {
+        'selected': summary(selected),
+        'naive': summary(naive),
+        'clusters': pd.Series(clusters, index=ranked, name='cluster'),
+        'correlation': pd.DataFrame(corr, index=ranked, columns=ranked).iloc[order, order],
+    }
@@ -1,23 +1,33 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import streamlit as st
+from src.metrics import instrument, record_cache_miss
+from src.singleflight import single_flight
+from src.upstream import call_upstream, fresh_cache, remember, recall
 
-@st.cache_data(ttl=3600)
+def _fetch_page(url, headers, timeout):
+    import requests
+    response = requests.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status() # Garante que a requisição foi bem sucedida
+    return response.text
+
+@instrument("get_fii_metrics")
+@fresh_cache(st.cache_data(ttl=3600))
+@single_flight("get_fii_metrics")
 def get_fii_metrics(ticker):
     """
     Scrapes basic FII metrics from StatusInvest.
     Metrics: P/VP, DY, Vacancy.
     Note: Scraping can be fragile, using try-except.
     """
+    record_cache_miss("get_fii_metrics")
     ticker_clean = ticker.replace('.SA', '').upper()
     url = f"https://statusinvest.com.br/fundos-imobiliarios/{ticker_clean.lower()}"
     headers = {'User-Agent': 'Mozilla/5.0'}
     
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status() # Garante que a requisição foi bem sucedida
-        soup = BeautifulSoup(response.text, 'html.parser')
+        from bs4 import BeautifulSoup
+        html = call_upstream("statusinvest", _fetch_page, url, headers, pass_timeout=True)
+        soup = BeautifulSoup(html, 'html.parser')
         
         # P/VP - Usually in a 'value' class within a specific container
         p_vp = 0.0
@@ -36,11 +46,14 @@ def get_fii_metrics(ticker):
             dy_val = dy_elem.find_next('strong').text.replace(',', '.').replace('%', '')
             dy = float(dy_val) / 100
             
-        return {'ticker': ticker_clean, 'p_vp': p_vp, 'dy': dy, 'vacancy': vacancy}
+        data = {'ticker': ticker_clean, 'p_vp': p_vp, 'dy': dy, 'vacancy': vacancy}
+        remember(("fii", ticker_clean), data)
+        return data
     except Exception as e:
-        # Fallback to realistic-ish data or zeros
-        return {'ticker': ticker_clean, 'p_vp': 1.0, 'dy': 0.09, 'vacancy': 0.05}
+        # Último dado bom; senão, fallback to realistic-ish data or zeros
+        return recall(("fii", ticker_clean), {'ticker': ticker_clean, 'p_vp': 1.0, 'dy': 0.09, 'vacancy': 0.05})
 
+@instrument("get_fii_batch")
 def get_fii_batch(tickers):
     data = []
     for t in tickers:
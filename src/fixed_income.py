@@ -0,0 +1,161 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- RENDA FIXA ---
+# Comparador de ofertas (CDB, LCI, LCA, Tesouro, ...) numa passada vetorizada:
+# cada oferta vira taxa bruta anual (pelo indexador e pelas projeções de
+# CDI/Selic/IPCA), IR regressivo pelo prazo, taxa líquida, equivalente em %
+# do CDI e gross-up (a taxa tributada que empata com a líquida).
+# Tabela de ofertas: CSV com as colunas abaixo (separador "," ou ";", decimal
+# "." ou ","); os nomes em português da corretora também são aceitos.
+#   emissor, produto, indexador (CDI | PRE | IPCA | SELIC), taxa, prazo_dias,
+#   aplicacao_minima (opcional)
+#   CDI: taxa em % do CDI (110 = 110% do CDI); PRE: % a.a.;
+#   IPCA/SELIC: spread em % a.a. sobre o índice (IPCA + 6,5).
+
+OFFERS_PATH = os.environ.get("POSEIDON_FIXED_INCOME_OFFERS", os.path.join("data", "renda_fixa", "ofertas.csv"))
+
+# IR regressivo (Lei 11.033/2004): (prazo máximo em dias corridos, alíquota)
+IR_BRACKETS = ((180, 0.225), (360, 0.20), (720, 0.175), (np.inf, 0.15))
+TAX_EXEMPT = ("LCI", "LCA", "CRI", "CRA", "LIG", "DEBENTURE INCENTIVADA") # Prefixos do produto
+CDI_SPREAD = 0.10 # CDI ~ Selic meta - 0,10 p.p.
+BUSINESS_DAYS = 252
+INDEXERS = ("CDI", "PRE", "IPCA", "SELIC")
+
+_ALIASES = {
+    'emissor': 'emissor', 'instituicao': 'emissor', 'instituição': 'emissor', 'banco': 'emissor',
+    'produto': 'produto', 'tipo': 'produto', 'ativo': 'produto',
+    'indexador': 'indexador', 'index': 'indexador', 'indice': 'indexador', 'índice': 'indexador',
+    'taxa': 'taxa', 'rentabilidade': 'taxa',
+    'prazo_dias': 'prazo_dias', 'prazo': 'prazo_dias', 'dias': 'prazo_dias',
+    'aplicacao_minima': 'aplicacao_minima', 'aplicação mínima': 'aplicacao_minima', 'minimo': 'aplicacao_minima',
+}
+_INDEXER_ALIASES = {'PRÉ': 'PRE', 'PREFIXADO': 'PRE', '% CDI': 'CDI', 'DI': 'CDI', 'IPCA+': 'IPCA', 'SELIC+': 'SELIC'}
+
+_CURRENCY_PREFIX = r'^(?:R\$|US\$|\$)\s*'
+_THOUSANDS_ONLY = r'^-?\d{1,3}(?:\.\d{3})+$' # "1.000", "25.000.000": milhar, não decimal
+
+def _to_number(values):
+    """
+    Coluna numérica aceitando o formato brasileiro (1.234,56 e 1.000), o
+    prefixo de moeda (R$ 5.000,00) e o sufixo '%'.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(np.float64)
+    text = values.astype(str).str.strip().str.rstrip('%').str.strip()
+    text = text.str.replace(_CURRENCY_PREFIX, '', regex=True)
+    brazilian = text.str.contains(',', regex=False) | text.str.match(_THOUSANDS_ONLY)
+    text = text.where(~brazilian, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(text, errors='coerce')
+
+def load_offers(source):
+    """
+    Lê a tabela de ofertas (caminho, bytes ou arquivo aberto) e normaliza:
+    colunas canônicas, produto/indexador em maiúsculas, números em float.
+    Linhas sem taxa, prazo ou com indexador desconhecido são descartadas.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    df = pd.read_csv(source, sep=None, engine='python', dtype=str, encoding='utf-8-sig')
+    df.columns = [_ALIASES.get(c.strip().lower(), c.strip().lower()) for c in df.columns]
+    missing = {'produto', 'indexador', 'taxa', 'prazo_dias'} - set(df.columns)
+    if missing:
+        raise ValueError(f"Tabela de ofertas sem as colunas: {', '.join(sorted(missing))}")
+
+    if 'emissor' not in df.columns:
+        df['emissor'] = ''
+    if 'aplicacao_minima' not in df.columns:
+        df['aplicacao_minima'] = 0.0
+    df['produto'] = df['produto'].str.strip().str.upper()
+    indexer = df['indexador'].str.strip().str.upper()
+    df['indexador'] = indexer.replace(_INDEXER_ALIASES)
+    for col in ('taxa', 'prazo_dias', 'aplicacao_minima'):
+        df[col] = _to_number(df[col])
+    df['aplicacao_minima'] = df['aplicacao_minima'].fillna(0.0)
+
+    valid = df['indexador'].isin(INDEXERS) & df['taxa'].notna() & (df['prazo_dias'] > 0)
+    return df[valid].reset_index(drop=True)
+
+def ir_rate(days):
+    """Alíquota do IR regressivo para prazos em dias corridos (escalar ou array)."""
+    limits = np.array([limit for limit, _ in IR_BRACKETS])
+    rates = np.array([rate for _, rate in IR_BRACKETS])
+    return rates[np.searchsorted(limits, np.asarray(days), side='left')]
+
+def projected_rates(macro, selic=None, ipca=None):
+    """
+    Projeção anual (decimal) de Selic, CDI e IPCA para o prazo das ofertas.
+    Sem projeção informada, usa o nível atual do macro (Selic meta, IPCA 12m).
+    """
+    selic = macro['selic'] if selic is None else selic
+    ipca = macro['ipca'] if ipca is None else ipca
+    return {'selic': selic / 100, 'cdi': max(selic - CDI_SPREAD, 0.0) / 100, 'ipca': ipca / 100}
+
+def _cdi_percent(annual, cdi):
+    """Taxa anual expressa em % do CDI (pela taxa diária, como o mercado cota)."""
+    cdi_daily = (1 + cdi) ** (1 / BUSINESS_DAYS) - 1
+    return ((1 + annual) ** (1 / BUSINESS_DAYS) - 1) / cdi_daily * 100
+
+def rank_offers(offers, macro, selic=None, ipca=None, amount=None, max_days=None):
+    """
+    Ranking das ofertas pela taxa líquida anual, numa passada sobre arrays.
+    amount filtra pela aplicação mínima e adiciona o valor líquido no
+    vencimento; max_days filtra pelo prazo. Colunas adicionadas:
+      taxa_bruta_aa, aliquota_ir, taxa_liquida_aa, liquido_pct_cdi, gross_up_aa
+    (todas em %; gross_up_aa é a taxa bruta que um título tributado precisaria
+    pagar no mesmo prazo para empatar com o líquido desta oferta).
+    """
+    rates = projected_rates(macro, selic, ipca)
+    if amount is not None:
+        offers = offers[offers['aplicacao_minima'] <= amount]
+    if max_days is not None:
+        offers = offers[offers['prazo_dias'] <= max_days]
+    if offers.empty:
+        return offers.assign(taxa_bruta_aa=[], aliquota_ir=[], taxa_liquida_aa=[],
+                             liquido_pct_cdi=[], gross_up_aa=[])
+
+    indexer = offers['indexador'].to_numpy()
+    rate = offers['taxa'].to_numpy(dtype=np.float64) / 100
+    days = offers['prazo_dias'].to_numpy(dtype=np.float64)
+
+    cdi_daily = (1 + rates['cdi']) ** (1 / BUSINESS_DAYS) - 1
+    gross = np.select(
+        [indexer == "CDI", indexer == "PRE", indexer == "IPCA", indexer == "SELIC"],
+        [(1 + cdi_daily * rate) ** BUSINESS_DAYS - 1, rate,
+         (1 + rates['ipca']) * (1 + rate) - 1, (1 + rates['selic']) * (1 + rate) - 1]
+    )
+
+    years = days / 365
+    gain = (1 + gross) ** years - 1
+    exempt = offers['produto'].str.startswith(TAX_EXEMPT).to_numpy() # "LCA PÓS", "LCI 90 DIAS"...
+    bracket = ir_rate(days)
+    tax = np.where(exempt, 0.0, bracket)
+    net_gain = gain * (1 - tax)
+    net = (1 + net_gain) ** (1 / years) - 1
+    # Gross-up: rendimento que, tributado pela alíquota do prazo, rende o mesmo líquido
+    gross_up = (1 + net_gain / (1 - bracket)) ** (1 / years) - 1
+
+    ranked = offers.assign(
+        taxa_bruta_aa=gross * 100, aliquota_ir=tax * 100, taxa_liquida_aa=net * 100,
+        liquido_pct_cdi=_cdi_percent(net, rates['cdi']), gross_up_aa=gross_up * 100
+    )
+    if amount is not None:
+        ranked['valor_liquido'] = amount * (1 + net_gain)
+    # mergesort: empates mantêm a ordem da tabela
+    return ranked.sort_values('taxa_liquida_aa', ascending=False, kind='mergesort').reset_index(drop=True)
+
+def compare_offers(cdb_pct, lci_pct, days, macro, selic=None):
+    """
+    Comparação rápida CDB x LCI/LCA (% do CDI) no mesmo prazo, pelo mesmo motor.
+    Retorna o ranking das duas e o % do CDI que o CDB precisa pagar para empatar.
+    """
+    offers = pd.DataFrame({
+        'emissor': ['', ''], 'produto': ['CDB', 'LCI'], 'indexador': ['CDI', 'CDI'],
+        'taxa': [cdb_pct, lci_pct], 'prazo_dias': [days, days], 'aplicacao_minima': [0.0, 0.0]
+    })
+    ranked = rank_offers(offers, macro, selic=selic)
+    gross_up = ranked.loc[ranked['produto'] == 'LCI', 'gross_up_aa'].iloc[0] / 100
+    return ranked, float(_cdi_percent(gross_up, projected_rates(macro, selic)['cdi']))
@@ -0,0 +1,219 @@
+import argparse
+import os
+import time
+from itertools import count
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+from src.asset_records import NUMERIC_FIELDS, SCREEN_DTYPE, optimize_frame
+from src.universe import UNIVERSES
+
+# --- HISTÓRICO DE FUNDAMENTOS ---
+# Registro append-only de cada atualização de fundamentos (P/L, ROE, DY, ...),
+# para rodar o scanner "como se fosse a data D" sem look-ahead e sem rede.
+#   - cada atualização grava um segmento novo e imutável (Arrow IPC colunar,
+#     comprimido com zstd) em HISTORY_DIR; nada é reescrito;
+#   - a leitura junta os segmentos, ordena por (ticker, data) e monta uma
+#     chave única int64 (código do ticker << 32 | segundos): a consulta
+#     "as-of D" do universo inteiro é um único searchsorted;
+#   - compact() junta os segmentos num só (mesmas linhas), para não acumular
+#     milhares de arquivos pequenos.
+# O snapshot do universo (data_loader._refresh_universe_snapshot) registra
+# aqui a cada varredura completa.
+# Datas e horários sem fuso nas consultas são do horário de Brasília (B3):
+# "2025-03-10" vai até 23:59:59 de Brasília, não de UTC.
+
+HISTORY_DIR = os.path.join("data", "fundamentals_history")
+HISTORY_COMPRESSION = "zstd"
+TEXT_FIELDS = ('symbol', 'name', 'sector')
+MARKET_TZ = "America/Sao_Paulo"
+
+_sequence = count()
+
+def _segments():
+    try:
+        return tuple(sorted(f for f in os.listdir(HISTORY_DIR) if f.endswith(".arrow")))
+    except OSError:
+        return ()
+
+def _write_segment(table, recorded_at):
+    """Grava um segmento novo (atômico: temporário + rename)."""
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    # Nome em ordem cronológica; pid + contador separam gravações no mesmo segundo
+    name = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(recorded_at))}-{os.getpid()}-{next(_sequence):05d}.arrow"
+    path = os.path.join(HISTORY_DIR, name)
+    tmp_path = f"{path}.tmp"
+    options = pa.ipc.IpcWriteOptions(compression=HISTORY_COMPRESSION)
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+def record_fundamentals(df, recorded_at=None):
+    """
+    Registra uma atualização de fundamentos (DataFrame no formato do
+    AssetBatch). recorded_at: data da atualização (padrão: agora).
+    """
+    if df.empty:
+        return None
+    recorded_at = time.time() if recorded_at is None else pd.Timestamp(recorded_at).timestamp()
+    columns = {col: df[col].astype(str).to_numpy(dtype=object) if col in df.columns else np.full(len(df), '', dtype=object)
+               for col in TEXT_FIELDS}
+    for col in NUMERIC_FIELDS:
+        values = df[col] if col in df.columns else pd.Series(0.0, index=df.index)
+        columns[col] = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=SCREEN_DTYPE)
+    columns['recorded_at'] = pa.array(np.full(len(df), int(recorded_at), dtype=np.int64), pa.timestamp('s'))
+    return _write_segment(pa.table(columns), recorded_at)
+
+class HistoryIndex:
+    """Histórico em memória, ordenado por (ticker, data), com a chave de busca."""
+    __slots__ = ('frame', 'keys', 'codes')
+
+    def __init__(self, frame, keys, codes):
+        self.frame = frame   # linhas ordenadas por (ticker, data)
+        self.keys = keys     # código << 32 | segundos, crescente
+        self.codes = codes   # ticker -> código
+
+    def __len__(self):
+        return len(self.keys)
+
+def _build_index(table):
+    seconds = table.column('recorded_at').cast(pa.int64()).to_numpy()
+    frame = table.drop_columns(['recorded_at']).to_pandas()
+    codes, symbols = pd.factorize(frame['symbol'], sort=True)
+    keys = (codes.astype(np.int64) << 32) | seconds
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    # Mesmo ticker no mesmo segundo (ex.: segmento repetido por um compact
+    # concorrente): fica o último
+    last = np.append(keys[1:] != keys[:-1], True)
+    order, keys = order[last], keys[last]
+    frame = frame.iloc[order].reset_index(drop=True)
+    frame['recorded_at'] = pd.to_datetime(seconds[order], unit='s')
+    return HistoryIndex(frame, keys, {s: i for i, s in enumerate(symbols)})
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _load(segments):
+    """Junta os segmentos (imutáveis: a lista de nomes basta como chave do cache)."""
+    tables = []
+    for name in segments:
+        with pa.OSFile(os.path.join(HISTORY_DIR, name), 'rb') as source:
+            tables.append(pa.ipc.open_file(source).read_all())
+    if not tables:
+        return None
+    return _build_index(pa.concat_tables(tables, promote_options='default'))
+
+def load_history():
+    """Índice do histórico inteiro (None se ainda não há registros)."""
+    return _load(_segments())
+
+def _cutoff(date):
+    """Segundos do fim do dia D (data sem hora) ou do próprio instante; sem fuso = MARKET_TZ."""
+    ts = pd.Timestamp(date)
+    if ts == ts.normalize() and not (isinstance(date, str) and ':' in date):
+        ts += pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(MARKET_TZ, ambiguous=True, nonexistent='shift_forward')
+    return int(ts.timestamp())
+
+def as_of(date, tickers=None, index=None):
+    """
+    Fundamentos de cada ticker como eram conhecidos na data D (o último registro
+    até o fim do dia D), no formato do scanner (AssetBatch) + recorded_at.
+    tickers=None: todos os tickers do histórico. Tickers sem registro até D
+    ficam de fora (não existiam para o scanner naquela data).
+    """
+    index = load_history() if index is None else index
+    if index is None:
+        return pd.DataFrame(columns=list(TEXT_FIELDS + NUMERIC_FIELDS) + ['recorded_at'])
+    if tickers is None:
+        codes = np.arange(len(index.codes), dtype=np.int64)
+    else:
+        codes = np.fromiter((index.codes[t] for t in tickers if t in index.codes), dtype=np.int64)
+
+    idx = np.searchsorted(index.keys, (codes << 32) | _cutoff(date), side='right') - 1
+    found = (idx >= 0) & (index.keys[np.maximum(idx, 0)] >> 32 == codes)
+    return optimize_frame(index.frame.iloc[idx[found]].reset_index(drop=True))
+
+def history(ticker, index=None):
+    """Todos os registros de um ticker, do mais antigo ao mais novo."""
+    index = load_history() if index is None else index
+    if index is None or ticker not in index.codes:
+        return pd.DataFrame(columns=list(TEXT_FIELDS + NUMERIC_FIELDS) + ['recorded_at'])
+    code = index.codes[ticker]
+    lo, hi = np.searchsorted(index.keys, [code << 32, (code + 1) << 32])
+    return index.frame.iloc[lo:hi].reset_index(drop=True)
+
+def screen_as_of(date, tickers=None):
+    """Scanner de ações (score_stocks) com os fundamentos conhecidos na data D."""
+    from src.analyzer import score_stocks
+
+    return score_stocks(as_of(date, tickers))
+
+def compact():
+    """
+    Junta todos os segmentos num só (as mesmas linhas, ordenadas). O segmento
+    novo é gravado antes de apagar os antigos: uma falha no meio só deixa
+    linhas repetidas, que a leitura descarta.
+    """
+    segments = _segments()
+    if len(segments) < 2:
+        return None
+    tables = []
+    for name in segments:
+        with pa.OSFile(os.path.join(HISTORY_DIR, name), 'rb') as source:
+            tables.append(pa.ipc.open_file(source).read_all())
+    table = pa.concat_tables(tables, promote_options='default')
+    table = table.sort_by([('symbol', 'ascending'), ('recorded_at', 'ascending')])
+    latest = table.column('recorded_at').cast(pa.int64()).to_numpy().max()
+    path = _write_segment(table, latest)
+    for name in segments:
+        os.remove(os.path.join(HISTORY_DIR, name))
+    return path
+
+def stats():
+    segments = _segments()
+    index = _load(segments)
+    size = sum(os.path.getsize(os.path.join(HISTORY_DIR, name)) for name in segments)
+    info = {'segments': len(segments), 'bytes': size, 'rows': 0, 'tickers': 0}
+    if index is not None:
+        info.update(rows=len(index), tickers=len(index.codes),
+                    first=str(index.frame['recorded_at'].min()), last=str(index.frame['recorded_at'].max()))
+    return info
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Histórico de fundamentos (consultas as-of, sem rede).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    query = sub.add_parser("as-of", help="fundamentos (ou o scanner) na data D")
+    query.add_argument("date", help="AAAA-MM-DD (fim do dia) ou AAAA-MM-DDTHH:MM; sem fuso = horário de Brasília")
+    # Só os universos do snapshot entram no histórico (FIIs vêm do StatusInvest, sem registro)
+    query.add_argument("--universe", choices=sorted(UNIVERSES), help="restringe aos tickers do universo")
+    query.add_argument("--screen", action="store_true", help="roda o score_stocks sobre o resultado")
+    sub.add_parser("compact", help="junta os segmentos num só")
+    sub.add_parser("stats", help="tamanho e cobertura do histórico")
+    args = parser.parse_args(argv)
+
+    from streamlit import logger
+    logger.set_log_level("error")
+
+    if args.command == "stats":
+        for key, value in stats().items():
+            print(f"{key:10s} {value}")
+    elif args.command == "compact":
+        path = compact()
+        print(f"Compactado em {path}" if path else "Nada a compactar.")
+    else:
+        tickers = None
+        if args.universe:
+            tickers = UNIVERSES[args.universe]
+        df = screen_as_of(args.date, tickers) if args.screen else as_of(args.date, tickers)
+        columns = [c for c in ('symbol', 'pe_ratio', 'roe', 'dividend_yield', 'price', 'score', 'recorded_at') if c in df.columns]
+        print(df[columns].to_string(index=False) if not df.empty else "Sem registros até essa data.")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,21 @@
+import base64
+import hashlib
+import hmac
+import secrets
+from urllib.parse import urlencode
+
 import streamlit as st
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-import json
+from src.metrics import instrument
+
+# --- LOGIN COM GOOGLE (OAuth 2.0) ---
+# Caminho de login sem etapas de rede desnecessárias:
+#   - a configuração OAuth (secrets + redirect) é montada uma vez por processo;
+#   - a URL de autorização é gerada uma única vez, já com o state assinado;
+#   - troca do código e userinfo vão direto aos endpoints (sem o documento de
+#     discovery do googleapiclient), numa requests.Session com pool de conexões
+#     compartilhada entre os logins (reaproveita TCP/TLS).
+# O fluxo não depende de sessão: o state é assinado com o client_secret e o
+# code_verifier do PKCE é derivado do próprio state assinado.
 
 # Scopes required: email and profile
 SCOPES = [
@@ -11,54 +24,86 @@ SCOPES = [
     'openid'
 ]
 
-def create_flow(state=None):
-    """Cria o fluxo OAuth usando as credenciais do st.secrets, detectando ambiente local/prod."""
-    try:
-        # Tenta pegar as URIs do secrets
-        prod_uri = st.secrets["google_oauth"].get("redirect_uri")
-        local_uri = st.secrets["google_oauth"].get("redirect_uri_local")
-
-        # Detecta se estamos rodando localmente (localhost ou 127.0.0.1)
-        # Em produção (Streamlit Cloud), o serverAddress é diferente de localhost
-        server_addr = st.get_option("browser.serverAddress")
-        is_local = server_addr in ["localhost", "127.0.0.1"]
-        
-        # Só usa a URI local se houver certeza de que é local E a URI local existe
-        if is_local and local_uri:
-            redirect_uri = local_uri
-        elif prod_uri:
-            redirect_uri = prod_uri
-        else:
-            # Fallback seguro para produção se nada for achado
-            redirect_uri = f"https://poseidon-investidorpro.streamlit.app/"
-        
-        client_config = {
-            "web": {
-                "client_id": st.secrets["google_oauth"]["client_id"],
-                "client_secret": st.secrets["google_oauth"]["client_secret"],
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "redirect_uris": [redirect_uri],
-            }
+AUTH_URI = "https://accounts.google.com/o/oauth2/auth"
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+# Mesmo recurso que o googleapiclient chamava via discovery (oauth2 v2)
+USERINFO_URI = "https://www.googleapis.com/oauth2/v2/userinfo"
+HTTP_TIMEOUT = 10
+HTTP_POOL_SIZE = 32
+
+@st.cache_resource
+def _oauth_config():
+    """
+    Configuração OAuth a partir do st.secrets, detectando ambiente local/prod.
+    Montada uma vez por processo (os secrets não mudam com o app rodando).
+    """
+    # Tenta pegar as URIs do secrets
+    prod_uri = st.secrets["google_oauth"].get("redirect_uri")
+    local_uri = st.secrets["google_oauth"].get("redirect_uri_local")
+
+    # Detecta se estamos rodando localmente (localhost ou 127.0.0.1)
+    # Em produção (Streamlit Cloud), o serverAddress é diferente de localhost
+    server_addr = st.get_option("browser.serverAddress")
+    is_local = server_addr in ["localhost", "127.0.0.1"]
+
+    # Só usa a URI local se houver certeza de que é local E a URI local existe
+    if is_local and local_uri:
+        redirect_uri = local_uri
+    elif prod_uri:
+        redirect_uri = prod_uri
+    else:
+        # Fallback seguro para produção se nada for achado
+        redirect_uri = "https://poseidon-investidorpro.streamlit.app/"
+
+    return {
+        "web": {
+            "client_id": st.secrets["google_oauth"]["client_id"],
+            "client_secret": st.secrets["google_oauth"]["client_secret"],
+            "auth_uri": AUTH_URI,
+            "token_uri": TOKEN_URI,
+            "redirect_uris": [redirect_uri],
         }
-        
-        return Flow.from_client_config(
-            client_config,
-            scopes=SCOPES,
-            redirect_uri=redirect_uri,
-            state=state
-        )
+    }
+
+def _load_config():
+    try:
+        return _oauth_config()["web"]
     except Exception as e:
         st.error(f"Erro ao carregar segredos do Google: {e}")
         return None
 
-import hmac
-import hashlib
-import base64
+@st.cache_resource
+def _http_session():
+    """Sessão HTTP compartilhada (keep-alive) para os endpoints do Google."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE))
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE))
+    return session
+
+def create_flow(state=None):
+    """
+    Fluxo OAuth do google-auth-oauthlib com a configuração em cache (para quem
+    precisar do objeto Flow; o login do app usa get_login_url/get_user_info).
+    """
+    config = _load_config()
+    if config is None:
+        return None
+    from google_auth_oauthlib.flow import Flow
+
+    return Flow.from_client_config(
+        {"web": config},
+        scopes=SCOPES,
+        redirect_uri=config["redirect_uris"][0],
+        state=state,
+        code_verifier=_code_verifier(state) if state else None
+    )
 
 def _sign_state(state):
     """Gera uma assinatura para o state usando o client_secret."""
-    secret = st.secrets["google_oauth"]["client_secret"].encode()
+    secret = _oauth_config()["web"]["client_secret"].encode()
     msg = state.encode()
     signature = hmac.new(secret, msg, hashlib.sha256).digest()
     return f"{state}.{base64.urlsafe_b64encode(signature).decode().strip('=')}"
@@ -76,18 +121,40 @@ def _verify_state(signed_state):
     except Exception:
         return False
 
+def _code_verifier(signed_state):
+    """
+    code_verifier do PKCE derivado do state assinado (HMAC com o client_secret):
+    a volta do Google recria o mesmo verifier sem guardar nada na sessão.
+    """
+    secret = _oauth_config()["web"]["client_secret"].encode()
+    digest = hmac.new(secret, f"pkce:{signed_state}".encode(), hashlib.sha512).digest()
+    return base64.urlsafe_b64encode(digest).decode().strip('=') # 86 caracteres
+
+def _code_challenge(verifier):
+    return base64.urlsafe_b64encode(hashlib.sha256(verifier.encode()).digest()).decode().strip('=')
+
 def get_login_url():
     """Gera a URL de login do Google com um state assinado (não depende de sessão)."""
-    flow = create_flow()
-    if flow:
-        authorization_url, state = flow.authorization_url(prompt='consent')
-        # Em vez de salvar na sessão, assinamos o state
-        signed_state = _sign_state(state)
-        # Recria a URL com o state assinado
-        authorization_url, _ = flow.authorization_url(prompt='consent', state=signed_state)
-        return authorization_url
-    return None
+    config = _load_config()
+    if config is None:
+        return None
+
+    # Em vez de salvar na sessão, assinamos o state
+    signed_state = _sign_state(secrets.token_urlsafe(24))
+    params = {
+        "response_type": "code",
+        "client_id": config["client_id"],
+        "redirect_uri": config["redirect_uris"][0],
+        "scope": " ".join(SCOPES),
+        "state": signed_state,
+        "access_type": "offline",
+        "prompt": "consent",
+        "code_challenge": _code_challenge(_code_verifier(signed_state)),
+        "code_challenge_method": "S256",
+    }
+    return f"{AUTH_URI}?{urlencode(params)}"
 
+@instrument("google_login")
 def get_user_info(code, signed_state):
     """Troca o código pelo token e busca informações do usuário, validando a assinatura do state."""
     # Valida a assinatura do state (segurança contra CSRF sem depender de st.session_state)
@@ -95,28 +162,35 @@ def get_user_info(code, signed_state):
         st.error("""
         **Erro de Autenticação (State Invalid)**.
         A assinatura de segurança não confere ou expirou.
-        
+
         **Causa provável:** O link de login expirou ou houve tentativa de manipulação.
         **Tente novamente** a partir da página inicial.
         """)
         return None
 
-    # O Flow precisa do state original para validar internamente
-    state = signed_state.split(".")[0]
-    flow = create_flow(state=signed_state) # Passamos o signed_state pois é o que o Google vai devolver
-    if not flow:
+    config = _load_config()
+    if config is None:
         return None
-        
+
+    session = _http_session()
     try:
-        # Note: google-auth-oauthlib vai validar que o state recebido 
-        # é o mesmo que passamos no create_flow
-        flow.fetch_token(code=code)
-        creds = flow.credentials
-        
+        # Troca do código (uso único: sem retry) pelo access token
+        response = session.post(TOKEN_URI, data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "client_id": config["client_id"],
+            "client_secret": config["client_secret"],
+            "redirect_uri": config["redirect_uris"][0],
+            "code_verifier": _code_verifier(signed_state),
+        }, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        access_token = response.json()["access_token"]
+
         # Chama a API de UserInfo
-        service = build('oauth2', 'v2', credentials=creds)
-        user_info = service.userinfo().get().execute()
-        return user_info
+        response = session.get(USERINFO_URI, headers={"Authorization": f"Bearer {access_token}"},
+                               timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
     except Exception as e:
         st.error(f"Erro ao autenticar: {e}")
         return None
@@ -0,0 +1,58 @@
+import signal
+import numpy as np
+from src import metrics, profiler
+from src.chart_data import fan_chart_data
+from src.quant_engine import run_goal_simulation, run_portfolio_monte_carlo
+
+# --- JOBS DO SERVIÇO DE CÁLCULO ---
+# Funções puras, de nível de módulo, executadas nos processos do pool
+# (src.compute). Recebem só dados (nada de Streamlit, nada de rede) e devolvem
+# resultados pequenos: percentis e dados de gráfico já reduzidos, nunca a
+# matriz de caminhos.
+# Este módulo é também o ponto de entrada dos workers: init_worker prepara o
+# processo e run_job executa cada job, devolvendo junto as métricas do
+# instrument registradas no worker, que o processo principal incorpora.
+
+def init_worker():
+    """Inicializador dos processos do pool."""
+    # Ctrl+C no console chega a todos os processos: quem encerra o pool é o principal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    metrics.reset()
+
+def run_job(func, args, kwargs, profile_targets=()):
+    """
+    Executa func(*args, **kwargs) no worker. Os estágios a perfilar vêm do
+    processo principal (Área Admin ou POSEIDON_PROFILE_ENGINES).
+    Retorna (ok, resultado ou exceção, métricas do job).
+    """
+    profiler.set_engine_targets(profile_targets)
+    metrics.drain()
+    try:
+        value = func(*args, **kwargs)
+    except Exception as e:
+        return False, e, metrics.drain()
+    return True, value, metrics.drain()
+
+def monte_carlo_summary(amount, weights, cov, years):
+    paths = run_portfolio_monte_carlo(amount, weights, years=years, cov=cov)
+
+    final_results = paths[-1, :]
+    return {
+        'p10': float(np.percentile(final_results, 10)),
+        'p50': float(np.percentile(final_results, 50)), # Median
+        'p90': float(np.percentile(final_results, 90)),
+        'chart': fan_chart_data(paths, x=np.arange(paths.shape[0]) / 252)
+    }
+
+def goal_plan_summary(amount, annual_return, annual_vol, years, monthly_contribution, monthly_withdrawal,
+                      contribution_years, goal, step, inflation):
+    plan = run_goal_simulation(
+        amount, annual_return, annual_vol, years=years,
+        monthly_contribution=monthly_contribution, monthly_withdrawal=monthly_withdrawal,
+        contribution_years=contribution_years, inflation=inflation, goal=goal, step=step
+    )
+    paths = plan.pop('paths')
+    plan['chart'] = fan_chart_data(paths, x=plan.pop('years'))
+    plan['annual_return'] = annual_return
+    plan['annual_vol'] = annual_vol
+    return plan
@@ -0,0 +1,501 @@
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+from src.analyzer import TOP_N, _numeric_column
+from src.technical_engine import EMA_LENGTH, RSI_LENGTH, classify_signal
+
+# --- COTAÇÕES INCREMENTAIS ---
+# Ingestão de um fluxo de cotações (feed local ou replay de arquivo) sem
+# refazer o scanner inteiro: cada cotação atualiza, em O(1), o preço, os
+# múltiplos (P/L, DY, valor de mercado) e o estado dos indicadores (EMA50 e
+# RSI14 do candle do dia), e os rankings do score_stocks são mantidos em
+# listas ordenadas: só os ativos cujo rank muda (os que estão entre o valor
+# antigo e o novo) são recalculados. Cada lote publica um ChangeSet que a
+# UI aplica sobre a tabela que já mostra.
+# Feed: POSEIDON_QUOTE_FEED=<arquivo> (CSV "data,ticker,preço" ou JSON lines
+# {"ticker", "price", "ts"}), lido continuamente por um FeedFollower.
+
+QUOTE_FEED = os.environ.get("POSEIDON_QUOTE_FEED")
+LIVE_REFRESH = 2 # Segundos entre atualizações da tabela ao vivo na UI
+FEED_POLL_INTERVAL = 0.5
+CHANGE_LOG_SIZE = 512 # ChangeSets guardados para clientes atrasados
+
+_key = itemgetter(0)
+
+class RankIndex:
+    """
+    Pares (valor, posição) ordenados. rank() segue Series.rank(): 1..n com
+    empates pela média. Inserir/remover é O(log n) para achar o lugar.
+    """
+
+    def __init__(self, pairs=()):
+        self.items = sorted(pairs)
+
+    def __len__(self):
+        return len(self.items)
+
+    def rank(self, value):
+        lo = bisect_left(self.items, value, key=_key)
+        hi = bisect_right(self.items, value, key=_key)
+        return lo + (hi - lo + 1) / 2
+
+    def insert(self, value, pos):
+        insort(self.items, (value, pos))
+
+    def remove(self, value, pos):
+        del self.items[bisect_left(self.items, (value, pos))]
+
+    def between(self, low, high=math.inf):
+        """Posições com low <= valor <= high (os ranks que mudam numa troca de valor)."""
+        lo = bisect_left(self.items, low, key=_key)
+        hi = bisect_right(self.items, high, key=_key)
+        return [pos for _, pos in self.items[lo:hi]]
+
+class IndicatorState:
+    """
+    EMA e RSI incrementais, nas mesmas definições do pandas_ta:
+      - EMA: semente = média simples dos primeiros EMA_LENGTH fechamentos,
+        depois ema += alpha * (close - ema), alpha = 2 / (n + 1);
+      - RSI: médias de ganhos/perdas pela rma (ewm alpha=1/n, adjust=True),
+        que é a razão de duas somas exponenciais; como os denominadores são
+        iguais, RSI = 100 * G / (G + P), com G = ganho + beta * G_anterior.
+    O estado "fechado" vai até o candle anterior; o candle do dia é refeito a
+    cada cotação (O(1)) e fechado quando chega uma cotação de outro dia.
+    """
+
+    def __init__(self, n):
+        self.bars = np.zeros(n, dtype=np.int64)   # fechamentos consolidados
+        self.seed = np.zeros(n)                   # soma para a semente da EMA
+        self.ema = np.full(n, np.nan)
+        self.gain = np.zeros(n)
+        self.loss = np.zeros(n)
+        self.close = np.full(n, np.nan)           # último fechamento consolidado
+        self.current = np.full(n, np.nan)         # candle do dia
+        self.day = [None] * n
+        self.alpha = 2 / (EMA_LENGTH + 1)
+        self.beta = 1 - 1 / RSI_LENGTH
+
+    def seed_history(self, pos, closes, last_day=None):
+        """Histórico diário: todos os candles menos o último são consolidados."""
+        closes = [float(c) for c in closes if c == c]
+        if not closes:
+            return
+        for value in closes[:-1]:
+            self._commit(pos, value)
+        self.current[pos] = closes[-1]
+        self.day[pos] = last_day
+
+    def _commit(self, pos, value):
+        bars = self.bars[pos]
+        if bars < EMA_LENGTH:
+            self.seed[pos] += value
+            if bars + 1 == EMA_LENGTH:
+                self.ema[pos] = self.seed[pos] / EMA_LENGTH
+        else:
+            self.ema[pos] += self.alpha * (value - self.ema[pos])
+        if bars > 0:
+            diff = value - self.close[pos]
+            self.gain[pos] = max(diff, 0.0) + self.beta * self.gain[pos]
+            self.loss[pos] = max(-diff, 0.0) + self.beta * self.loss[pos]
+        self.close[pos] = value
+        self.bars[pos] = bars + 1
+
+    def update(self, pos, price, day=None):
+        """Cotação nova; retorna False se ela é de um dia já consolidado (ignorada)."""
+        last = self.day[pos]
+        if day is not None and last is not None:
+            if day < last:
+                return False
+            if day > last:
+                self._commit(pos, self.current[pos])
+        if day is not None:
+            self.day[pos] = day
+        self.current[pos] = price
+        return True
+
+    def signal(self, pos):
+        price = self.current[pos]
+        bars = self.bars[pos] + 1 # consolidados + o candle do dia
+        if price != price or bars < EMA_LENGTH or bars - 1 < RSI_LENGTH:
+            return "N/A"
+        if bars == EMA_LENGTH:
+            ema = (self.seed[pos] + price) / EMA_LENGTH
+        else:
+            ema = self.ema[pos] + self.alpha * (price - self.ema[pos])
+        diff = price - self.close[pos]
+        gain = max(diff, 0.0) + self.beta * self.gain[pos]
+        loss = max(-diff, 0.0) + self.beta * self.loss[pos]
+        if gain + loss == 0:
+            return "N/A"
+        return classify_signal(price, 100 * gain / (gain + loss), ema)
+
+@dataclass
+class ChangeSet:
+    """O que mudou num lote de cotações (só os ativos tocados)."""
+    version: int
+    quotes: dict = field(default_factory=dict)   # ticker -> preço
+    fields: dict = field(default_factory=dict)   # ticker -> {pe_ratio, dividend_yield, market_cap}
+    signals: dict = field(default_factory=dict)  # ticker -> novo sinal técnico
+    top: list = field(default_factory=list)      # Top N atual, em ordem
+    entered: list = field(default_factory=list)
+    left: list = field(default_factory=list)
+
+    def to_dict(self):
+        return asdict(self)
+
+class LiveScreen:
+    """
+    Universo do scanner com cotações ao vivo. O ranking é o do score_stocks
+    (rank do P/L + rank do ROE entre os ativos com preço), mantido de forma
+    incremental; o Top N sai das primeiras posições do índice de score.
+    """
+
+    def __init__(self, frame, closes=None, top_n=TOP_N):
+        self.frame = frame.reset_index(drop=True)
+        self.top_n = top_n
+        self.symbols = self.frame['symbol'].astype(str).tolist()
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        n = len(self.symbols)
+
+        price = _numeric_column(self.frame, 'price').astype(np.float64)
+        pe = _numeric_column(self.frame, 'pe_ratio').astype(np.float64)
+        dy = _numeric_column(self.frame, 'dividend_yield').astype(np.float64)
+        self.roe = _numeric_column(self.frame, 'roe').astype(np.float64)
+        self.shares = _numeric_column(self.frame, 'shares').astype(np.float64)
+        self.market_cap = _numeric_column(self.frame, 'market_cap').astype(np.float64)
+        self.price, self.pe, self.dy = price.copy(), pe.copy(), dy.copy()
+        # Lucro e dividendo por ação do snapshot: os múltiplos andam com o preço
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.eps = np.where((pe != 0) & (price > 0), price / pe, np.nan)
+            self.dps = np.where(price > 0, dy * price, np.nan)
+
+        self.indicators = IndicatorState(n)
+        if closes is not None:
+            for symbol, series in closes.items():
+                pos = self.index.get(str(symbol))
+                if pos is not None:
+                    series = series.dropna()
+                    if not series.empty:
+                        self.indicators.seed_history(pos, series.to_numpy(), _day(series.index[-1]))
+        self.signals = [self.indicators.signal(i) for i in range(n)]
+
+        valid = [i for i in range(n) if self.price[i] > 0.01]
+        self._pe_index = RankIndex((self._pe_clean(i), i) for i in valid)
+        self._roe_index = RankIndex((-self.roe[i], i) for i in valid)
+        self.score = np.full(n, np.nan)
+        for i in valid:
+            self.score[i] = self._pe_index.rank(self._pe_clean(i)) + self._roe_index.rank(-self.roe[i])
+        self._score_index = RankIndex((self.score[i], i) for i in valid)
+
+        self.version = 0
+        self._log = deque(maxlen=CHANGE_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_universe(cls, universe, tickers, period="6mo"):
+        """Snapshot do universo + histórico diário para semear os indicadores."""
+        from src.data_loader import get_universe_snapshot
+        from src.quant_engine import download_history
+
+        frame = get_universe_snapshot(universe, tickers)
+        try:
+            closes = download_history(list(tickers), period=period)['Close']
+            if isinstance(closes, pd.Series):
+                closes = closes.to_frame(tickers[0])
+        except Exception:
+            closes = None # Sem histórico: sinais N/A até acumular candles
+        return cls(frame, closes)
+
+    def _pe_clean(self, pos):
+        # Mesmo tratamento do score_stocks: P/L zero vai para o fim do ranking
+        return 1000.0 if self.pe[pos] == 0 else self.pe[pos]
+
+    def _top(self):
+        return [pos for _, pos in self._score_index.items[:self.top_n]]
+
+    def _reprice(self, pos, price):
+        """Novo preço e múltiplos; devolve as posições cujo rank pode ter mudado."""
+        was_valid = self.price[pos] > 0.01
+        old_pe = self._pe_clean(pos)
+
+        self.price[pos] = price
+        if self.eps[pos] == self.eps[pos]:
+            self.pe[pos] = price / self.eps[pos]
+        if self.dps[pos] == self.dps[pos]:
+            self.dy[pos] = self.dps[pos] / price
+        if self.shares[pos] > 0: # Como no apply_quotes
+            self.market_cap[pos] = price * self.shares[pos]
+
+        is_valid = price > 0.01
+        new_pe = self._pe_clean(pos)
+        roe = -self.roe[pos]
+        if was_valid and is_valid:
+            if new_pe == old_pe:
+                return []
+            self._pe_index.remove(old_pe, pos)
+            self._pe_index.insert(new_pe, pos)
+            return self._pe_index.between(min(old_pe, new_pe), max(old_pe, new_pe))
+        if is_valid:
+            # Entrou no universo válido: sobe o rank de quem está acima dele
+            self._pe_index.insert(new_pe, pos)
+            self._roe_index.insert(roe, pos)
+            return self._pe_index.between(new_pe) + self._roe_index.between(roe)
+        if was_valid:
+            self._pe_index.remove(old_pe, pos)
+            self._roe_index.remove(roe, pos)
+            return [pos] + self._pe_index.between(old_pe) + self._roe_index.between(roe)
+        return []
+
+    def _rescore(self, pos):
+        old = self.score[pos]
+        if old == old:
+            self._score_index.remove(old, pos)
+        if self.price[pos] > 0.01:
+            new = self._pe_index.rank(self._pe_clean(pos)) + self._roe_index.rank(-self.roe[pos])
+            self._score_index.insert(new, pos)
+            self.score[pos] = new
+        else:
+            self.score[pos] = np.nan
+
+    def apply(self, updates):
+        """
+        Aplica um lote de cotações: iterável de (ticker, preço) ou
+        (ticker, preço, dia 'AAAA-MM-DD'). Tickers fora do universo e preços
+        inválidos são ignorados. Retorna o ChangeSet (None se nada mudou).
+        """
+        latest = {}
+        for update in updates:
+            pos = self.index.get(update[0])
+            price = float(update[1])
+            if pos is not None and price > 0 and math.isfinite(price):
+                latest[pos] = (price, update[2] if len(update) > 2 else None)
+        if not latest:
+            return None
+
+        with self._lock:
+            before = self._top()
+            changes = ChangeSet(version=self.version + 1)
+            affected = set()
+            for pos, (price, day) in latest.items():
+                symbol = self.symbols[pos]
+                if not self.indicators.update(pos, price, day):
+                    continue
+                signal = self.indicators.signal(pos)
+                if signal != self.signals[pos]:
+                    self.signals[pos] = changes.signals[symbol] = signal
+                if price == self.price[pos]:
+                    continue
+                affected.update(self._reprice(pos, price))
+                changes.quotes[symbol] = price
+                changes.fields[symbol] = {
+                    'pe_ratio': float(self.pe[pos]), 'dividend_yield': float(self.dy[pos]),
+                    'market_cap': float(self.market_cap[pos])
+                }
+            for pos in affected:
+                self._rescore(pos)
+
+            if not (changes.quotes or changes.signals):
+                return None
+            after = self._top()
+            changes.top = [self.symbols[p] for p in after]
+            changes.entered = [self.symbols[p] for p in after if p not in before]
+            changes.left = [self.symbols[p] for p in before if p not in after]
+            self.version = changes.version
+            self._log.append(changes)
+            return changes
+
+    def changes_since(self, version):
+        """
+        ChangeSets depois de `version`, fundidos num só (None se não há
+        novidade). Se o cliente ficou para trás do log, devolve False:
+        ele deve recarregar a tabela inteira (top_frame).
+        """
+        with self._lock:
+            if version >= self.version:
+                return None
+            pending = [c for c in self._log if c.version > version]
+            if not pending or pending[0].version != version + 1:
+                return False
+        first, merged = pending[0], ChangeSet(version=pending[-1].version, top=list(pending[-1].top))
+        for c in pending:
+            merged.quotes.update(c.quotes)
+            merged.fields.update(c.fields)
+            merged.signals.update(c.signals)
+        previous = (set(first.top) - set(first.entered)) | set(first.left)
+        merged.entered = [s for s in merged.top if s not in previous]
+        merged.left = [s for s in previous if s not in merged.top]
+        return merged
+
+    def top_frame(self):
+        """Top N no formato do scanner (colunas do score_stocks + Timing) e a versão."""
+        with self._lock:
+            top = self._top()
+            df = self.frame.iloc[top].assign(
+                price=self.price[top], pe_ratio=self.pe[top], dividend_yield=self.dy[top],
+                market_cap=self.market_cap[top], roe=self.roe[top],
+                pe_clean=[self._pe_clean(p) for p in top],
+                rank_pe=[self._pe_index.rank(self._pe_clean(p)) for p in top],
+                rank_roe=[self._roe_index.rank(-self.roe[p]) for p in top],
+                score=self.score[top], Timing=[self.signals[p] for p in top]
+            )
+            return df, self.version
+
+def apply_changes(df, changes):
+    """
+    Aplica um ChangeSet à tabela mostrada na UI (Top N). Retorna None se a
+    composição ou a ordem do Top N mudou: aí a UI recarrega com top_frame().
+    """
+    if df['symbol'].astype(str).tolist() != changes.top:
+        return None
+    df = df.copy()
+    symbols = df['symbol'].astype(str)
+    for symbol, values in changes.fields.items():
+        row = symbols == symbol
+        df.loc[row, 'price'] = changes.quotes[symbol]
+        for col, value in values.items():
+            if col in df.columns:
+                df.loc[row, col] = value
+    for symbol, signal in changes.signals.items():
+        df.loc[symbols == symbol, 'Timing'] = signal
+    return df
+
+# --- FEED ---
+
+def _day(value):
+    return str(pd.Timestamp(value).date())
+
+def parse_line(line):
+    """
+    Uma linha do feed -> (ticker, preço, dia) ou None (cabeçalho, vazia, inválida).
+    CSV: "2026-10-19T14:05:00,PETR4.SA,37.12" (data opcional: "PETR4.SA,37.12").
+    JSON: {"ticker": "PETR4.SA", "price": 37.12, "ts": "2026-10-19T14:05:00"}.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        if line.startswith("{"):
+            item = json.loads(line)
+            ts = item.get("ts")
+            return item["ticker"], float(item["price"]), ts[:10] if ts else None
+        parts = [p.strip() for p in line.split(",")]
+        if len(parts) == 2:
+            return parts[0], float(parts[1]), None
+        return parts[1], float(parts[2]), parts[0][:10] or None
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+def read_batches(lines, batch_size=500):
+    """Agrupa as linhas do feed em lotes de atualizações."""
+    batch = []
+    for line in lines:
+        update = parse_line(line)
+        if update is not None:
+            batch.append(update)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+class FeedFollower(threading.Thread):
+    """
+    Acompanha um arquivo de feed (como "tail -F") e aplica as novas linhas
+    às telas ao vivo. Começa do fim do arquivo: só cotações novas.
+    Rotação (arquivo renomeado e recriado: outro inode no caminho) ou
+    truncamento reabrem o arquivo, lido então desde o início.
+    """
+
+    def __init__(self, path, screens, poll=FEED_POLL_INTERVAL, from_start=False):
+        super().__init__(daemon=True, name=f"poseidon-feed-{os.path.basename(path)}")
+        self.path = path
+        self.screens = screens if isinstance(screens, (list, tuple)) else [screens]
+        self.poll = poll
+        self.from_start = from_start
+        self._stop_event = threading.Event()
+
+    def run(self):
+        # Só a primeira abertura pula o que já existe; um arquivo aberto depois
+        # (criado após o início ou recriado na rotação) só tem cotações novas
+        skip_existing = not self.from_start
+        while not self._stop_event.is_set():
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    if skip_existing:
+                        f.seek(0, os.SEEK_END)
+                    skip_existing = False
+                    self._follow(f)
+            except OSError:
+                pass # Arquivo ainda não existe (ou foi rotacionado): tenta de novo
+            skip_existing = False
+            self._stop_event.wait(self.poll)
+
+    def _replaced(self, f):
+        """O caminho aponta para outro arquivo (rotação) ou o aberto foi truncado."""
+        try:
+            current = os.stat(self.path)
+        except OSError:
+            return False # Renomeado e ainda não recriado: segue lendo o antigo
+        return current.st_ino != os.fstat(f.fileno()).st_ino or current.st_size < f.tell()
+
+    def _follow(self, f):
+        pending = ""
+        while not self._stop_event.is_set():
+            chunk = f.read()
+            if not chunk:
+                # Só com o antigo já lido até o fim: o que faltava dele não se perde
+                if self._replaced(f):
+                    return
+                self._stop_event.wait(self.poll)
+                continue
+            lines = (pending + chunk).split("\n")
+            pending = lines.pop() # Linha ainda incompleta fica para a próxima leitura
+            for batch in read_batches(lines):
+                for screen in self.screens:
+                    screen.apply(batch)
+
+    def stop(self):
+        self._stop_event.set()
+
+# --- CLI (replay) ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de um arquivo de cotações no screener incremental.")
+    parser.add_argument("path", help="arquivo CSV/JSON lines com as cotações")
+    parser.add_argument("--universe", default="stocks", help="universo do snapshot (stocks, bdr, crypto)")
+    parser.add_argument("--batch", type=int, default=500, help="cotações por lote")
+    parser.add_argument("--json", action="store_true", help="imprime cada ChangeSet em JSON lines")
+    args = parser.parse_args()
+
+    from streamlit import logger
+    logger.set_log_level("error")
+    from src.universe import UNIVERSES
+
+    screen = LiveScreen.from_universe(args.universe, UNIVERSES[args.universe])
+    applied = batches = 0
+    start = time.perf_counter()
+    with open(args.path, encoding="utf-8") as f:
+        for batch in read_batches(f, args.batch):
+            changes = screen.apply(batch)
+            applied += len(batch)
+            batches += 1
+            if changes is not None and args.json:
+                print(json.dumps(changes.to_dict(), ensure_ascii=False))
+    elapsed = time.perf_counter() - start
+    if not args.json:
+        top, version = screen.top_frame()
+        print(top[['symbol', 'price', 'pe_ratio', 'roe', 'score', 'Timing']].to_string(index=False))
+        print(f"\n{applied} cotações em {batches} lotes, {elapsed * 1000:.1f} ms (versão {version})")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
-import mercadopago
 import streamlit as st
+from src.upstream import call_upstream
 
 def get_mp_sdk():
     """Inicializa o SDK do Mercado Pago usando o token dos secrets."""
     try:
+        import mercadopago
         access_token = st.secrets["mercadopago"]["access_token"]
         return mercadopago.SDK(access_token)
     except Exception as e:
@@ -31,7 +32,11 @@ def create_pix_payment(amount, email, name="Poseidon User"):
     }
     
     # Chamada simplificada para evitar o erro de 'RequestOptions Object' no SDK
-    payment_response = sdk.payment().create(payment_data)
+    try:
+        payment_response = call_upstream("mercadopago", sdk.payment().create, payment_data)
+    except Exception as e:
+        st.error(f"Mercado Pago indisponível no momento: {e}")
+        return None
     payment = payment_response["response"]
     
     if payment_response["status"] == 201:
@@ -51,7 +56,10 @@ def check_payment_status(payment_id):
     if not sdk:
         return None
         
-    payment_response = sdk.payment().get(payment_id)
+    try:
+        payment_response = call_upstream("mercadopago", sdk.payment().get, payment_id)
+    except Exception:
+        return None
     payment = payment_response["response"]
     
     if payment_response["status"] == 200:
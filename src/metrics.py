@@ -0,0 +1,201 @@
+import json
+import logging
+import threading
+import time
+from functools import wraps
+from src import profiler
+
+# --- INSTRUMENTAÇÃO DOS MOTORES ---
+# Registro em memória, por processo, compartilhado entre as sessões do Streamlit.
+# Os workers do pool de cálculo (src.compute) devolvem as métricas de cada job
+# (drain) e o processo principal as soma às suas (merge).
+# Exporta em texto Prometheus (render_prometheus) e em logs JSON (logger
+# "poseidon.metrics", nível INFO).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger("poseidon.metrics")
+
+_lock = threading.Lock()
+_histograms = {}  # stage -> {'buckets': [...], 'sum': float, 'count': int}
+_counters = {}    # (metric, labels) -> float
+_gauges = {}      # (metric, labels) -> float
+
+def _labels(**labels):
+    return tuple(sorted(labels.items()))
+
+def inc(metric, value=1, **labels):
+    key = (metric, _labels(**labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def set_gauge(metric, value, **labels):
+    with _lock:
+        _gauges[(metric, _labels(**labels))] = value
+
+def observe(stage, seconds):
+    """Registra a duração de uma chamada no histograma do estágio."""
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                hist['buckets'][i] += 1
+        hist['sum'] += seconds
+        hist['count'] += 1
+
+def record_upstream(source):
+    """Conta uma chamada a um provedor externo (yahoo, bcb, statusinvest...)."""
+    inc("poseidon_upstream_requests_total", source=source)
+
+def record_upstream_error(source):
+    inc("poseidon_upstream_errors_total", source=source)
+
+def record_cache_miss(stage):
+    """
+    Chamado na primeira linha de uma função com st.cache_data: só executa em miss.
+    Os hits saem da diferença entre chamadas (instrument) e misses.
+    """
+    inc("poseidon_cache_misses_total", stage=stage)
+
+def instrument(stage):
+    """
+    Decorator: mede latência, conta chamadas e erros do estágio e
+    emite uma linha de log estruturado por chamada.
+    Estágios marcados no profiler (src.profiler) rodam sob o cProfile.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            error = None
+            try:
+                if profiler.engine_targets and profiler.wants(stage):
+                    return profiler.profile_call(stage, func, *args, **kwargs)
+                return func(*args, **kwargs)
+            except Exception as e:
+                error = type(e).__name__
+                inc("poseidon_stage_errors_total", stage=stage)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                observe(stage, elapsed)
+                inc("poseidon_stage_calls_total", stage=stage)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(json.dumps({
+                        'event': 'stage', 'stage': stage,
+                        'seconds': round(elapsed, 6), 'error': error
+                    }))
+        return wrapper
+    return decorator
+
+def _counter_by(metric, label):
+    return {dict(labels)[label]: value for (name, labels), value in _counters.items() if name == metric}
+
+def snapshot():
+    """
+    Retrato atual das métricas, pronto para exibir em tabela.
+    """
+    with _lock:
+        errors = _counter_by("poseidon_stage_errors_total", "stage")
+        misses = _counter_by("poseidon_cache_misses_total", "stage")
+        upstream = _counter_by("poseidon_upstream_requests_total", "source")
+        upstream_errors = _counter_by("poseidon_upstream_errors_total", "source")
+        histograms = {stage: dict(hist, buckets=list(hist['buckets'])) for stage, hist in _histograms.items()}
+        gauges = [dict(labels, metric=name, value=value) for (name, labels), value in sorted(_gauges.items())]
+
+    stages = []
+    for stage, hist in sorted(histograms.items()):
+        n = hist['count']
+        row = {
+            'stage': stage,
+            'calls': n,
+            'errors': errors.get(stage, 0),
+            'mean_ms': 1000 * hist['sum'] / n if n else 0.0,
+            'p50_ms': 1000 * _bucket_quantile(hist, 0.50),
+            'p95_ms': 1000 * _bucket_quantile(hist, 0.95),
+            'cache_hit_ratio': None
+        }
+        if stage in misses and n:
+            row['cache_hit_ratio'] = max(0.0, 1 - misses[stage] / n)
+        stages.append(row)
+
+    sources = [
+        {'source': s, 'requests': upstream.get(s, 0), 'errors': upstream_errors.get(s, 0)}
+        for s in sorted(set(upstream) | set(upstream_errors))
+    ]
+    return {'stages': stages, 'upstream': sources, 'gauges': gauges}
+
+def _bucket_quantile(hist, q):
+    """Quantil aproximado pelo limite superior do bucket (como histogram_quantile)."""
+    n = hist['count']
+    if not n:
+        return 0.0
+    target = q * n
+    for bound, count in zip(LATENCY_BUCKETS, hist['buckets']):
+        if count >= target:
+            return bound
+    return float('inf')
+
+def _fmt_labels(labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+def render_prometheus():
+    """
+    Exporta as métricas no formato de texto do Prometheus.
+    """
+    lines = []
+    with _lock:
+        lines.append("# TYPE poseidon_stage_seconds histogram")
+        for stage, hist in sorted(_histograms.items()):
+            for bound, count in zip(LATENCY_BUCKETS, hist['buckets']):
+                lines.append(f'poseidon_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'poseidon_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist["count"]}')
+            lines.append(f'poseidon_stage_seconds_sum{{stage="{stage}"}} {hist["sum"]:.6f}')
+            lines.append(f'poseidon_stage_seconds_count{{stage="{stage}"}} {hist["count"]}')
+
+        for metric in sorted({name for name, _ in _counters}):
+            lines.append(f"# TYPE {metric} counter")
+            for (name, labels), value in sorted(_counters.items()):
+                if name == metric:
+                    lines.append(f"{name}{_fmt_labels(labels)} {value}")
+
+        for metric in sorted({name for name, _ in _gauges}):
+            lines.append(f"# TYPE {metric} gauge")
+            for (name, labels), value in sorted(_gauges.items()):
+                if name == metric:
+                    lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+def drain():
+    """
+    Tira do registro os contadores e histogramas acumulados e os devolve
+    (os workers do pool de cálculo mandam isso de volta com cada resultado).
+    """
+    with _lock:
+        data = {'counters': dict(_counters), 'histograms': dict(_histograms)}
+        _counters.clear()
+        _histograms.clear()
+    return data
+
+def merge(data):
+    """Soma ao registro deste processo as métricas vindas de drain() (de um worker)."""
+    if not data:
+        return
+    with _lock:
+        for key, value in data['counters'].items():
+            _counters[key] = _counters.get(key, 0) + value
+        for stage, hist in data['histograms'].items():
+            mine = _histograms.get(stage)
+            if mine is None:
+                mine = _histograms[stage] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+            mine['buckets'] = [a + b for a, b in zip(mine['buckets'], hist['buckets'])]
+            mine['sum'] += hist['sum']
+            mine['count'] += hist['count']
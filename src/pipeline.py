@@ -0,0 +1,216 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from src.data_loader import QUOTE_TTL, apply_quotes, get_batch_quotes, get_macro_indicators
+from src.allocator import get_allocation_strategy
+from src.analyzer import score_crypto
+from src.top_picks import load_picks
+from src.live_quotes import QUOTE_FEED, FeedFollower, LiveScreen
+from src.fixed_income import OFFERS_PATH, load_offers
+from src.diversification import RETURN_PERIOD, CovarianceState, diversify
+from src.quant_engine import (
+    download_history, estimate_class_covariance, optimize_max_sharpe, portfolio_assumptions,
+    run_sensitivity_grid
+)
+from src import compute
+from src.upstream import fresh_cache
+from src.jobs import goal_plan_summary, monte_carlo_summary
+
+# --- PIPELINE DE ANÁLISE ---
+# Cada estágio declara explicitamente suas entradas e é memoizado por elas.
+# Um rerun do Streamlit (ex.: mudar a taxa do CDB) só recalcula os estágios
+# cujas entradas mudaram; o resto vem do cache.
+# Os scanners leem as tabelas materializadas pelo job noturno (src.top_picks)
+# e só calculam ao vivo quando elas estão vencidas.
+# Os estágios de simulação rodam no pool de processos (src.compute), que tem
+# seu próprio cache de resultados; on_wait recebe o tempo de espera para a UI.
+# Com um feed de cotações (POSEIDON_QUOTE_FEED), ações/BDRs ganham uma tela
+# ao vivo (src.live_quotes) atualizada incrementalmente a cada cotação.
+# Estágios que dependem de provedores usam fresh_cache: um valor de fallback
+# (último dado bom ou premissa padrão) é devolvido, mas não fica no cache.
+
+# Grade do what-if: deslocamentos em torno do retorno e múltiplos da vol do perfil
+SENSITIVITY_RETURN_SHIFTS = np.arange(-0.06, 0.061, 0.02)
+SENSITIVITY_VOL_SCALES = np.array([0.5, 0.75, 1.0, 1.25, 1.5, 2.0])
+SENSITIVITY_HORIZONS = np.arange(1, 31)
+
+# Tela ao vivo: remontada (snapshot de fundamentos + histórico dos
+# indicadores) a cada hora; o feed da tela antiga é parado
+LIVE_SCREEN_TTL = 3600
+
+def data_version():
+    """
+    Versão dos dados de mercado: muda a cada janela de atualização das cotações.
+    Entra na chave dos estágios de scanner para que expirem junto com os dados.
+    """
+    return int(time.time() // QUOTE_TTL)
+
+@fresh_cache(st.cache_data(ttl=3600))
+def stage_macro():
+    return get_macro_indicators()
+
+@st.cache_data
+def stage_allocation(profile):
+    return get_allocation_strategy(profile)
+
+@st.cache_data
+def stage_allocation_chart(profile):
+    import plotly.express as px
+
+    allocation = stage_allocation(profile)
+    # Chart with Poseidon Colors (Deep Blues and Gold)
+    df_alloc = pd.DataFrame(list(allocation.items()), columns=['Classe', 'Proporção'])
+    poseidon_colors = ['#00d4ff', '#005f73', '#ffb703', '#94d2bd', '#ee9b00']
+    fig = px.pie(df_alloc, values='Proporção', names='Classe',
+                 title=f'💎 Alocação Estratégica Poseidon ({profile})',
+                 hole=0.4,
+                 color_discrete_sequence=poseidon_colors)
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(showlegend=False, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
+    return fig
+
+@st.cache_data(max_entries=16)
+def stage_stock_scan(universe, tickers, version):
+    """
+    Scanner de ações/BDRs: fundamentos + ranking + sinal técnico.
+    Vem da tabela do job noturno (src.top_picks), com as cotações frescas por cima.
+    """
+    best, source = load_picks(universe, tickers)
+    if source == 'table':
+        best = apply_quotes(best, get_batch_quotes(tickers))
+    return best
+
+def _stop_live_screen(screen):
+    """Chamado quando a tela sai do cache (TTL): para o thread do feed dela."""
+    if screen is not None:
+        screen.follower.stop()
+
+@st.cache_resource(ttl=LIVE_SCREEN_TTL, on_release=_stop_live_screen)
+def stage_live_screen(universe, tickers):
+    """
+    Tela ao vivo do scanner (uma por universo e processo), alimentada pelo feed
+    de cotações. None sem feed configurado: a UI fica com o scanner normal.
+    """
+    if not QUOTE_FEED:
+        return None
+    screen = LiveScreen.from_universe(universe, list(tickers))
+    screen.follower = FeedFollower(QUOTE_FEED, screen)
+    screen.follower.start()
+    return screen
+
+@st.cache_data(max_entries=16)
+def stage_crypto_scan(tickers, version):
+    picks, source = load_picks('crypto', tickers)
+    if source == 'table':
+        # O ranking é por valor de mercado, que anda com a cotação: reordena
+        picks = score_crypto(apply_quotes(picks, get_batch_quotes(tickers)))
+    return picks
+
+@st.cache_data(max_entries=16)
+def stage_fii_scan(tickers, version):
+    return load_picks('fii', tickers)[0]
+
+@st.cache_data(max_entries=8)
+def stage_fixed_income_offers(data):
+    """Tabela de ofertas de renda fixa (CSV enviado), memoizada pelo conteúdo."""
+    return load_offers(data)
+
+def stage_market_offers():
+    """Tabela do mercado em OFFERS_PATH (None se não existir); relida quando o arquivo muda."""
+    try:
+        mtime = os.path.getmtime(OFFERS_PATH)
+    except OSError:
+        return None
+    return _market_offers(mtime)
+
+@st.cache_data(max_entries=2)
+def _market_offers(mtime):
+    return load_offers(OFFERS_PATH)
+
+@fresh_cache(st.cache_data(ttl=86400))
+def stage_class_covariance():
+    """Covariância das classes (histórico das proxies), recalculada uma vez por dia."""
+    return estimate_class_covariance()
+
+@fresh_cache(st.cache_data(ttl=3600))
+def stage_price_history(tickers, period):
+    """
+    Fechamentos ajustados (datas x tickers, na ordem pedida), baixados neste
+    processo: os jobs do pool recebem só os números.
+    """
+    closes = download_history(list(tickers), period=period)['Close']
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+    return closes.reindex(columns=list(tickers))
+
+@fresh_cache(st.cache_data(ttl=3600))
+def stage_return_panel(tickers, period=RETURN_PERIOD):
+    """Retornos diários do universo (datas x tickers)."""
+    return stage_price_history(tickers, period).pct_change().iloc[1:]
+
+@st.cache_resource
+def _covariance_state(tickers):
+    return CovarianceState(tickers)
+
+def stage_diversification(tickers, ranked, k=5):
+    """
+    Top k descorrelacionado entre os candidatos do scanner (ranked, em ordem).
+    As somas da covariância do universo ficam no processo e só recebem os
+    pregões novos do painel de retornos.
+    """
+    state = _covariance_state(tuple(tickers))
+    state.sync(stage_return_panel(tuple(tickers)))
+    return diversify(state, ranked, k)
+
+def stage_monte_carlo(amount, profile, years, on_wait=None):
+    """
+    Monte Carlo por (valor, perfil, horizonte), no pool de processos.
+    Simula a alocação do perfil classe a classe, com rebalanceamento mensal.
+    Guarda só os percentis finais e os dados já reduzidos do gráfico
+    (faixas de percentis + poucos caminhos), não a matriz completa de 1.000 caminhos.
+    """
+    return compute.run("monte_carlo", monte_carlo_summary, amount, stage_allocation(profile),
+                       stage_class_covariance(), years, on_wait=on_wait)
+
+def stage_goal_plan(amount, profile, years, monthly_contribution, monthly_withdrawal,
+                    contribution_years, goal, step, inflation, on_wait=None):
+    """
+    Plano de objetivo pelas entradas do formulário, no pool de processos.
+    Retorno/volatilidade vêm da alocação do perfil; a inflação, do IPCA.
+    """
+    annual_return, annual_vol = portfolio_assumptions(stage_allocation(profile), cov=stage_class_covariance())
+    return compute.run("goal_plan", goal_plan_summary, amount, annual_return, annual_vol, years,
+                       monthly_contribution, monthly_withdrawal, contribution_years, goal, step, inflation,
+                       on_wait=on_wait)
+
+def stage_sensitivity(amount, profile, on_wait=None):
+    """
+    Grade what-if (retorno x vol x horizonte) em torno das premissas do perfil.
+    Calculada uma vez por (valor, perfil): mover o slider só recorta a grade.
+    """
+    annual_return, annual_vol = portfolio_assumptions(stage_allocation(profile), cov=stage_class_covariance())
+    return compute.run(
+        "sensitivity", run_sensitivity_grid,
+        amount,
+        np.round(annual_return + SENSITIVITY_RETURN_SHIFTS, 4),
+        np.round(annual_vol * SENSITIVITY_VOL_SCALES, 4),
+        SENSITIVITY_HORIZONS,
+        on_wait=on_wait
+    )
+
+def stage_optimizer(tickers, profile, on_wait=None):
+    """
+    Markowitz (SLSQP) no pool de processos. O histórico de 2 anos é baixado
+    aqui e vai para o job como matriz: o resultado em cache fica amarrado a
+    esses preços (muda a cada pregão). None se não houver histórico.
+    """
+    try:
+        closes = stage_price_history(tuple(tickers), "2y")
+    except Exception:
+        return None
+    closes = closes.dropna(how='all')
+    if closes.empty or closes.isna().all().any():
+        return None
+    return compute.run("optimizer", optimize_max_sharpe, list(tickers), closes.to_numpy(), on_wait=on_wait)
@@ -0,0 +1,291 @@
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from itertools import count
+
+# --- PROFILER SOB DEMANDA ---
+# Desligado por padrão e sem custo quando desligado: nada é instalado no
+# interpretador; o app só testa uma flag no início do rerun e o decorator
+# instrument testa um conjunto vazio.
+#   - rerun inteiro do app.py: profiler por amostragem (pilhas do thread do
+#     script a cada INTERVAL, tempo de parede: inclui espera por provedores e
+#     pelo pool). Termina sozinho quando o módulo app.py sai da pilha (fim
+#     normal, st.stop, st.rerun ou exceção);
+#   - uma chamada de motor (estágio do instrument): cProfile (determinístico)
+#     ou amostragem, em volta da chamada. Só um cProfile por processo de cada
+#     vez (no 3.12 um segundo levanta ValueError): chamadas concorrentes ou
+#     aninhadas caem para a amostragem.
+# Liga por sessão na Área Admin ou por ambiente:
+#   POSEIDON_PROFILE=rerun            todos os reruns de todas as sessões
+#   POSEIDON_PROFILE_ENGINES=a,b|*    estágios (nomes do instrument) a perfilar
+#   POSEIDON_PROFILE_MODE=cprofile|sampling (motores; padrão cprofile)
+#   POSEIDON_PROFILE_KEEP=20          execuções guardadas
+# Cada execução vira uma pasta em data/profiles com calltree.txt,
+# flamegraph.svg, stacks.folded (formato do flamegraph.pl/speedscope) e,
+# no cProfile, profile.prof (pstats/snakeviz).
+
+PROFILE_DIR = os.path.join("data", "profiles")
+PROFILE_KEEP = int(os.environ.get("POSEIDON_PROFILE_KEEP", 20))
+INTERVAL = float(os.environ.get("POSEIDON_PROFILE_INTERVAL_MS", 5)) / 1000
+MAX_SECONDS = 600 # Trava de segurança do amostrador
+ENGINE_MODE = os.environ.get("POSEIDON_PROFILE_MODE", "cprofile")
+MIN_SHARE = 0.005 # Nós abaixo de 0,5% do total não entram na árvore
+
+RERUN_ENV = os.environ.get("POSEIDON_PROFILE", "") == "rerun"
+engine_targets = frozenset(filter(None, os.environ.get("POSEIDON_PROFILE_ENGINES", "").split(",")))
+
+_write_lock = threading.Lock()
+_cprofile_lock = threading.Lock()
+_sequence = count()
+
+def set_engine_targets(stages):
+    """Estágios perfilados neste processo (vale para todas as sessões)."""
+    global engine_targets
+    engine_targets = frozenset(stages)
+
+def wants(stage):
+    return stage in engine_targets or '*' in engine_targets
+
+# --- AMOSTRAGEM ---
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class _Sampler(threading.Thread):
+    """
+    Amostra a pilha de um thread (até o frame raiz) a cada INTERVAL.
+    Termina quando a raiz sai da pilha, o thread morre ou stop() é chamado.
+    """
+
+    def __init__(self, thread_id, root, label):
+        super().__init__(daemon=True, name=f"poseidon-profiler-{label}")
+        self.thread_id = thread_id
+        self.root = root
+        self.label = label
+        self.stacks = Counter()
+        self.started_at = time.time()
+        self._stop_event = threading.Event()
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            if frame is self.root:
+                break
+            frame = frame.f_back
+        if frame is None:
+            return False # Raiz fora da pilha: a execução acabou
+        self.stacks[tuple(_frame_label(code) for code in reversed(stack))] += 1
+        return True
+
+    def run(self):
+        try:
+            deadline = time.monotonic() + MAX_SECONDS
+            while not self._stop_event.wait(INTERVAL) and time.monotonic() < deadline:
+                if not self._sample():
+                    break
+        finally:
+            self.root = None # Não segura o módulo/frame depois do fim
+            elapsed = time.time() - self.started_at
+            if self.stacks:
+                write_run(self.label, 'sampling', self.stacks, elapsed,
+                          unit=f"amostras de {INTERVAL * 1000:.0f} ms")
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def profile_rerun(enabled=False, label="rerun"):
+    """
+    Chamado no topo do app.py: amostra o rerun atual se o profiler estiver
+    ligado para a sessão (enabled) ou para o processo (POSEIDON_PROFILE=rerun).
+    """
+    if not (enabled or RERUN_ENV):
+        return None
+    sampler = _Sampler(threading.get_ident(), sys._getframe(1), label)
+    sampler.start()
+    return sampler
+
+# --- CPROFILE ---
+
+def _pstats_folded(stats):
+    """
+    Pilhas aproximadas a partir do grafo de chamadas do cProfile: o tempo de
+    cada função é repartido entre os filhos na proporção das arestas.
+    """
+    def label(func):
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    callees = {}
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    folded = Counter()
+    roots = [f for f, (cc, nc, tt, ct, callers) in stats.items() if not callers]
+    total = sum(stats[f][3] for f in roots) or 1.0
+
+    def walk(func, weight, path, depth):
+        path = path + (label(func),)
+        children = [(g, ct) for g, ct in callees.get(func, []) if label(g) not in path]
+        scale = weight / stats[func][3] if stats[func][3] > 0 else 0.0
+        spent = 0.0
+        for g, ct in children:
+            share = ct * scale
+            if share >= total * MIN_SHARE and depth < 64:
+                walk(g, share, path, depth + 1)
+                spent += share
+        own = max(weight - spent, 0.0)
+        if own > 0:
+            folded[path] += own * 1e6 # microssegundos
+
+    for root in roots:
+        walk(root, stats[root][3], (), 0)
+    return folded
+
+def profile_call(label, func, *args, mode=None, **kwargs):
+    """Executa func(*args, **kwargs) sob o profiler e grava a execução."""
+    mode = mode or ENGINE_MODE
+    if mode != 'sampling':
+        if _cprofile_lock.acquire(blocking=False):
+            try:
+                return _cprofile_call(label, func, *args, **kwargs)
+            finally:
+                _cprofile_lock.release()
+        # Já há um cProfile rodando (outra sessão ou chamada externa): amostra
+
+    sampler = _Sampler(threading.get_ident(), sys._getframe(0), label)
+    sampler.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sampler.stop()
+
+def _cprofile_call(label, func, *args, **kwargs):
+    import cProfile
+    import pstats
+
+    start = time.time()
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Outro profiler de fora (sys.setprofile/monitoring) já ativo: chamada simples
+        return func(*args, **kwargs)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+        stats = pstats.Stats(profile)
+        write_run(label, 'cprofile', _pstats_folded(stats.stats), time.time() - start,
+                  unit="µs (cProfile)", pstats_obj=stats)
+
+# --- SAÍDAS ---
+
+def _tree(folded):
+    """Pilhas -> árvore {nome: [peso, filhos]}."""
+    tree = {}
+    for stack, weight in folded.items():
+        node = tree
+        for name in stack:
+            entry = node.setdefault(name, [0, {}])
+            entry[0] += weight
+            node = entry[1]
+    return tree
+
+def _calltree(folded, unit):
+    tree = _tree(folded)
+
+    total = sum(folded.values()) or 1
+    lines = [f"Total: {total:.0f} {unit}", ""]
+
+    def render(node, depth):
+        for name, (weight, children) in sorted(node.items(), key=lambda kv: -kv[1][0]):
+            if weight < total * MIN_SHARE:
+                continue
+            lines.append(f"{weight / total:6.1%} {'  ' * depth}{name}")
+            render(children, depth + 1)
+    render(tree, 0)
+    return "\n".join(lines) + "\n"
+
+def _color(name):
+    h = sum(map(ord, name.rsplit(" (", 1)[-1].split(":")[0])) # Mesmo arquivo, mesma cor
+    return f"rgb({205 + h % 50},{90 + h * 7 % 120},{40 + h * 13 % 50})"
+
+def flamegraph_svg(folded, title, width=1200, row=17):
+    """Flamegraph (icicle: raiz no topo) em SVG autocontido."""
+    from html import escape
+
+    tree = _tree(folded)
+    total = sum(folded.values()) or 1
+
+    rects = []
+    max_depth = 0
+
+    def layout(node, x, depth):
+        nonlocal max_depth
+        for name, (weight, children) in sorted(node.items()):
+            w = weight / total * width
+            if w < 0.5:
+                x += w
+                continue
+            max_depth = max(max_depth, depth)
+            y = 24 + depth * row
+            text = escape(name)
+            rects.append(
+                f'<g><title>{text} — {weight / total:.1%}</title>'
+                f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" fill="{_color(name)}" rx="2"/>'
+                + (f'<text x="{x + 3:.1f}" y="{y + row - 5}">{escape(name[:int(w / 7)])}</text>' if w > 35 else '')
+                + '</g>'
+            )
+            layout(children, x, depth + 1)
+            x += w
+
+    layout(tree, 0.0, 0)
+    height = 24 + (max_depth + 1) * row + 8
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<text x="4" y="16" font-size="13">{escape(title)}</text>'
+        + "".join(rects) + '</svg>'
+    )
+
+def write_run(label, kind, folded, seconds, unit, pstats_obj=None):
+    """Grava uma execução (árvore, flamegraph, pilhas) e apaga as mais antigas."""
+    # Ordem cronológica pelo nome; o contador separa execuções no mesmo segundo
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence):05d}-{label}"
+    path = os.path.join(PROFILE_DIR, name)
+    os.makedirs(path, exist_ok=True)
+
+    title = f"{label} · {kind} · {seconds:.2f}s"
+    with open(os.path.join(path, "calltree.txt"), "w", encoding="utf-8") as f:
+        f.write(f"{title}\n{_calltree(folded, unit)}")
+    with open(os.path.join(path, "flamegraph.svg"), "w", encoding="utf-8") as f:
+        f.write(flamegraph_svg(folded, title))
+    with open(os.path.join(path, "stacks.folded"), "w", encoding="utf-8") as f:
+        f.writelines(f"{';'.join(stack)} {int(round(weight))}\n" for stack, weight in folded.items())
+    if pstats_obj is not None:
+        pstats_obj.dump_stats(os.path.join(path, "profile.prof"))
+
+    with _write_lock:
+        _prune()
+    return path
+
+def _prune(keep=None):
+    keep = PROFILE_KEEP if keep is None else keep
+    runs = sorted(os.listdir(PROFILE_DIR))
+    for name in runs[:-keep] if keep > 0 else runs:
+        shutil.rmtree(os.path.join(PROFILE_DIR, name), ignore_errors=True)
+
+def recent_runs():
+    """Execuções gravadas, da mais nova para a mais antiga: [(nome, pasta)]."""
+    try:
+        names = sorted(os.listdir(PROFILE_DIR), reverse=True)
+    except OSError:
+        return []
+    return [(name, os.path.join(PROFILE_DIR, name)) for name in names]
@@ -0,0 +1,69 @@
+import base64
+import io
+
+import streamlit as st
+
+# --- QR CODES ---
+# Renderização de QR codes (Pix, TOTP) em cache pelo conteúdo: o mesmo payload
+# devolve os mesmos bytes em todos os reruns e sessões, sem refazer a matriz
+# do qrcode nem o PNG no Pillow. Como os bytes são os mesmos, o st.image gera
+# a mesma URL de mídia e o navegador reaproveita a imagem já baixada.
+# O SVG sai direto da matriz (sem Pillow), com um único path: escala sem
+# perder nitidez e, comprimido (gzip), fica menor que o PNG.
+
+QR_BOX_SIZE = 10
+QR_BORDER = 5
+QR_CACHE_SIZE = 256
+
+def _qr(payload):
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, box_size=QR_BOX_SIZE, border=QR_BORDER)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr
+
+@st.cache_resource(max_entries=QR_CACHE_SIZE, show_spinner=False)
+def qr_png(payload):
+    """QR code do payload como PNG (bytes)."""
+    img = _qr(payload).make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+@st.cache_resource(max_entries=QR_CACHE_SIZE, show_spinner=False)
+def qr_svg(payload):
+    """
+    QR code do payload como SVG compacto: um módulo por unidade do viewBox e
+    cada linha vira um traço de espessura 1, com as sequências de módulos
+    escuros em coordenadas relativas ("M2 0.5h7m1 0h3...").
+    """
+    matrix = _qr(payload).get_matrix() # Já inclui a borda
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        pen = None # Onde a caneta parou na linha (None: linha ainda sem traço)
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            path.append(f"M{start} {y}.5h{x - start}" if pen is None else f"m{start - pen} 0h{x - start}")
+            pen = x
+    pixels = size * QR_BOX_SIZE
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" width="{pixels}" '
+        f'height="{pixels}" shape-rendering="crispEdges"><rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path stroke="#000" d="{"".join(path)}"/></svg>'
+    )
+
+@st.cache_resource(max_entries=QR_CACHE_SIZE, show_spinner=False)
+def decoded_image(data_base64):
+    """
+    Imagem em base64 (ex.: o QR do Mercado Pago) decodificada uma vez: os
+    reruns reutilizam os mesmos bytes em vez de reenviar o texto base64.
+    """
+    return base64.b64decode(data_base64)
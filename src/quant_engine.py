@@ -1,8 +1,10 @@
 import numpy as np
 import pandas as pd
-import yfinance as yf
-from scipy.optimize import minimize
+from src.metrics import instrument
+from src.singleflight import single_flight
+from src.upstream import call_upstream, mark_stale, remember, recall
 
+@instrument("run_monte_carlo")
 def run_monte_carlo(initial_capital, annual_return, annual_vol, years=10, simulations=1000):
     """
     Simulates portfolio growth using Geometric Brownian Motion.
@@ -27,18 +29,260 @@ def run_monte_carlo(initial_capital, annual_return, annual_vol, years=10, simula
     
     return paths
 
+# --- MONTE CARLO MULTI-CLASSE ---
+# Premissas anuais por classe (mesmos nomes de get_allocation_strategy).
+# Os retornos são taxas anuais aritméticas (esperança de um ano): o drift
+# log usa log1p(r) - vol²/2, para que E[V_1] = V_0 * (1 + r).
+CLASSES = ['Renda Fixa', 'FIIs', 'Ações BR', 'Exterior', 'Cripto']
+CLASS_RETURNS = np.array([0.11, 0.12, 0.15, 0.13, 0.25])
+CLASS_VOLS = np.array([0.02, 0.15, 0.25, 0.20, 0.70])
+CLASS_CORRELATION = np.array([
+    [1.00, 0.10, 0.00, -0.05, 0.00],
+    [0.10, 1.00, 0.55, 0.20, 0.10],
+    [0.00, 0.55, 1.00, 0.35, 0.20],
+    [-0.05, 0.20, 0.35, 1.00, 0.25],
+    [0.00, 0.10, 0.20, 0.25, 1.00],
+])
+# ETFs/ativos usados para estimar a covariância histórica de cada classe
+# (Renda Fixa fica com a premissa: não há proxy de mercado líquida)
+CLASS_PROXIES = {'FIIs': 'XFIX11.SA', 'Ações BR': 'BOVA11.SA', 'Exterior': 'IVVB11.SA', 'Cripto': 'BTC-BRL'}
+
+# Limite de elementos por lote (passos x caminhos x classes): ~32 MB em float64
+MC_CHUNK_ELEMENTS = 4_000_000
+
+def default_class_covariance():
+    return CLASS_CORRELATION * np.outer(CLASS_VOLS, CLASS_VOLS)
+
+def estimate_class_covariance(period="5y"):
+    """
+    Covariância anual das classes a partir do histórico das proxies.
+    Classes sem proxy (ou sem dados) ficam com a premissa padrão.
+    """
+    cov = default_class_covariance()
+    try:
+        data = download_history(list(CLASS_PROXIES.values()), period=period)
+        closes = data['Close'][list(CLASS_PROXIES.values())]
+    except Exception:
+        mark_stale() # Premissa padrão: não deve ficar no cache diário
+        return cov
+
+    # Cripto negocia no fim de semana: alinha pelos pregões da B3
+    returns = np.log(closes.dropna(subset=[CLASS_PROXIES['Ações BR']]).ffill()).diff().dropna(how='all')
+    sample = returns.cov(min_periods=120) * 252
+    index = {cls: CLASSES.index(cls) for cls in CLASS_PROXIES}
+    for a, ta in CLASS_PROXIES.items():
+        for b, tb in CLASS_PROXIES.items():
+            value = sample.loc[ta, tb]
+            if np.isfinite(value):
+                cov[index[a], index[b]] = value
+
+    # Mistura de fontes pode sair levemente não positiva-definida: corrige os autovalores
+    eigvals, eigvecs = np.linalg.eigh((cov + cov.T) / 2)
+    if eigvals.min() <= 0:
+        cov = eigvecs @ np.diag(np.clip(eigvals, 1e-8, None)) @ eigvecs.T
+    return cov
+
+def portfolio_assumptions(weights, cov=None, annual_returns=None):
+    """(retorno anual esperado, volatilidade anual) da carteira por classe."""
+    w = np.array([weights.get(c, 0.0) for c in CLASSES], dtype=float)
+    mean = CLASS_RETURNS if annual_returns is None else np.asarray(annual_returns, dtype=float)
+    cov = default_class_covariance() if cov is None else np.asarray(cov, dtype=float)
+    return float(w @ mean), float(np.sqrt(w @ cov @ w))
+
+@instrument("run_portfolio_monte_carlo")
+def run_portfolio_monte_carlo(initial_capital, weights, years=10, simulations=1000,
+                              rebalance_every=21, cov=None, annual_returns=None, seed=None):
+    """
+    Simula a carteira por classe com retornos correlacionados (fator de Cholesky
+    da covariância) e rebalanceamento aos pesos-alvo a cada `rebalance_every`
+    pregões (None = comprar e manter).
+
+    weights: {classe: peso} como em get_allocation_strategy.
+    Retorna a matriz (pregões + 1, simulações) do patrimônio total, como run_monte_carlo.
+    """
+    if years < 1:
+        raise ValueError("years deve ser >= 1")
+    w = np.array([weights.get(c, 0.0) for c in CLASSES], dtype=float)
+    w = w / w.sum()
+    mean = CLASS_RETURNS if annual_returns is None else np.asarray(annual_returns, dtype=float)
+    cov = default_class_covariance() if cov is None else np.asarray(cov, dtype=float)
+
+    # Só as classes com peso entram no sorteio
+    active = np.flatnonzero(w > 0)
+    w, mean, cov = w[active], mean[active], cov[np.ix_(active, active)]
+    chol = np.linalg.cholesky(cov / 252)
+    drift = (np.log1p(mean) - 0.5 * np.diag(cov)) / 252  # Log-retorno diário esperado
+
+    steps = int(round(years * 252))
+    block = steps if not rebalance_every else min(rebalance_every, steps)
+    n_blocks = -(-steps // block)
+    padded = n_blocks * block
+    chunk = max(1, min(simulations, MC_CHUNK_ELEMENTS // (padded * len(w))))
+
+    rng = np.random.default_rng(seed)
+    paths = np.empty((steps + 1, simulations))
+    paths[0] = initial_capital
+    for start in range(0, simulations, chunk):
+        n = min(chunk, simulations - start)
+        # (blocos, pregões no bloco, caminhos, classes)
+        shocks = rng.standard_normal((n_blocks, block, n, len(w))) @ chol.T + drift
+        # Dentro do bloco cada classe cresce livre; no fim volta aos pesos-alvo.
+        # O preenchimento do último bloco (padded > steps) é descartado no recorte.
+        growth = np.exp(np.cumsum(shocks, axis=1)) @ w          # (blocos, pregões, caminhos)
+        block_start = np.cumprod(np.vstack([np.ones((1, n)), growth[:-1, -1, :]]), axis=0)
+        values = (growth * block_start[:, None, :]).reshape(padded, n)[:steps]
+        paths[1:, start:start + n] = initial_capital * values
+    return paths
+
+# --- PLANEJAMENTO DE OBJETIVOS ---
+# Resolução do passo da simulação. Para um objetivo de 30 anos a resolução
+# mensal basta para o gráfico e custa 360 passos em vez de 7.560.
+STEPS_PER_YEAR = {'daily': 252, 'weekly': 52, 'monthly': 12}
+
+@instrument("run_goal_simulation")
+def run_goal_simulation(initial_capital, annual_return, annual_vol, years=30,
+                        monthly_contribution=0.0, monthly_withdrawal=0.0, contribution_years=None,
+                        inflation=0.045, goal=0.0, step='monthly', simulations=1000, seed=None):
+    """
+    Simula um plano com fluxo de caixa: aportes mensais durante
+    `contribution_years` e, depois, retiradas mensais. Aportes, retiradas e
+    meta são em reais de hoje e acompanham a inflação (IPCA).
+
+    O plano tem sucesso se o patrimônio nunca zera e termina, em valor real,
+    acima de `goal`.
+    Retorna dict com os caminhos nominais, o eixo de tempo (anos), as
+    probabilidades de sucesso/esgotamento e os percentis finais em valor real.
+    """
+    per_year = STEPS_PER_YEAR[step]
+    steps = int(round(years * per_year))
+    if contribution_years is None:
+        contribution_years = years if monthly_withdrawal == 0 else 0
+    contribution_steps = int(round(contribution_years * per_year))
+
+    # Fluxo por passo (valor mensal convertido para o passo), corrigido pelo IPCA
+    t = np.arange(1, steps + 1)
+    price_level = (1 + inflation) ** (t / per_year)
+    flows = np.where(t <= contribution_steps, monthly_contribution, -monthly_withdrawal) * 12 / per_year * price_level
+
+    rng = np.random.default_rng(seed)
+    drift = (np.log1p(annual_return) - 0.5 * annual_vol ** 2) / per_year
+    growth = np.exp(rng.normal(drift, annual_vol / np.sqrt(per_year), (steps, simulations)))
+
+    paths = np.empty((steps + 1, simulations))
+    paths[0] = initial_capital
+    value = np.full(simulations, float(initial_capital))
+    depleted = np.zeros(simulations, dtype=bool)
+    for i in range(steps):
+        value = value * growth[i] + flows[i]
+        depleted |= value <= 0
+        value = np.maximum(value, 0.0)
+        paths[i + 1] = value
+
+    final_real = paths[-1] / price_level[-1] if steps else paths[-1]
+    success = ~depleted & (final_real >= goal)
+    return {
+        'paths': paths,
+        'years': np.arange(steps + 1) / per_year,
+        'success_probability': float(success.mean()),
+        'depletion_probability': float(depleted.mean()),
+        'p10': float(np.percentile(final_real, 10)),
+        'p50': float(np.percentile(final_real, 50)),
+        'p90': float(np.percentile(final_real, 90))
+    }
+
+# --- SENSIBILIDADE (WHAT-IF) ---
+@instrument("run_sensitivity_grid")
+def run_sensitivity_grid(initial_capital, annual_returns, annual_vols, horizons,
+                         simulations=1000, percentiles=(10, 50, 90), seed=0):
+    """
+    Percentis do patrimônio final para toda a grade (retorno x vol x horizonte)
+    num único cálculo vetorizado.
+
+    Todos os pontos da grade reutilizam os mesmos choques normais (números
+    aleatórios comuns): a diferença entre dois pontos vem só dos parâmetros,
+    não do sorteio, e a superfície sai suave e comparável.
+    Horizontes em anos inteiros, com passos mensais.
+
+    Retorna um DataFrame longo (annual_return, annual_vol, years, p10, p50, p90),
+    pronto para pivotar num heatmap (ver sensitivity_heatmap).
+    """
+    returns = np.asarray(annual_returns, dtype=float)
+    vols = np.asarray(annual_vols, dtype=float)
+    horizons = np.asarray(horizons, dtype=int)
+
+    # Soma acumulada dos choques mensais, lida só nos horizontes pedidos
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((horizons.max() * 12, simulations))
+    summed = np.cumsum(shocks, axis=0)[horizons * 12 - 1] / np.sqrt(12)  # (H, caminhos)
+
+    # log(V_T / V_0) = (log(1 + r) - vol^2/2) * T + vol * W_T, com W_T comum a toda a grade
+    r = np.log1p(returns)[:, None, None, None]
+    v = vols[None, :, None, None]
+    t = horizons[None, None, :, None].astype(float)
+    log_growth = (r - 0.5 * v ** 2) * t + v * summed[None, None, :, :]
+    quantiles = initial_capital * np.exp(np.percentile(log_growth, percentiles, axis=-1))
+
+    grid_r, grid_v, grid_t = np.meshgrid(returns, vols, horizons, indexing='ij')
+    frame = pd.DataFrame({
+        'annual_return': grid_r.ravel(),
+        'annual_vol': grid_v.ravel(),
+        'years': grid_t.ravel()
+    })
+    for q, values in zip(percentiles, quantiles):
+        frame[f'p{q}'] = values.ravel()
+    return frame
+
+def sensitivity_heatmap(grid, years, percentile=50):
+    """Recorta a grade num horizonte: linhas = volatilidade, colunas = retorno."""
+    return grid[grid['years'] == years].pivot(index='annual_vol', columns='annual_return', values=f'p{percentile}')
+
+@single_flight("quant_engine.download_history")
+def download_history(tickers, period="2y"):
+    """
+    Histórico diário ajustado para o otimizador.
+    Sessões que otimizam o mesmo Top 5 ao mesmo tempo compartilham o download.
+    """
+    import yfinance as yf
+    key = ("history", tuple(tickers), period)
+    try:
+        data = call_upstream("yahoo", yf.download, list(tickers), period=period, interval="1d", progress=False, auto_adjust=True)
+    except Exception:
+        # Circuito aberto ou falha: usa o último histórico baixado, se houver
+        data = recall(key)
+        if data is None:
+            raise
+        return data
+    remember(key, data)
+    return data
+
+@instrument("get_optimized_allocation")
 def get_optimized_allocation(tickers, risk_profile):
     """
     Calculates weights for the Max Sharpe Ratio portfolio using historical data.
     """
     try:
         # Fetch 2 years of history
-        data = yf.download(tickers, period="2y", interval="1d", progress=False, auto_adjust=True)
-        
+        data = download_history(tickers, period="2y")
         if data.empty or 'Close' not in data.columns or len(tickers) < 2:
             return None
-            
-        returns = data['Close'].pct_change().dropna()
+        return optimize_max_sharpe(list(tickers), data['Close'][list(tickers)].to_numpy())
+    except Exception:
+        return None
+
+@instrument("optimize_max_sharpe")
+def optimize_max_sharpe(tickers, closes):
+    """
+    Pesos da carteira de Sharpe máximo a partir dos fechamentos (matriz
+    pregões x tickers, na ordem de `tickers`). Sem rede: roda no pool de cálculo.
+    """
+    try:
+        from scipy.optimize import minimize
+
+        if len(tickers) < 2:
+            return None
+        returns = pd.DataFrame(closes, columns=tickers).pct_change().dropna()
+        if returns.empty:
+            return None
         mean_returns = returns.mean() * 252
         cov_matrix = returns.cov() * 252
         
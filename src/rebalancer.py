@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# --- REBALANCEAMENTO POR ATIVO ---
+# Resolve em três passos vetorizados:
+#   1. Ótimo contínuo (relaxação do LP): quantidade alvo = peso * patrimônio / preço;
+#   2. Arredondamento para inteiros: lote padrão (100) ou ação unitária no
+#      mercado fracionário, sem gastar mais que o caixa disponível;
+#   3. Guloso: o caixa que sobrou compra mais uma unidade dos ativos em que
+#      isso mais reduz o erro de rastreamento (cada ativo fica a menos de uma
+#      unidade do alvo após o passo 2, então basta uma passada ordenada).
+# Toda ordem é múltipla da unidade (inclusive vendas limitadas à posição) e
+# nenhuma fica abaixo de min_order_value no resultado final.
+
+B3_LOT_SIZE = 100
+
+def fractional_ticker(ticker):
+    """PETR4.SA -> PETR4F (código do mercado fracionário da B3)."""
+    return ticker.replace('.SA', '') + 'F'
+
+def _cut_buys(trade, p, unit, priority, cash_left, min_order_value):
+    """
+    Corta compras, da menor prioridade para a maior, até o caixa não ficar
+    negativo. Uma compra que ficaria abaixo de min_order_value é zerada.
+    Altera trade e devolve o novo caixa.
+    """
+    for i in np.argsort(priority):
+        if cash_left >= 0:
+            break
+        if trade[i] <= 0:
+            continue
+        cut = min(trade[i], np.ceil(-cash_left / (p[i] * unit)) * unit)
+        if (trade[i] - cut) * p[i] < min_order_value:
+            cut = trade[i]
+        trade[i] -= cut
+        cash_left += cut * p[i]
+    return cash_left
+
+def rebalance_positions(holdings, cash=0.0, lot_size=B3_LOT_SIZE, allow_fractional=True,
+                        min_order_value=0.0, allow_sells=True):
+    """
+    Calcula ordens inteiras de compra/venda por ativo.
+
+    holdings: DataFrame com 'ticker', 'quantity', 'price' e 'target_weight'
+              (pesos sobre o patrimônio total; se somarem < 1 o resto fica em caixa).
+    cash: dinheiro disponível (ex.: aporte do usuário).
+
+    Retorna (ordens, resumo). `ordens` traz a quantidade a negociar por ativo,
+    separada em lote padrão e fracionário; `resumo` traz caixa final e erro de rastreamento.
+    """
+    tickers = holdings['ticker'].astype(str).to_numpy()
+    q = holdings['quantity'].to_numpy(dtype=float)
+    p = holdings['price'].to_numpy(dtype=float)
+    w = holdings['target_weight'].to_numpy(dtype=float)
+
+    if (p <= 0).any():
+        raise ValueError("Todos os ativos precisam de preço positivo.")
+    if w.sum() > 1 + 1e-9:
+        w = w / w.sum()
+
+    unit = 1 if allow_fractional else lot_size
+    current_value = q * p
+    wealth = current_value.sum() + cash
+
+    # 1. Ótimo contínuo
+    target_qty = w * wealth / p
+    raw_trade = target_qty - q
+
+    if not allow_sells:
+        # Só aportes: distribui o caixa entre os subalocados, proporcional ao déficit
+        buy_value = np.clip(raw_trade, 0, None) * p
+        if buy_value.sum() > cash:
+            buy_value *= cash / buy_value.sum()
+        raw_trade = buy_value / p
+
+    # 2. Arredondamento: compras para baixo (cabem no caixa), vendas para o mais próximo
+    trade = np.where(raw_trade >= 0,
+                     np.floor(raw_trade / unit) * unit,
+                     np.round(raw_trade / unit) * unit)
+    # Não vende mais do que possui, em unidades inteiras (no modo lote, 150
+    # ações permitem vender 100; as 50 restantes só saem pelo fracionário)
+    trade = np.maximum(trade, -np.floor(q / unit) * unit)
+
+    # Ordem mínima: descarta negociações pequenas demais
+    if min_order_value > 0:
+        trade[np.abs(trade * p) < min_order_value] = 0
+
+    cash_left = cash - (trade * p).sum()
+    if cash_left < 0:
+        # Vendas arredondadas para baixo não cobriram as compras: corta as compras
+        # de menor prioridade (menor déficit relativo) até caber no caixa
+        cash_left = _cut_buys(trade, p, unit, (raw_trade - trade) * p, cash_left, min_order_value)
+
+    # 3. Guloso com o caixa restante
+    deficit = (target_qty - q - trade) * p       # valor ainda abaixo do alvo
+    unit_cost = unit * p
+    # Ganho no erro quadrático ao comprar uma unidade: 2*d*c - c^2 (> 0 se d > c/2)
+    gain = 2 * deficit * unit_cost - unit_cost ** 2
+    if min_order_value > 0:
+        gain[(trade == 0) & (unit_cost < min_order_value)] = -np.inf
+    if not allow_sells:
+        gain[raw_trade <= 0] = -np.inf
+    candidates = np.flatnonzero(gain > 0)
+    for i in candidates[np.argsort(-gain[candidates])]:
+        if unit_cost[i] <= cash_left:
+            trade[i] += unit
+            cash_left -= unit_cost[i]
+
+    if min_order_value > 0:
+        # O guloso pode ter encolhido uma venda (ou o corte, uma compra) abaixo
+        # do mínimo: zera essas ordens; sem a venda, o caixa pode não cobrir as compras
+        trade[(trade != 0) & (np.abs(trade * p) < min_order_value)] = 0
+        cash_left = cash - (trade * p).sum()
+        if cash_left < 0:
+            cash_left = _cut_buys(trade, p, unit, (target_qty - q - trade) * p, cash_left, min_order_value)
+
+    final_qty = q + trade
+    final_value = final_qty * p
+    final_weight = final_value / wealth if wealth > 0 else np.zeros_like(final_value)
+
+    lots = np.sign(trade) * (np.abs(trade) // lot_size) * lot_size
+    odd = trade - lots
+
+    orders = pd.DataFrame({
+        'ticker': tickers,
+        'price': p,
+        'quantity': q,
+        'target_weight': w,
+        'target_quantity': target_qty,
+        'trade': trade.astype(int),
+        'lot_shares': lots.astype(int),
+        'fractional_shares': odd.astype(int),
+        'fractional_ticker': [fractional_ticker(t) for t in tickers],
+        'order_value': trade * p,
+        'final_quantity': final_qty.astype(int),
+        'final_weight': final_weight
+    })
+    summary = {
+        'wealth': float(wealth),
+        'cash_left': float(cash_left),
+        'tracking_error': float(np.sqrt(((final_weight - w) ** 2).sum())),
+        'buy_value': float((trade * p)[trade > 0].sum()),
+        'sell_value': float((-trade * p)[trade < 0].sum())
+    }
+    return orders, summary
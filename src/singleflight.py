@@ -0,0 +1,97 @@
+import copy
+import threading
+from functools import wraps
+from src.metrics import inc
+from src.upstream import is_stale, mark_stale
+
+# --- SINGLE-FLIGHT ---
+# Coalesce chamadas idênticas e simultâneas: a primeira thread (líder) faz a
+# chamada externa e as demais esperam e recebem o mesmo resultado (ou exceção).
+# Fica por baixo do st.cache_data: quando o TTL expira e dez sessões pedem o
+# mesmo dado ao mesmo tempo, só uma vai ao Yahoo/StatusInvest.
+# Os que esperam recebem o MESMO objeto do líder: não devem mutá-lo.
+# Se o líder devolveu um valor de fallback (src.upstream.recall), os que
+# esperam também ficam marcados, para nenhum deles guardá-lo em cache.
+# Só erros comuns (Exception) são compartilhados, cada thread com sua cópia.
+# Controle de fluxo da sessão do líder (StopException/RerunException do
+# Streamlit, KeyboardInterrupt) não vaza para as outras: a chamada fica
+# abandonada e um dos que esperam assume como líder.
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'stale', 'abandoned')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.stale = False
+        self.abandoned = False
+
+_lock = threading.Lock()
+_inflight = {}
+
+def _freeze(value):
+    """Converte argumentos mutáveis (listas, dicts) em chaves hasheáveis."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, set):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+def _own_copy(error):
+    """Cópia do erro do líder: a mesma instância relançada em vários threads teria o traceback reescrito."""
+    try:
+        clone = copy.copy(error)
+    except Exception:
+        return error # Exceção que não se deixa copiar: relança a original
+    return clone.with_traceback(error.__traceback__)
+
+def do(key, func, *args, **kwargs):
+    """Executa func uma única vez por chave entre as chamadas concorrentes."""
+    while True:
+        with _lock:
+            call = _inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _inflight[key] = _Call()
+        if leader:
+            break
+
+        inc("poseidon_singleflight_shared_total", name=key[0])
+        call.done.wait()
+        if call.abandoned:
+            continue # Líder interrompido: tenta assumir a chamada
+        if call.stale:
+            mark_stale()
+        if call.error is not None:
+            raise _own_copy(call.error)
+        return call.result
+
+    try:
+        call.result = func(*args, **kwargs)
+        call.stale = is_stale()
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    except BaseException:
+        call.abandoned = True # Só o líder recebe o controle de fluxo da sua sessão
+        raise
+    finally:
+        with _lock:
+            del _inflight[key]
+        call.done.set()
+
+def single_flight(name):
+    """
+    Decorator: coalesce chamadas concorrentes com os mesmos argumentos.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, _freeze(args), _freeze(kwargs))
+            return do(key, func, *args, **kwargs)
+        return wrapper
+    return decorator
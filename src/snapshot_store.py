@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import pyarrow as pa
+import streamlit as st
+
+# Cada snapshot é uma versão imutável, com um ponteiro para a atual:
+#   data/snapshots/<universo>/<versão>.arrow
+#   data/snapshots/<universo>/LATEST
+# Um arquivo aberto via memory-map nunca é sobrescrito (no Windows o
+# os.replace sobre ele falha); as versões antigas são apagadas quando
+# nenhum processo as tem mais abertas.
+
+SNAPSHOT_DIR = os.path.join("data", "snapshots")
+SNAPSHOT_TTL = 86400 # Snapshot guarda o nível de fundamentos (diário)
+PARTIAL_SNAPSHOT_TTL = 900 # Faltou algum ativo na varredura: tenta de novo logo
+SNAPSHOT_KEEP = 3 # Versões guardadas por universo
+
+def _snapshot_dir(universe):
+    return os.path.join(SNAPSHOT_DIR, universe)
+
+def write_arrow(path, df, meta):
+    """
+    Grava o DataFrame em formato colunar (Arrow IPC, sem compressão), com os
+    metadados do Poseidon no schema. A escrita é atômica: grava em arquivo
+    temporário e troca pelo definitivo.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'poseidon': json.dumps(meta).encode()})
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+# --- VERSÕES ---
+
+def latest_version(directory):
+    """Versão atual do diretório (conteúdo do LATEST) ou None."""
+    try:
+        with open(os.path.join(directory, "LATEST"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def version_path(directory, version):
+    return os.path.join(directory, f"{version}.arrow")
+
+def publish_version(directory, version):
+    """Troca o ponteiro LATEST atomicamente (depois que a versão está completa)."""
+    latest = os.path.join(directory, "LATEST")
+    tmp_path = f"{latest}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, latest)
+
+def prune_versions(directory, keep):
+    """Apaga as versões mais antigas, menos as `keep` mais novas e a atual."""
+    current = latest_version(directory)
+    versions = sorted(name for name in os.listdir(directory) if name.endswith(".arrow"))
+    for name in versions[:-keep] if keep > 0 else []:
+        if name == f"{current}.arrow":
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass # Arquivo ainda aberto (memory-map) no Windows: fica para a próxima
+
+def write_snapshot(universe, df, requested=None, keep=SNAPSHOT_KEEP):
+    """
+    Grava uma nova versão do snapshot do universo (ver write_arrow) e a
+    publica. Os metadados guardam os ativos presentes no DataFrame
+    ('tickers') e a lista pedida ('requested').
+    """
+    tickers = df['symbol'].astype(str).tolist() if 'symbol' in df.columns else []
+    created_at = time.time()
+    meta = {'universe': universe, 'created_at': created_at, 'tickers': tickers,
+            'requested': list(tickers if requested is None else requested)}
+    # O pid separa processos que gravam no mesmo segundo
+    version = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(created_at))}-{os.getpid()}"
+    directory = _snapshot_dir(universe)
+    path = write_arrow(version_path(directory, version), df, meta)
+    publish_version(directory, version)
+    prune_versions(directory, keep)
+    return path
+
+@st.cache_resource(max_entries=16)
+def _open_snapshot(path, mtime):
+    """
+    Abre o arquivo via memory-map (zero-copy). O mtime faz parte da chave,
+    então um arquivo regravado invalida a versão aberta anteriormente.
+    As páginas mapeadas são compartilhadas entre processos pelo SO.
+    """
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all()
+
+def open_arrow(path):
+    """Tabela Arrow do arquivo (memory-map, em cache até o arquivo mudar)."""
+    return _open_snapshot(path, os.path.getmtime(path))
+
+def snapshot_metadata(table):
+    raw = (table.schema.metadata or {}).get(b'poseidon')
+    return json.loads(raw) if raw else {}
+
+def read_snapshot(universe, tickers=None, max_age=SNAPSHOT_TTL, partial_max_age=PARTIAL_SNAPSHOT_TTL):
+    """
+    Lê o snapshot do universo como DataFrame.
+    Retorna None se não existir, estiver vencido ou cobrir outra lista de ativos.
+    Um snapshot sem algum dos ativos pedidos (falha na varredura) vence em
+    partial_max_age.
+    """
+    directory = _snapshot_dir(universe)
+    version = latest_version(directory)
+    if version is None:
+        return None
+    try:
+        table = open_arrow(version_path(directory, version))
+    except Exception:
+        return None # Inclui o arquivo inexistente (OSError)
+
+    meta = snapshot_metadata(table)
+    present = meta.get('tickers', [])
+    requested = meta.get('requested', present)
+    if tickers is not None and sorted(requested) != sorted(tickers):
+        return None
+    age = time.time() - meta.get('created_at', 0)
+    if age > max_age or (set(requested) - set(present) and age > partial_max_age):
+        return None
+    return table.to_pandas()
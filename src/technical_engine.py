@@ -1,16 +1,41 @@
 import pandas as pd
-import pandas_ta as ta
-import yfinance as yf
 import streamlit as st
+from src.metrics import instrument, record_cache_miss
+from src.singleflight import single_flight
+from src.upstream import call_upstream, fresh_cache, remember, recall
 
-@st.cache_data(ttl=3600)
+# Parâmetros dos indicadores (os mesmos no cálculo por histórico e no incremental, src.live_quotes)
+RSI_LENGTH = 14
+EMA_LENGTH = 50
+
+@instrument("get_technical_signals")
+@fresh_cache(st.cache_data(ttl=3600))
+@single_flight("get_technical_signals")
 def get_technical_signals(ticker):
     """
     Analyzes RSI and EMA to provide a 'Timing' signal.
     """
+    record_cache_miss("get_technical_signals")
+    try:
+        import pandas_ta as ta
+        import yfinance as yf
+    except ImportError:
+        return "Erro"
+
     try:
         # Fetch last 3 months to calculate indicators
-        df = yf.download(ticker, period="6mo", interval="1d", progress=False, auto_adjust=True)
+        df = call_upstream("yahoo", yf.download, ticker, period="6mo", interval="1d", progress=False, auto_adjust=True)
+    except Exception:
+        # Circuito aberto ou falha: último sinal conhecido
+        return recall(("signal", ticker), "Erro")
+
+    signal = _signal_from_history(df, ta)
+    if signal not in ("N/A", "Erro"):
+        remember(("signal", ticker), signal)
+    return signal
+
+def _signal_from_history(df, ta):
+    try:
         if df.empty:
             return "N/A"
         
@@ -22,10 +47,10 @@ def get_technical_signals(ticker):
             return "N/A"
         
         # Calculate RSI (14)
-        df['RSI'] = ta.rsi(df['Close'], length=14)
+        df['RSI'] = ta.rsi(df['Close'], length=RSI_LENGTH)
         
         # Calculate EMA (50)
-        df['EMA50'] = ta.ema(df['Close'], length=50)
+        df['EMA50'] = ta.ema(df['Close'], length=EMA_LENGTH)
         
         if df['RSI'].dropna().empty or df['EMA50'].dropna().empty:
             return "N/A"
@@ -33,20 +58,22 @@ def get_technical_signals(ticker):
         last_close = df['Close'].dropna().iloc[-1]
         last_rsi = df['RSI'].dropna().iloc[-1]
         last_ema50 = df['EMA50'].dropna().iloc[-1]
-        
-        # Logic: 
-        # Overbought: RSI > 70
-        # Oversold: RSI < 30
-        # Bullish Trend: Price > EMA50
-        
-        if last_rsi < 35:
-            return "🔥 COMPRA (Sobrevendido)"
-        elif last_rsi > 70:
-            return "⚠️ ALTO (Sobrecomprado)"
-        elif last_close > last_ema50:
-            return "✅ TENDRÊNCIA ALTA"
-        else:
-            return "⚖️ NEUTRO / QUEDA"
+        return classify_signal(last_close, last_rsi, last_ema50)
             
     except Exception as e:
         return "Erro"
+
+def classify_signal(last_close, last_rsi, last_ema50):
+    # Logic: 
+    # Overbought: RSI > 70
+    # Oversold: RSI < 30
+    # Bullish Trend: Price > EMA50
+    
+    if last_rsi < 35:
+        return "🔥 COMPRA (Sobrevendido)"
+    elif last_rsi > 70:
+        return "⚠️ ALTO (Sobrecomprado)"
+    elif last_close > last_ema50:
+        return "✅ TENDRÊNCIA ALTA"
+    else:
+        return "⚖️ NEUTRO / QUEDA"
@@ -0,0 +1,165 @@
+import argparse
+import os
+import sys
+import time
+from src.metrics import inc
+from src.universe import BDR_TICKERS, CRYPTO_TICKERS, FII_TICKERS, STOCK_TICKERS
+
+# --- TOP PICKS MATERIALIZADOS ---
+# Os rankings (ações, BDRs, cripto e FIIs) são os mesmos para todos os
+# usuários num mesmo dia. O job noturno (python -m src.top_picks, ou
+# atualizar_top_picks.bat) roda os scanners uma vez e grava uma tabela
+# versionada por universo:
+#   data/top_picks/<universo>/<versão>.arrow  (Arrow IPC, imutável)
+#   data/top_picks/<universo>/LATEST          (nome da versão atual)
+# O app lê a versão atual (memory-map, O(1)) e só calcula ao vivo quando a
+# tabela não existe, está vencida ou cobre outra lista de ativos.
+
+PICKS_DIR = os.path.join("data", "top_picks")
+PICKS_MAX_AGE = 26 * 3600 # Job diário + folga para a própria execução
+PICKS_KEEP = 7 # Versões guardadas por universo (as mais antigas são apagadas)
+
+PICK_UNIVERSES = {
+    'stocks': STOCK_TICKERS,
+    'bdr': BDR_TICKERS,
+    'crypto': CRYPTO_TICKERS,
+    'fii': FII_TICKERS
+}
+
+# --- SCANNERS (cálculo ao vivo) ---
+
+def scan_stocks(universe, tickers):
+    """
+    Scanner de ações/BDRs: fundamentos + ranking + sinal técnico.
+    """
+    from src.analyzer import score_stocks
+    from src.data_loader import get_universe_snapshot
+    from src.technical_engine import get_technical_signals
+
+    best = score_stocks(get_universe_snapshot(universe, tickers))
+
+    # Garante que o DataFrame não está vazio e normaliza nomes de colunas
+    if best is not None and not best.empty and 'symbol' not in best.columns:
+        best = best.rename(columns={'Symbol': 'symbol', 'Ticker': 'symbol'})
+
+    if best is None or best.empty or 'symbol' not in best.columns:
+        return None
+
+    best = best.copy()
+    best['Timing'] = best['symbol'].apply(get_technical_signals)
+    return best
+
+def scan_crypto(tickers):
+    from src.analyzer import score_crypto
+    from src.data_loader import get_universe_snapshot
+
+    return score_crypto(get_universe_snapshot('crypto', tickers))
+
+def scan_fii(tickers):
+    from src.fii_loader import get_fii_batch
+
+    df_fii = get_fii_batch(tickers)
+    # Filtro: P/VP entre 0.5 e 1.2 para evitar fundos superavaliados
+    return df_fii[(df_fii['p_vp'] > 0.5) & (df_fii['p_vp'] < 1.2)]
+
+def scan(universe, tickers):
+    if universe == 'crypto':
+        return scan_crypto(tickers)
+    if universe == 'fii':
+        return scan_fii(tickers)
+    return scan_stocks(universe, tickers)
+
+# --- TABELAS VERSIONADAS ---
+
+def _universe_dir(universe):
+    return os.path.join(PICKS_DIR, universe)
+
+def materialize(universe, tickers=None, keep=PICKS_KEEP):
+    """
+    Roda o scanner do universo e grava uma nova versão da tabela.
+    Retorna (versão, linhas); levanta ValueError se o scanner não devolver nada.
+    """
+    from src.snapshot_store import prune_versions, publish_version, version_path, write_arrow
+
+    tickers = list(PICK_UNIVERSES[universe] if tickers is None else tickers)
+    start = time.time()
+    picks = scan(universe, tickers)
+    if picks is None or picks.empty:
+        raise ValueError(f"Scanner de '{universe}' não retornou ativos")
+
+    version = time.strftime("%Y%m%dT%H%M%S", time.gmtime(start))
+    meta = {
+        'universe': universe, 'version': version, 'created_at': start,
+        'tickers': tickers, 'duration': time.time() - start
+    }
+    directory = _universe_dir(universe)
+    write_arrow(version_path(directory, version), picks, meta)
+    publish_version(directory, version)
+    prune_versions(directory, keep)
+    return version, len(picks)
+
+def read_picks(universe, tickers=None, max_age=PICKS_MAX_AGE):
+    """
+    Tabela materializada mais recente do universo, como DataFrame.
+    Retorna None se não existir, estiver vencida ou cobrir outra lista de ativos.
+    """
+    from src.snapshot_store import latest_version, open_arrow, snapshot_metadata, version_path
+
+    directory = _universe_dir(universe)
+    version = latest_version(directory)
+    if version is None:
+        return None
+    try:
+        table = open_arrow(version_path(directory, version))
+    except Exception:
+        return None
+
+    meta = snapshot_metadata(table)
+    if time.time() - meta.get('created_at', 0) > max_age:
+        return None
+    if tickers is not None and sorted(meta.get('tickers', [])) != sorted(tickers):
+        return None
+    return table.to_pandas()
+
+def load_picks(universe, tickers):
+    """
+    Top picks do universo: a tabela do job noturno ou, se vencida, o scanner ao vivo.
+    Retorna (DataFrame ou None, origem), com origem 'table' ou 'live'.
+    """
+    picks = read_picks(universe, tickers)
+    source = 'live' if picks is None else 'table'
+    inc("poseidon_top_picks_reads_total", universe=universe, source=source)
+    if picks is None:
+        picks = scan(universe, tickers)
+    return picks, source
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Materializa os top picks de cada universo (job noturno).")
+    parser.add_argument("universes", nargs="*", metavar="universo",
+                        help=f"universos a atualizar: {', '.join(PICK_UNIVERSES)} (padrão: todos)")
+    parser.add_argument("--keep", type=int, default=PICKS_KEEP, help="versões guardadas por universo")
+    args = parser.parse_args(argv)
+    unknown = [u for u in args.universes if u not in PICK_UNIVERSES]
+    if unknown:
+        parser.error(f"universo desconhecido: {', '.join(unknown)}")
+
+    # Fora do "streamlit run" os caches avisam que estão em modo bare: silencia
+    from streamlit import logger
+    logger.set_log_level("error")
+
+    failures = 0
+    for universe in args.universes or list(PICK_UNIVERSES):
+        start = time.time()
+        try:
+            version, rows = materialize(universe, keep=args.keep)
+        except Exception as e:
+            failures += 1
+            print(f"[ERRO] {universe:8s} {e}")
+            continue
+        print(f"[OK]   {universe:8s} versão {version}: {rows} ativos em {time.time() - start:.1f}s")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
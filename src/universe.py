@@ -0,0 +1,26 @@
+# --- ASSET UNIVERSE ---
+# Listas centralizadas para que app, snapshots e jobs usem o mesmo universo.
+STOCK_TICKERS = [
+    "VALE3.SA", "PETR4.SA", "WEGE3.SA", "ITUB4.SA", "BBAS3.SA", 
+    "BBDC4.SA", "ABEV3.SA", "RENT3.SA", "BPAC11.SA", "PRIO3.SA",
+    "CMIG4.SA", "GGBR4.SA", "CSAN3.SA", "RAIL3.SA", "ELET3.SA",
+    "VBBR3.SA", "RADL3.SA", "RDOR3.SA", "HYPE3.SA", "BBSE3.SA"
+]
+BDR_TICKERS = [
+    "AAPL34.SA", "GOGL34.SA", "AMZO34.SA", "MSFT34.SA", "TSLA34.SA",
+    "NVDC34.SA", "M1TA34.SA", "DISB34.SA", "NFLX34.SA", "PYPL34.SA",
+    "IVVB11.SA", "NASD11.SA", "BERK34.SA", "JNJB34.SA", "PGCO34.SA",
+    "PEPB34.SA", "MCDC34.SA", "CSCO34.SA", "ITLC34.SA", "VISA34.SA"
+]
+FII_TICKERS = [
+    "HGLG11", "KNIP11", "VISC11", "XPLG11", "XPML11", "MXRF11", 
+    "KNCR11", "HGRU11", "VILG11", "BRCO11", "HGBS11", "BTLG11"
+]
+CRYPTO_TICKERS = ["BTC-USD", "ETH-USD", "SOL-USD", "BNB-USD", "ADA-USD", "XRP-USD", "DOT-USD", "AVAX-USD"]
+
+# Universos servidos pelo Yahoo Finance (snapshot colunar)
+UNIVERSES = {
+    'stocks': STOCK_TICKERS,
+    'bdr': BDR_TICKERS,
+    'crypto': CRYPTO_TICKERS
+}
@@ -0,0 +1,357 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import wraps
+from src.metrics import inc, observe, set_gauge, record_upstream, record_upstream_error
+
+# --- POLÍTICA DE ACESSO AOS PROVEDORES EXTERNOS ---
+# Toda chamada externa passa por call_upstream(host, ...), que aplica por host:
+#   1. Circuit breaker: após N falhas seguidas o host fica "aberto" e as chamadas
+#      falham na hora (CircuitOpenError) em vez de empilhar timeouts;
+#   2. Token bucket: limita a taxa de chamadas da máquina inteira. O estado
+#      do balde fica num arquivo travado em RATE_LIMIT_DIR, compartilhado por
+#      todas as sessões do Streamlit, pela API (src.api) e pelo job noturno
+#      (src.top_picks) que rodam na mesma pasta; sem acesso ao arquivo, cai
+#      para um balde do próprio processo;
+#   3. Deadline: a chamada roda num pool de threads e é abandonada no prazo.
+# Só falhas do provedor (rede, HTTP, exceções das libs dos provedores) contam
+# para o breaker; um erro do nosso código propaga sem abrir o circuito.
+# Os loaders guardam o último valor bom (remember) e, quando a chamada falha
+# ou o circuito está aberto, voltam direto para ele (recall). Esse valor de
+# fallback não entra nos caches (fresh_cache): quando o provedor volta, a
+# próxima chamada já busca o dado novo.
+
+POLICIES = {
+    #                 chamadas/s  rajada  prazo(s)  falhas p/ abrir  reabre após(s)
+    'yahoo':        {'rate': 10.0, 'burst': 40, 'timeout': 10.0, 'failure_threshold': 5, 'reset_timeout': 60.0},
+    'statusinvest': {'rate': 2.0, 'burst': 12, 'timeout': 8.0, 'failure_threshold': 3, 'reset_timeout': 120.0},
+    'bcb':          {'rate': 2.0, 'burst': 4, 'timeout': 8.0, 'failure_threshold': 3, 'reset_timeout': 300.0},
+    'mercadopago':  {'rate': 10.0, 'burst': 10, 'timeout': 15.0, 'failure_threshold': 5, 'reset_timeout': 30.0},
+}
+DEFAULT_POLICY = {'rate': 5.0, 'burst': 10, 'timeout': 10.0, 'failure_threshold': 5, 'reset_timeout': 60.0}
+RATE_LIMIT_DIR = os.environ.get("POSEIDON_RATE_LIMIT_DIR", os.path.join("data", "ratelimit"))
+
+# Valores do gauge poseidon_circuit_state
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+STATE_NAMES = {CLOSED: "fechado", HALF_OPEN: "meio-aberto", OPEN: "aberto"}
+
+class UpstreamError(Exception):
+    """Falha de política (não da chamada em si) ao acessar um provedor."""
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+class RateLimitedError(UpstreamError):
+    pass
+
+class UpstreamTimeout(UpstreamError):
+    pass
+
+# Módulos cujas exceções são falha do provedor (além de OSError, que cobre
+# requests, curl_cffi, socket e timeouts)
+PROVIDER_MODULES = frozenset({'yfinance', 'bcb', 'curl_cffi', 'requests', 'urllib3', 'http', 'ssl', 'mercadopago'})
+
+def is_provider_error(exc):
+    """Falha de rede/HTTP/provedor (conta para o breaker) x bug do nosso código."""
+    if isinstance(exc, (OSError, UpstreamError)):
+        return True
+    return type(exc).__module__.split('.')[0] in PROVIDER_MODULES
+
+class TokenBucket:
+    """Balde do próprio processo (todas as threads/sessões)."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Consome um token: None se conseguiu, senão a espera (s) até o próximo."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, timeout):
+        """Consome um token, esperando no máximo `timeout` segundos."""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if wait is None:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+@contextmanager
+def _locked(f):
+    """Trava exclusiva do arquivo entre processos (fcntl no Unix, msvcrt no Windows)."""
+    if os.name == 'nt':
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Balde com o estado ("tokens instante") num arquivo travado: vale para
+    todos os processos que usam o mesmo arquivo. O relógio é o de parede
+    (time.time), o único comum aos processos.
+    """
+
+    def __init__(self, rate, burst, path):
+        super().__init__(rate, burst)
+        self.path = path
+
+    def _take(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        except OSError:
+            return super()._take() # Pasta sem escrita: limite só deste processo
+        with os.fdopen(fd, 'r+b') as f, _locked(f):
+            f.seek(0)
+            now = time.time()
+            try:
+                tokens, updated = (float(v) for v in f.read().split())
+            except ValueError:
+                tokens, updated = float(self.capacity), now # Arquivo novo (ou corrompido): balde cheio
+            tokens = min(self.capacity, tokens + max(now - updated, 0.0) * self.rate)
+            wait = None
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            f.seek(0)
+            f.truncate()
+            f.write(f"{tokens!r} {now!r}".encode())
+            f.flush() # Grava antes de soltar a trava
+        return wait
+
+class CircuitBreaker:
+    def __init__(self, host, failure_threshold, reset_timeout):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._publish()
+
+    def _publish(self):
+        set_gauge("poseidon_circuit_state", self.state, source=self.host)
+
+    def allow(self):
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self._publish()
+            if self.state == HALF_OPEN:
+                # Só uma chamada de teste por vez enquanto meio-aberto
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self._publish()
+
+    def release(self):
+        """Libera a vaga de teste sem contar sucesso nem falha (throttling, bug nosso, interrupção)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._publish()
+
+_registry_lock = threading.Lock()
+_buckets = {}
+_breakers = {}
+# Threads de I/O: uma chamada que estoura o prazo continua rodando até terminar,
+# mas ninguém espera por ela; o breaker impede que se acumulem.
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="upstream")
+
+def get_policy(host):
+    return POLICIES.get(host, DEFAULT_POLICY)
+
+def _get_bucket(host):
+    with _registry_lock:
+        if host not in _buckets:
+            policy = get_policy(host)
+            _buckets[host] = SharedTokenBucket(policy['rate'], policy['burst'],
+                                               os.path.join(RATE_LIMIT_DIR, f"{host}.bucket"))
+        return _buckets[host]
+
+def get_breaker(host):
+    with _registry_lock:
+        if host not in _breakers:
+            policy = get_policy(host)
+            _breakers[host] = CircuitBreaker(host, policy['failure_threshold'], policy['reset_timeout'])
+        return _breakers[host]
+
+def breaker_states():
+    """{host: nome do estado} para exibição."""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {b.host: STATE_NAMES[b.state] for b in breakers}
+
+def call_upstream(host, func, *args, pass_timeout=False, **kwargs):
+    """
+    Executa func(*args, **kwargs) sob a política do host.
+    pass_timeout=True repassa o prazo como `timeout=` (ex.: requests.get).
+    """
+    policy = get_policy(host)
+    timeout = policy['timeout']
+    breaker = get_breaker(host)
+
+    if not breaker.allow():
+        inc("poseidon_upstream_short_circuited_total", source=host)
+        raise CircuitOpenError(f"Circuito aberto para {host}")
+
+    start = time.monotonic()
+    settled = False # Sucesso ou falha já registrados no breaker
+    try:
+        if not _get_bucket(host).acquire(timeout):
+            inc("poseidon_upstream_throttled_total", source=host)
+            raise RateLimitedError(f"Limite de taxa atingido para {host}")
+
+        if pass_timeout:
+            kwargs['timeout'] = max(0.1, timeout - (time.monotonic() - start))
+
+        record_upstream(host)
+        future = _executor.submit(func, *args, **kwargs)
+        try:
+            result = future.result(timeout=max(0.0, timeout - (time.monotonic() - start)))
+        except FutureTimeout:
+            future.cancel()
+            breaker.record_failure()
+            settled = True
+            record_upstream_error(host)
+            raise UpstreamTimeout(f"{host} excedeu o prazo de {timeout:.0f}s")
+        except Exception as e:
+            if is_provider_error(e):
+                breaker.record_failure()
+                settled = True
+                record_upstream_error(host)
+            else:
+                inc("poseidon_upstream_bugs_total", source=host, error=type(e).__name__)
+            raise
+        finally:
+            observe(f"upstream.{host}", time.monotonic() - start)
+
+        breaker.record_success()
+        settled = True
+        return result
+    finally:
+        if not settled:
+            # Throttling local, bug do nosso código ou BaseException (rerun ou
+            # parada da sessão): libera a vaga de teste sem contar nada
+            breaker.release()
+
+# --- ÚLTIMO VALOR BOM (stale cache) ---
+_STALE_MAX_ENTRIES = 5000
+_stale_lock = threading.Lock()
+_stale = OrderedDict()
+
+def remember(key, value):
+    with _stale_lock:
+        _stale[key] = value
+        _stale.move_to_end(key)
+        while len(_stale) > _STALE_MAX_ENTRIES:
+            _stale.popitem(last=False)
+
+def recall(key, default=None):
+    """Último valor bom (ou default). Marca o thread: o resultado atual é de fallback."""
+    mark_stale()
+    with _stale_lock:
+        if key in _stale:
+            inc("poseidon_stale_fallback_total", kind=str(key[0]) if isinstance(key, tuple) else str(key))
+            return _stale[key]
+    return default
+
+# --- FALLBACK FORA DO CACHE ---
+# recall() (ou mark_stale) marca o thread: o valor sendo calculado veio de
+# fallback. fresh_cache(cache) aplica o cache (ex.: st.cache_data) só a
+# resultados frescos: um resultado marcado atravessa o cache como StaleResult
+# (exceções não são guardadas) e chega ao chamador como valor normal. A marca
+# continua no thread, então um estágio com cache acima também não o guarda.
+_local = threading.local()
+
+class StaleResult(Exception):
+    """Resultado de fallback a caminho do chamador, por fora do cache."""
+
+    def __init__(self, value):
+        super().__init__("resultado de fallback")
+        self.value = value
+
+def mark_stale():
+    _local.stale = True
+
+def is_stale():
+    return getattr(_local, 'stale', False)
+
+def fresh_cache(cache):
+    """
+    Decorator: `cache` (ex.: st.cache_data(ttl=...)) guarda só resultados
+    frescos; os de fallback são devolvidos sem entrar no cache.
+    """
+    def decorator(func):
+        @wraps(func)
+        def fresh_only(*args, **kwargs):
+            outer = is_stale()
+            _local.stale = False
+            try:
+                value = func(*args, **kwargs)
+                if is_stale():
+                    raise StaleResult(value)
+                return value
+            finally:
+                _local.stale = outer or is_stale()
+
+        cached = cache(fresh_only)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return cached(*args, **kwargs)
+            except StaleResult as e:
+                mark_stale()
+                return e.value
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator
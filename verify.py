@@ -8,14 +8,14 @@ print(f"Macro Data: {macro}")
 print("\n--- Testing Asset Data (Values) ---")
 info = get_asset_info("VALE3.SA")
 if info:
-    print(f"Fetched VALE3: Price={info.get('price')}, ROE={info.get('roe')}")
+    print(f"Fetched VALE3: Price={info.price}, ROE={info.roe}")
 else:
     print("Failed to fetch VALE3")
 
 print("\n--- Testing Asset Data (Crypto) ---")
 info_c = get_asset_info("BTC-USD")
 if info_c:
-    print(f"Fetched BTC: Price={info_c.get('price')}")
+    print(f"Fetched BTC: Price={info_c.price}")
 else:
     print("Failed to fetch BTC")
 
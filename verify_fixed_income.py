@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+from src.fixed_income import _to_number, load_offers
+
+def verify_fixed_income():
+    print("--- Verifying Fixed Income Parsing ---")
+
+    # 1. Números no formato brasileiro, com moeda e porcentagem
+    print("Testing number parsing...")
+    cases = {
+        "1.000": 1000.0,
+        "25.000.000": 25000000.0,
+        "R$ 5.000,00": 5000.0,
+        "R$1.234,56": 1234.56,
+        "US$ 10": 10.0,
+        "12,5%": 12.5,
+        "110": 110.0,
+        "0.5": 0.5,
+        "12.50": 12.5,
+    }
+    parsed = _to_number(pd.Series(list(cases)))
+    for (text, expected), value in zip(cases.items(), parsed):
+        print(f"{text!r} -> {value}")
+        assert np.isclose(value, expected), f"{text!r}: esperado {expected}, veio {value}"
+    assert np.isnan(_to_number(pd.Series(["abc"]))[0])
+    print("Number parsing: OK")
+
+    # 2. Tabela de ofertas com aplicação mínima em reais
+    print("Testing offers table...")
+    csv = (
+        "Banco;Produto;Indexador;Taxa;Prazo;Aplicação mínima\n"
+        "Banco A;CDB;% CDI;110%;720;R$ 1.000,00\n"
+        "Banco B;LCI;Pré;12,5;365;5.000\n"
+    ).encode("utf-8")
+    offers = load_offers(csv)
+    print(offers[['emissor', 'taxa', 'prazo_dias', 'aplicacao_minima']])
+    assert offers['aplicacao_minima'].tolist() == [1000.0, 5000.0]
+    assert offers['taxa'].tolist() == [110.0, 12.5]
+    print("Offers table: OK")
+    print("Fixed Income Verification Complete.")
+
+if __name__ == "__main__":
+    verify_fixed_income()